@@ -0,0 +1,248 @@
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+"""Times each stage of the translation pipeline on the test fixtures.
+
+Results are reported in seconds per operation (per instruction, gate,
+recorded result or module, depending on the stage), taking the fastest of
+several repeats. ``--save`` stores them as a JSON baseline and
+``--compare`` flags the stages that got slower than the baseline by more
+than the tolerance.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import warnings
+from importlib.metadata import PackageNotFoundError, version
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "tests"))
+
+import test_circuits  # noqa: E402
+from test_circuits import basic_gates, core_tests  # noqa: E402
+
+from pyqir import Context, qir_module  # noqa: E402
+from qiskit_qir.elements import QiskitModule  # noqa: E402
+from qiskit_qir.translate import to_qir_module  # noqa: E402
+from qiskit_qir.visitor import BasicQisVisitor  # noqa: E402
+
+# Stage name -> (setup, run, number of operations per run). ``run`` is
+# timed on a fresh result of ``setup`` for each repeat.
+Benchmark = Tuple[Callable[[], Any], Callable[[Any], None], int]
+
+_GATE_FIXTURES = (
+    basic_gates.single_op_tests
+    + basic_gates.adj_op_tests
+    + basic_gates.rotation_tests
+    + basic_gates.double_op_tests
+    + basic_gates.triple_op_tests
+    + basic_gates.measurement_tests
+    + basic_gates.prepare_tests
+    + ["Fixture_delay_dt"]
+)
+# Instructions visited per run of a visit_instruction benchmark.
+_GATE_REPEATS = 2000
+
+
+def _fixture(module, name: str):
+    """Calls a pytest fixture function directly."""
+    fixture = getattr(module, name)
+    function = getattr(fixture, "__wrapped__", None)
+    if function is None:
+        function = fixture.__pytest_wrapped__.obj
+    return function()
+
+
+def _visitor(circuit):
+    """A visitor ready to visit the instructions of ``circuit``."""
+    module = QiskitModule.from_quantum_circuit(circuit, qir_module(Context(), "bench"))
+    visitor = BasicQisVisitor()
+    visitor.visit_qiskit_module(module)
+    for register in module.circuit.qregs + module.circuit.cregs:
+        visitor.visit_register(register)
+    return (module, visitor)
+
+
+def _visit_benchmark(circuit, instructions: List, repeats: int) -> Benchmark:
+    # qiskit creates the operation objects of a circuit on access, which
+    # is not part of visiting them.
+    instructions = [tuple(instruction) for instruction in instructions]
+
+    def setup():
+        return _visitor(circuit)[1]
+
+    def run(visitor):
+        for _ in range(repeats):
+            for instruction, qargs, cargs in instructions:
+                visitor.visit_instruction(instruction, qargs, cargs)
+
+    return (setup, run, repeats * len(instructions))
+
+
+def _benchmarks() -> Dict[str, Benchmark]:
+    benchmarks: Dict[str, Benchmark] = {}
+    circuits = [_fixture(test_circuits, name) for name in core_tests]
+    instructions = sum(len(circuit.data) for circuit in circuits)
+
+    def modules():
+        return [qir_module(Context(), "bench") for _ in circuits]
+
+    def wrap(llvm_modules):
+        for circuit, llvm_module in zip(circuits, llvm_modules):
+            QiskitModule.from_quantum_circuit(circuit, llvm_module)
+
+    benchmarks["from_quantum_circuit"] = (modules, wrap, instructions)
+
+    for name in _GATE_FIXTURES:
+        circuit = _fixture(basic_gates, name)[-1]
+        gate = circuit.data[0].operation.name
+        benchmarks[f"visit_instruction[{gate}]"] = _visit_benchmark(
+            circuit, circuit.data, _GATE_REPEATS
+        )
+
+    subroutine = _fixture(test_circuits, "teleport_with_subroutine")
+    composite = [
+        item for item in subroutine.data if item.operation.definition is not None
+    ]
+    benchmarks["visit_instruction[composite]"] = _visit_benchmark(
+        subroutine, composite, _GATE_REPEATS // len(composite)
+    )
+
+    teleport = _fixture(test_circuits, "teleport")
+    conditioned = [item for item in teleport.data if item[0].condition is not None]
+    benchmarks["conditional_lowering"] = _visit_benchmark(
+        teleport, conditioned, _GATE_REPEATS // len(conditioned)
+    )
+
+    widest = max(circuits, key=lambda circuit: circuit.num_clbits)
+
+    def record(state):
+        module, visitor = state
+        for _ in range(_GATE_REPEATS):
+            visitor.record_output(module)
+
+    benchmarks["record_output"] = (
+        lambda: _visitor(widest),
+        record,
+        _GATE_REPEATS * widest.num_clbits,
+    )
+
+    llvm_module, _ = to_qir_module(circuits, verify="off")
+    benchmarks["verify"] = (lambda: llvm_module, lambda m: m.verify(), len(circuits))
+    benchmarks["bitcode"] = (lambda: llvm_module, lambda m: m.bitcode, len(circuits))
+    return benchmarks
+
+
+def run_benchmarks(
+    repeat: int, selected: Optional[List[str]] = None
+) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for name, (setup, run, operations) in _benchmarks().items():
+        if selected and not any(pattern in name for pattern in selected):
+            continue
+        samples = []
+        for _ in range(repeat):
+            state = setup()
+            # As in timeit, garbage collection is kept out of the timings.
+            gc.collect()
+            gc.disable()
+            try:
+                start = time.perf_counter()
+                run(state)
+                samples.append((time.perf_counter() - start) / operations)
+            finally:
+                gc.enable()
+            del state
+        results[name] = {
+            "seconds": min(samples),
+            "median_seconds": statistics.median(samples),
+            "operations": operations,
+        }
+        print(f"{name:40} {min(samples) * 1e6:10.3f} us/op", flush=True)
+    return results
+
+
+def _environment() -> Dict[str, str]:
+    environment = {"python": platform.python_version(), "machine": platform.machine()}
+    for package in ("qiskit", "pyqir", "qiskit-qir-alice-bob-fork"):
+        try:
+            environment[package] = version(package)
+        except PackageNotFoundError:
+            environment[package] = "unknown"
+    return environment
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float,
+) -> List[str]:
+    """Returns the stages slower than the baseline by more than the
+    tolerance, printing the ratio of every stage."""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result["seconds"] / baseline[name]["seconds"]
+        flag = ""
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:40} {ratio:6.2f}x baseline{flag}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-r", "--repeat", type=int, default=7)
+    parser.add_argument(
+        "-k", "--select", action="append", help="only run stages containing this"
+    )
+    parser.add_argument("--save", metavar="PATH", help="save the results as a baseline")
+    parser.add_argument(
+        "--compare", metavar="PATH", help="flag regressions against a baseline"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="relative slowdown flagged as a regression, default 0.25",
+    )
+    args = parser.parse_args(argv)
+    # Conditions and tuple-like circuit instructions are deprecated by
+    # qiskit but still used by the fixtures and the visitor.
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    results = run_benchmarks(args.repeat, args.select)
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(
+                {"environment": _environment(), "results": results},
+                file,
+                indent=2,
+                sort_keys=True,
+            )
+        print(f"Saved baseline to {args.save}")
+    if args.compare:
+        if not os.path.exists(args.compare):
+            print(f"No baseline at {args.compare}; run with --save first")
+            return 0
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        if baseline["environment"] != _environment():
+            print(f"Baseline environment differs: {baseline['environment']}")
+        regressions = compare(results, baseline["results"], args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} stages regressed: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
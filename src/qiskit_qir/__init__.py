@@ -6,4 +6,15 @@ __author__ = """Microsoft Corporation"""
 __email__ = "que-contacts@microsoft.com"
 __version__ = "0.5.0"
 
-from qiskit_qir.translate import to_qir_module
+from qiskit_qir.analysis import CircuitAnalysis, analyze
+from qiskit_qir.cache import TranslationCache
+from qiskit_qir.pipeline import TranslationStats, VerificationError
+from qiskit_qir.output import QirOutput
+from qiskit_qir.translate import (
+    iter_qir_shards,
+    to_qir_module,
+    to_qir_module_async,
+    to_qir_output,
+    to_qir_shards,
+)
+from qiskit_qir.template import QirTemplate
@@ -0,0 +1,9 @@
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+import sys
+
+from qiskit_qir.cli import main
+
+sys.exit(main())
@@ -0,0 +1,286 @@
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+from typing import Dict, Iterable, Iterator, List, Set, Tuple, Type, Union
+
+import numpy as np
+from qiskit.circuit import (
+    ClassicalRegister,
+    Clbit,
+    ControlFlowOp,
+    ForLoopOp,
+    IfElseOp,
+    SwitchCaseOp,
+)
+from qiskit.circuit.classical import expr
+from qiskit.circuit.instruction import Instruction
+from qiskit.circuit.quantumcircuit import QuantumCircuit
+
+from qiskit_qir.capability import (
+    CapabilityError,
+    ConditionalBranchingOnResultError,
+    QubitUseAfterMeasurementError,
+)
+from qiskit_qir.composites import CompositeCache
+from qiskit_qir.visitor import (
+    _MEASUREMENT_INSTRUCTIONS,
+    BasicQisVisitor,
+    _condition_bits,
+)
+
+# A primitive operation, its qubit indices and the number of branches it
+# is nested in.
+_Primitive = Tuple[Instruction, List[int], int]
+
+
+class CircuitAnalysis:
+    """What translating a circuit for a profile requires, found without
+    building IR.
+
+    ``gate_counts`` counts the operations emitted once composite
+    instructions are expanded, and ``max_branch_depth`` is the deepest
+    nesting of the branches lowering their conditions. ``violations`` holds
+    the capability errors translation would raise, for every offending
+    instruction rather than the first only, and ``unsupported`` the names
+    of instructions that cannot be lowered.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        profile: str,
+        num_qubits: int,
+        num_results: int,
+        gate_counts: Dict[str, int],
+        max_branch_depth: int,
+        violations: List[CapabilityError],
+        unsupported: Set[str],
+    ):
+        self.name = name
+        self.profile = profile
+        self.num_qubits = num_qubits
+        self.num_results = num_results
+        self.gate_counts = gate_counts
+        self.max_branch_depth = max_branch_depth
+        self.violations = violations
+        self.unsupported = unsupported
+
+    @property
+    def valid(self) -> bool:
+        """Whether the circuit can be translated for the profile."""
+        return not self.violations and not self.unsupported
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{k}={v!r}" for k, v in vars(self).items())
+        return f"CircuitAnalysis({fields})"
+
+
+def _condition_depth(condition, visitor: BasicQisVisitor) -> int:
+    """The number of nested branches lowering the condition."""
+    if isinstance(condition[0], Clbit) or visitor._integer_computations:
+        return 1
+    register: ClassicalRegister = condition[0]
+    return register.size
+
+
+def _control_flow_depth(operation: ControlFlowOp, visitor: BasicQisVisitor) -> int:
+    """The number of nested branches lowering the condition of an if-else
+    or switch operation."""
+    if isinstance(operation, IfElseOp):
+        condition = operation._condition
+        if not isinstance(condition, expr.Expr):
+            return _condition_depth(condition, visitor)
+        if visitor._integer_computations:
+            return 1
+        return sum(len(_condition_bits(var)) for var in expr.iter_vars(condition))
+    bits = _condition_bits(operation.target)
+    return 1 if visitor._integer_computations else len(bits)
+
+
+def _primitives(
+    visitor: BasicQisVisitor,
+    operation: Instruction,
+    qubits: List[int],
+    num_clbits: int,
+    depth: int,
+) -> Iterator[_Primitive]:
+    """Yields the operations emitted for ``operation``, expanding composite
+    instructions as the visitor does, for loops once per iteration and
+    every block of if-else and switch operations."""
+    if isinstance(operation, (IfElseOp, SwitchCaseOp)):
+        depth += _control_flow_depth(operation, visitor)
+        for block in operation.blocks:
+            yield from _block_primitives(visitor, block, qubits, depth)
+        return
+    condition = getattr(operation, "_condition", None)
+    if condition is not None:
+        depth += _condition_depth(condition, visitor)
+    if operation.name in visitor._instruction_handlers:
+        yield (operation, qubits, depth)
+        return
+    if isinstance(operation, ForLoopOp):
+        indexset, _, body = operation.params
+        for _ in indexset:
+            yield from _block_primitives(visitor, body, qubits, depth)
+        return
+    expansion = visitor._composite_expansion(operation, len(qubits), num_clbits)
+    for nested, qubit_slots, clbit_slots in expansion:
+        yield from _primitives(
+            visitor,
+            nested,
+            [qubits[n] for n in qubit_slots],
+            len(clbit_slots),
+            depth,
+        )
+
+
+def _block_primitives(
+    visitor: BasicQisVisitor, block: QuantumCircuit, qubits: List[int], depth: int
+) -> Iterator[_Primitive]:
+    """Yields the operations emitted for a control flow block applied to
+    ``qubits``."""
+    for item in block.data:
+        yield from _primitives(
+            visitor,
+            item.operation,
+            [qubits[block.find_bit(bit).index] for bit in item.qubits],
+            len(item.clbits),
+            depth,
+        )
+
+
+def _analyze_circuit(
+    circuit: QuantumCircuit,
+    profile: str,
+    composites: CompositeCache,
+    visitor_class: Type[BasicQisVisitor],
+) -> CircuitAnalysis:
+    visitor = visitor_class(profile, composite_cache=composites)
+    qubit_indices = {bit: n for n, bit in enumerate(circuit.qubits)}
+    violations: List[CapabilityError] = []
+    unsupported: Set[str] = set()
+    # Operation names are interned as integer ids, so that counts and the
+    # measurement check work on integer arrays. Per primitive operation:
+    # the id of its name, its number of qubits and the position of the
+    # circuit instruction it comes from; per operand: its qubit.
+    name_ids: Dict[str, int] = {}
+    codes: List[int] = []
+    arities: List[int] = []
+    items: List[int] = []
+    operand_qubits: List[int] = []
+    max_depth = 0
+    for index, item in enumerate(circuit.data):
+        operation = item.operation
+        if (
+            getattr(operation, "_condition", None) is not None
+            or isinstance(operation, SwitchCaseOp)
+        ) and not visitor._conditional_branching:
+            violations.append(
+                ConditionalBranchingOnResultError(
+                    circuit, operation, item.qubits, item.clbits, profile
+                )
+            )
+        qubits = [qubit_indices[bit] for bit in item.qubits]
+        try:
+            primitives = list(
+                _primitives(visitor, operation, qubits, len(item.clbits), 0)
+            )
+        except ValueError:
+            unsupported.add(operation.name)
+            continue
+        for primitive, primitive_qubits, depth in primitives:
+            codes.append(name_ids.setdefault(primitive.name, len(name_ids)))
+            arities.append(len(primitive_qubits))
+            items.append(index)
+            operand_qubits.extend(primitive_qubits)
+            max_depth = max(max_depth, depth)
+
+    code_array = np.array(codes, dtype=np.intp)
+    counts = np.bincount(code_array, minlength=len(name_ids))
+    gate_counts = {name: int(counts[code]) for name, code in sorted(name_ids.items())}
+
+    if not visitor._qubit_use_after_measurement and operand_qubits:
+        violations.extend(
+            _use_after_measurement(
+                circuit,
+                profile,
+                visitor,
+                list(name_ids),
+                code_array,
+                np.array(arities, dtype=np.intp),
+                np.array(items, dtype=np.intp),
+                np.array(operand_qubits, dtype=np.intp),
+            )
+        )
+
+    return CircuitAnalysis(
+        circuit.name,
+        profile,
+        circuit.num_qubits,
+        circuit.num_clbits,
+        gate_counts,
+        max_depth,
+        violations,
+        unsupported,
+    )
+
+
+def _use_after_measurement(
+    circuit: QuantumCircuit,
+    profile: str,
+    visitor: BasicQisVisitor,
+    names: List[str],
+    codes: np.ndarray,
+    arities: np.ndarray,
+    items: np.ndarray,
+    qubits: np.ndarray,
+) -> List[QubitUseAfterMeasurementError]:
+    """Finds the instructions using a qubit after its first measurement.
+
+    ``codes`` holds the position in ``names`` of the name of each primitive
+    operation, ``arities`` its number of qubits and ``items`` the position
+    of its circuit instruction; ``qubits`` holds the qubits of all
+    operations, in order.
+    """
+    checked_names = visitor._measurement_checked_instructions
+    measured = np.array([name in _MEASUREMENT_INSTRUCTIONS for name in names])
+    checked = np.array([name in checked_names for name in names])
+    # The position of the operation of each operand.
+    positions = np.repeat(np.arange(len(codes)), arities)
+    is_measurement = measured[codes][positions]
+    first_measurement = np.full(circuit.num_qubits, len(codes))
+    np.minimum.at(first_measurement, qubits[is_measurement], positions[is_measurement])
+    offending = checked[codes][positions] & (positions > first_measurement[qubits])
+    errors = []
+    for index in np.unique(items[positions[offending]]):
+        item = circuit.data[index]
+        errors.append(
+            QubitUseAfterMeasurementError(
+                circuit, item.operation, item.qubits, item.clbits, profile
+            )
+        )
+    return errors
+
+
+def analyze(
+    circuits: Union[QuantumCircuit, Iterable[QuantumCircuit]],
+    profile: str = "AdaptiveExecution",
+    visitor_class: Type[BasicQisVisitor] = BasicQisVisitor,
+) -> List[CircuitAnalysis]:
+    """Checks the circuits against the profile without translating them.
+
+    Reports for each circuit the capability violations and unsupported
+    instructions that translation would fail on, the qubits and results
+    its entry point requires, the number of each emitted gate and the
+    deepest branch nesting. No pyqir context or module is created, so this
+    is much cheaper than translating. Instructions are lowered as by
+    ``visitor_class``, e.g. a subclass with handlers of its own.
+    """
+    if isinstance(circuits, QuantumCircuit):
+        circuits = [circuits]
+    composites = CompositeCache()
+    return [
+        _analyze_circuit(circuit, profile, composites, visitor_class)
+        for circuit in circuits
+    ]
@@ -0,0 +1,231 @@
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import (
+    Any,
+    AsyncIterator,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
+
+from pyqir import Context, Module
+from qiskit.circuit.quantumcircuit import QuantumCircuit
+
+from qiskit_qir.linker import ModuleLinker
+from qiskit_qir.output import QirOutput
+from qiskit_qir.parallel import _chunks, _translate_chunk
+from qiskit_qir.pipeline import SerialNames, TranslationStats
+
+_log = logging.getLogger(name=__name__)
+
+
+def _link_chunk(
+    linker: ModuleLinker, bitcode: bytes, renames: Dict[str, str]
+) -> List[str]:
+    """Adds the module of a translated chunk to the linker and returns the
+    names of its entry points."""
+    ir = str(Module.from_bitcode(Context(), bitcode))
+    return linker.add(ir, renames)
+
+
+def _link_bitcode(linker: ModuleLinker, name: str, verify: bool) -> Tuple[bytes, float]:
+    """Parses the linked IR, verifies it if requested and returns the
+    bitcode with the time spent verifying.
+
+    pyqir objects cannot cross threads, so only the bitcode is returned;
+    the module is rebuilt from it when it is first requested.
+    """
+    llvm_module = Module.from_ir(Context(), linker.ir(), name)
+    seconds = 0.0
+    if verify:
+        start = time.perf_counter()
+        err = llvm_module.verify()
+        seconds = time.perf_counter() - start
+        if err is not None:
+            raise Exception(err)
+    return (llvm_module.bitcode, seconds)
+
+
+class AsyncTranslation:
+    """A translation running off the event loop.
+
+    Iterating with ``async for`` yields the entry point names as circuits
+    are translated, in input order. Awaiting the translation, before,
+    during or after iterating, returns the module and all entry point
+    names, like ``to_qir_module``.
+
+    Cancelling the awaiting task, or closing the translation with
+    :meth:`aclose` (also done when leaving ``async with``), stops
+    submitting circuits, cancels the translations not yet started and
+    releases the partially linked module.
+
+    The translated chunks are parsed and linked on a dedicated thread, so
+    the event loop only coordinates. The linked module is kept as bitcode
+    and only parsed into a ``pyqir.Module`` when it is requested.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        circuits: Iterable[QuantumCircuit],
+        profile: str,
+        executor: Optional[Executor],
+        workers: Optional[int],
+        chunksize: int,
+        stats: TranslationStats,
+        kwargs: Dict[str, Any],
+    ):
+        self._name = name
+        self._entry_points: List[str] = []
+        self._module: Optional[Module] = None
+        self._bitcode: Optional[bytes] = None
+        self._stats = stats
+        self._generator = self._translate(
+            name, circuits, profile, executor, workers, chunksize, kwargs
+        )
+
+    @property
+    def entry_points(self) -> List[str]:
+        """The entry point names produced so far."""
+        return self._entry_points
+
+    def __aiter__(self) -> AsyncIterator[str]:
+        return self
+
+    async def __anext__(self) -> str:
+        return await self._generator.__anext__()
+
+    async def result(self) -> Tuple[Module, List[str]]:
+        """Completes the translation and returns the module and the list of
+        entry point names."""
+        async for _ in self:
+            pass
+        if self._bitcode is None:
+            raise RuntimeError("The translation was closed before completing")
+        if self._module is None:
+            self._module = Module.from_bitcode(Context(), self._bitcode, self._name)
+        return (self._module, self._entry_points)
+
+    async def output(self) -> QirOutput:
+        """Completes the translation and returns it as a ``QirOutput``,
+        reusing the bitcode serialized off the event loop. The module is
+        only parsed from the bitcode when the output's module is used."""
+        async for _ in self:
+            pass
+        if self._bitcode is None:
+            raise RuntimeError("The translation was closed before completing")
+        return QirOutput(
+            self._module, self._entry_points, self._bitcode, name=self._name
+        )
+
+    def __await__(self):
+        return self.result().__await__()
+
+    async def aclose(self) -> None:
+        """Stops the translation and releases its resources."""
+        await self._generator.aclose()
+
+    async def __aenter__(self) -> "AsyncTranslation":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def _translate(
+        self,
+        name: str,
+        circuits: Iterable[QuantumCircuit],
+        profile: str,
+        executor: Optional[Executor],
+        workers: Optional[int],
+        chunksize: int,
+        kwargs: Dict[str, Any],
+    ) -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        owned = executor is None and workers is not None
+        if owned:
+            executor = ProcessPoolExecutor(max_workers=workers)
+        if workers is None:
+            workers = getattr(executor, "_max_workers", None) or os.cpu_count() or 1
+        verify = kwargs.get("verify", "module")
+        names = SerialNames(name)
+        linker = ModuleLinker(name)
+        # A single thread keeps the linker's state ordered without locking.
+        linking = ThreadPoolExecutor(max_workers=1)
+        pending: Deque[asyncio.Future] = deque()
+        first_index = 0
+        try:
+            # Chunks are submitted one at a time; control returns to the
+            # event loop while each of them is translated.
+            for chunk in _chunks(circuits, chunksize):
+                pending.append(
+                    loop.run_in_executor(
+                        executor,
+                        _translate_chunk,
+                        name,
+                        chunk,
+                        profile,
+                        first_index,
+                        kwargs,
+                    )
+                )
+                first_index += len(chunk)
+                del chunk
+                if len(pending) >= 2 * workers:
+                    for entry_point in await self._link(
+                        loop, linking, linker, names, await pending.popleft()
+                    ):
+                        yield entry_point
+            while pending:
+                for entry_point in await self._link(
+                    loop, linking, linker, names, await pending.popleft()
+                ):
+                    yield entry_point
+
+            if len(self._entry_points) == 0:
+                raise ValueError("No QuantumCircuits provided")
+            bitcode, seconds = await loop.run_in_executor(
+                linking, _link_bitcode, linker, name, verify == "module"
+            )
+            if verify == "module":
+                self._stats.verify_seconds += seconds
+                self._stats.verified_entry_points = self._stats.entry_points
+            self._bitcode = bitcode
+            _log.debug(f"Linked {len(self._entry_points)} entry points")
+        finally:
+            for future in pending:
+                future.cancel()
+            linking.shutdown(wait=False)
+            if self._bitcode is None:
+                _log.debug(
+                    f"Translation stopped after {len(self._entry_points)} entry points"
+                )
+            if owned:
+                executor.shutdown(wait=False)
+
+    async def _link(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        linking: Executor,
+        linker: ModuleLinker,
+        names: SerialNames,
+        result: Tuple[bytes, List[Any], TranslationStats],
+    ) -> List[str]:
+        bitcode, records, chunk_stats = result
+        self._stats.merge(chunk_stats)
+        entry_points = await loop.run_in_executor(
+            linking, _link_chunk, linker, bitcode, names.assign(records)
+        )
+        self._entry_points.extend(entry_points)
+        return entry_points
@@ -0,0 +1,204 @@
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+import hashlib
+import json
+import logging
+import os
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+from importlib.metadata import PackageNotFoundError, version
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from qiskit.circuit.quantumcircuit import QuantumCircuit
+
+from qiskit_qir import __version__
+from qiskit_qir.composites import _hash_circuit, _hash_value
+
+_log = logging.getLogger(name=__name__)
+
+_FILE_SUFFIX = ".qirc"
+_HEADER = struct.Struct("<I")
+
+CacheEntry = Tuple[bytes, List[str]]
+
+
+def _package_version(name: str) -> str:
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return "unknown"
+
+
+# Entries are only reused by the versions that produced them.
+_VERSIONS = (__version__, _package_version("pyqir"), _package_version("qiskit"))
+
+
+def translation_key(
+    circuits: Sequence[QuantumCircuit], profile: str, options: Dict[str, Any]
+) -> str:
+    """Returns a canonical hash of the circuit contents, the profile and the
+    translation options, which identifies the translation result."""
+    hasher = hashlib.sha256()
+    hasher.update(repr((_VERSIONS, profile)).encode())
+    for name, value in sorted(options.items()):
+        hasher.update(name.encode())
+        _hash_value(hasher, value)
+    for circuit in circuits:
+        _hash_circuit(hasher, circuit, named=True)
+    return hasher.hexdigest()
+
+
+class TranslationCache:
+    """Content-addressed cache of translated modules.
+
+    Entries hold the bitcode and entry point names of a translation. The
+    in-process tier keeps the ``max_entries`` most recently used entries.
+    The optional on-disk tier stores one file per entry in ``directory``
+    and evicts the least recently used files once they exceed
+    ``max_disk_bytes``. Files are written atomically, so a directory can be
+    shared by several processes.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 128,
+        directory: Optional[str] = None,
+        max_disk_bytes: int = 256 * 1024 * 1024,
+    ):
+        self._max_entries = max_entries
+        self._directory = directory
+        self._max_disk_bytes = max_disk_bytes
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.memory_evictions = 0
+        self.disk_evictions = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    @property
+    def hits(self) -> int:
+        return self.memory_hits + self.disk_hits
+
+    @property
+    def evictions(self) -> int:
+        return self.memory_evictions + self.disk_evictions
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "memory_evictions": self.memory_evictions,
+            "disk_evictions": self.disk_evictions,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return entry
+        entry = self._read(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, entry)
+        return entry
+
+    def put(self, key: str, bitcode: bytes, entry_points: List[str]) -> None:
+        entry = (bitcode, list(entry_points))
+        with self._lock:
+            self._remember(key, entry)
+        self._write(key, entry)
+
+    def clear(self) -> None:
+        """Empties the in-process tier. The on-disk tier is left untouched."""
+        with self._lock:
+            self._entries.clear()
+
+    def _remember(self, key: str, entry: CacheEntry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self.memory_evictions += 1
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._directory, key + _FILE_SUFFIX)
+
+    def _read(self, key: str) -> Optional[CacheEntry]:
+        if self._directory is None:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+            os.utime(path)
+        except OSError:
+            return None
+        try:
+            (size,) = _HEADER.unpack_from(data)
+            header = json.loads(data[_HEADER.size : _HEADER.size + size])
+            bitcode = data[_HEADER.size + size :]
+        except (struct.error, ValueError):
+            _log.warning(f"Ignoring corrupt cache entry '{path}'")
+            return None
+        return (bitcode, header["entry_points"])
+
+    def _write(self, key: str, entry: CacheEntry) -> None:
+        if self._directory is None:
+            return
+        bitcode, entry_points = entry
+        header = json.dumps({"entry_points": entry_points}).encode()
+        fd, temp_path = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(_HEADER.pack(len(header)))
+                file.write(header)
+                file.write(bitcode)
+            os.replace(temp_path, self._path(key))
+        except OSError:
+            _log.warning(f"Could not write cache entry for '{key}'")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        self._trim()
+
+    def _trim(self) -> None:
+        files = []
+        total = 0
+        for entry in os.scandir(self._directory):
+            if not entry.name.endswith(_FILE_SUFFIX):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime_ns, stat.st_size, entry.path))
+            total += stat.st_size
+        files.sort()
+        for _, size, path in files:
+            if total <= self._max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self.disk_evictions += 1
@@ -7,6 +7,7 @@ import os
 from typing import Dict, List, Union
 from qiskit import ClassicalRegister, QuantumCircuit, QuantumRegister
 from qiskit.circuit import Qubit, Clbit
+from qiskit.circuit.classical import expr
 from qiskit.circuit.instruction import Instruction
 
 
@@ -14,7 +15,12 @@ class Capability(Flag):
     NONE = 0
     CONDITIONAL_BRANCHING_ON_RESULT = auto()
     QUBIT_USE_AFTER_MEASUREMENT = auto()
-    ALL = CONDITIONAL_BRANCHING_ON_RESULT | QUBIT_USE_AFTER_MEASUREMENT
+    INTEGER_COMPUTATIONS = auto()
+    ALL = (
+        CONDITIONAL_BRANCHING_ON_RESULT
+        | QUBIT_USE_AFTER_MEASUREMENT
+        | INTEGER_COMPUTATIONS
+    )
 
 
 class CapabilityError(Exception):
@@ -45,7 +51,9 @@ class CapabilityError(Exception):
         gate_params = ",".join(["param(%s)" % bit_labels[c] for c in cargs])
         qubit_params = ",".join(["%s" % bit_labels[q] for q in qargs])
         instruction_name = instruction.name
-        if instruction.condition is not None:
+        if isinstance(instruction.condition, expr.Expr):
+            instruction_name = "if(%s) %s" % (instruction.condition, instruction_name)
+        elif instruction.condition is not None:
             # condition should be a
             # - tuple (ClassicalRegister, int)
             # - tuple (Clbit, bool)
@@ -91,11 +99,18 @@ class ConditionalBranchingOnResultError(CapabilityError):
         self.msg_suffix = "Support for branching based on measurement requires Capability.CONDITIONAL_BRANCHING_ON_RESULT"
         self.msg = f"Attempted to branch on register value.{os.linesep}Instruction: {instruction_string}{os.linesep}{self.msg_suffix}"
         CapabilityError.__init__(self, self.msg)
+        self.circuit = circuit
         self.instruction = instruction
         self.qargs = qargs
         self.cargs = cargs
         self.profile = profile
 
+    def __reduce__(self):
+        return (
+            self.__class__,
+            (self.circuit, self.instruction, self.qargs, self.cargs, self.profile),
+        )
+
 
 class QubitUseAfterMeasurementError(CapabilityError):
     def __init__(
@@ -116,7 +131,14 @@ class QubitUseAfterMeasurementError(CapabilityError):
         )
         self.msg = f"Qubit was used after being measured.{os.linesep}Instruction: {instruction_string}{os.linesep}{self.msg_suffix}"
         CapabilityError.__init__(self, self.msg)
+        self.circuit = circuit
         self.instruction = instruction
         self.qargs = qargs
         self.cargs = cargs
         self.profile = profile
+
+    def __reduce__(self):
+        return (
+            self.__class__,
+            (self.circuit, self.instruction, self.qargs, self.cargs, self.profile),
+        )
@@ -0,0 +1,308 @@
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from qiskit import qpy
+
+from qiskit_qir import __version__
+from qiskit_qir.translate import to_qir_output
+
+_log = logging.getLogger(name=__name__)
+
+MANIFEST_NAME = "manifest.json"
+_QPY_SUFFIX = ".qpy"
+
+
+def _find_inputs(
+    paths: Sequence[str], output_dir: str, suffix: str
+) -> Iterator[Tuple[str, str]]:
+    """Yields the QPY files to translate with their output paths. Files
+    found in a directory keep their relative location under the output
+    directory.
+
+    Raises ``ValueError`` if two inputs would be written to the same output,
+    e.g. files with the same name given from different directories. An input
+    given more than once is only yielded once.
+    """
+    found: Dict[str, str] = {}
+    for input_path, output_path in _output_paths(paths, output_dir, suffix):
+        key = os.path.normcase(os.path.normpath(output_path))
+        other = found.get(key)
+        if other is None:
+            found[key] = input_path
+            yield (input_path, output_path)
+        elif not os.path.samefile(other, input_path):
+            raise ValueError(
+                f"'{other}' and '{input_path}' would both be written to "
+                f"'{output_path}'"
+            )
+
+
+def _output_paths(
+    paths: Sequence[str], output_dir: str, suffix: str
+) -> Iterator[Tuple[str, str]]:
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for file_name in sorted(files):
+                    if file_name.endswith(_QPY_SUFFIX):
+                        input_path = os.path.join(root, file_name)
+                        relative = os.path.relpath(input_path, path)
+                        yield (
+                            input_path,
+                            os.path.join(
+                                output_dir, relative[: -len(_QPY_SUFFIX)] + suffix
+                            ),
+                        )
+        elif os.path.isfile(path):
+            stem = os.path.splitext(os.path.basename(path))[0]
+            yield (path, os.path.join(output_dir, stem + suffix))
+        else:
+            raise FileNotFoundError(f"No such file or directory: '{path}'")
+
+
+def _translate_file(
+    input_path: str,
+    output_path: str,
+    profile: str,
+    options: Dict[str, Any],
+    emit: str,
+) -> Dict[str, Any]:
+    """Translates a QPY file and writes the output atomically.
+
+    Runs in a worker process, so everything it returns must be picklable.
+    """
+    start = time.perf_counter()
+    with open(input_path, "rb") as file:
+        circuits = qpy.load(file)
+    output = to_qir_output(circuits, profile, **options)
+    write = output.write_ir if emit == "ir" else output.write_bitcode
+    size = _write_atomically(output_path, write)
+    return {
+        "input": input_path,
+        "circuits": len(circuits),
+        "entry_points": output.entry_points,
+        "bytes": size,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def _write_atomically(path: str, write: Callable[[BinaryIO], Any]) -> Any:
+    """Calls ``write`` on a temporary file replacing ``path`` once written,
+    so that readers never see a partial file."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            result = write(file)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return result
+
+
+def _load_manifest(path: str) -> Dict[str, Dict[str, Any]]:
+    try:
+        with open(path) as file:
+            return json.load(file)["outputs"]
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def _is_up_to_date(
+    input_path: str,
+    output_path: str,
+    entry: Optional[Dict[str, Any]],
+    settings: Dict[str, Any],
+) -> bool:
+    if entry is None or entry.get("input") != input_path:
+        return False
+    if entry.get("settings") != settings:
+        return False
+    try:
+        return os.path.getmtime(output_path) >= os.path.getmtime(input_path)
+    except OSError:
+        return False
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="qiskit-qir",
+        description="Translate Qiskit circuits stored in QPY files to QIR. "
+        "Each QPY file becomes one module holding an entry point per circuit. "
+        "Files are translated in parallel, and outputs newer than their input "
+        "and produced with the same options are not translated again.",
+        epilog=f"A {MANIFEST_NAME} in the output directory lists the input, "
+        "options and entry point names of every output.",
+    )
+    parser.add_argument(
+        "inputs", nargs="+", help="QPY files, or directories searched for *.qpy files"
+    )
+    parser.add_argument(
+        "-o", "--output-dir", default=".", help="directory receiving the QIR files"
+    )
+    parser.add_argument(
+        "-p", "--profile", default="AdaptiveExecution", help="target QIR profile"
+    )
+    parser.add_argument(
+        "--emit",
+        choices=["bitcode", "ir"],
+        default="bitcode",
+        help="write bitcode (.bc) or textual IR (.ll) files",
+    )
+    parser.add_argument(
+        "--no-record-output",
+        dest="record_output",
+        action="store_false",
+        help="do not emit output recording calls",
+    )
+    parser.add_argument(
+        "--emit-barrier-calls", action="store_true", help="emit barrier calls"
+    )
+    parser.add_argument(
+        "-O",
+        "--optimization-level",
+        type=int,
+        choices=[0, 1],
+        default=0,
+        help="1 cancels and merges adjacent single qubit gates, default 0",
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=None,
+        help="number of worker processes, default: one per CPU",
+    )
+    parser.add_argument(
+        "-f", "--force", action="store_true", help="translate up to date outputs too"
+    )
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="do not print throughput statistics"
+    )
+    parser.add_argument("--version", action="version", version=__version__)
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = _parser().parse_args(argv)
+    suffix = ".ll" if args.emit == "ir" else ".bc"
+    options = {
+        "record_output": args.record_output,
+        "emit_barrier_calls": args.emit_barrier_calls,
+        "optimization_level": args.optimization_level,
+    }
+    settings = dict(options, profile=args.profile, emit=args.emit, version=__version__)
+
+    manifest_path = os.path.join(args.output_dir, MANIFEST_NAME)
+    outputs = _load_manifest(manifest_path)
+    pending: List[Tuple[str, str]] = []
+    skipped = 0
+    try:
+        for input_path, output_path in _find_inputs(
+            args.inputs, args.output_dir, suffix
+        ):
+            key = os.path.relpath(output_path, args.output_dir)
+            entry = outputs.get(key)
+            if not args.force and _is_up_to_date(
+                input_path, output_path, entry, settings
+            ):
+                skipped += 1
+            else:
+                pending.append((input_path, output_path))
+    except (FileNotFoundError, ValueError) as err:
+        print(f"qiskit-qir: {err}", file=sys.stderr)
+        return 2
+
+    start = time.perf_counter()
+    results = []
+    failures = 0
+    if pending:
+        workers = args.workers or os.cpu_count() or 1
+        workers = min(workers, len(pending))
+        if workers == 1:
+            jobs = [
+                (paths, _run(_translate_file, *paths, args.profile, options, args.emit))
+                for paths in pending
+            ]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    (
+                        paths,
+                        executor.submit(
+                            _translate_file, *paths, args.profile, options, args.emit
+                        ),
+                    )
+                    for paths in pending
+                ]
+                jobs = [(paths, _run(future.result)) for paths, future in futures]
+        for (input_path, output_path), (result, err) in jobs:
+            if err is not None:
+                failures += 1
+                print(
+                    f"qiskit-qir: failed to translate '{input_path}': {err}",
+                    file=sys.stderr,
+                )
+                continue
+            _log.debug(f"Translated '{input_path}' in {result['seconds']:.3f}s")
+            results.append(result)
+            key = os.path.relpath(output_path, args.output_dir)
+            outputs[key] = {
+                "input": input_path,
+                "settings": settings,
+                "entry_points": result["entry_points"],
+                "bytes": result["bytes"],
+            }
+    elapsed = time.perf_counter() - start
+
+    manifest = json.dumps(
+        {"version": __version__, "outputs": outputs}, indent=2, sort_keys=True
+    )
+    _write_atomically(manifest_path, lambda file: file.write(manifest.encode()))
+
+    if not args.quiet:
+        circuits = sum(result["circuits"] for result in results)
+        size = sum(result["bytes"] for result in results)
+        per_second = 1 / elapsed if elapsed > 0 else 0.0
+        print(
+            f"Translated {len(results)} files ({circuits} circuits, {size} bytes) "
+            f"in {elapsed:.2f}s: {circuits * per_second:.1f} circuits/s, "
+            f"{size * per_second / 1e6:.2f} MB/s; "
+            f"{skipped} up to date, {failures} failed"
+        )
+    return 1 if failures else 0
+
+
+def _run(function, *args) -> Tuple[Optional[Dict[str, Any]], Optional[BaseException]]:
+    try:
+        return (function(*args), None)
+    except Exception as err:
+        return (None, err)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+import hashlib
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+from qiskit.circuit import (
+    ClassicalRegister,
+    Clbit,
+    ControlFlowOp,
+    Delay,
+    ParameterExpression,
+    QuantumCircuit,
+    SwitchCaseOp,
+)
+from qiskit.circuit.classical import expr
+from qiskit.circuit.instruction import Instruction
+from qiskit.circuit.library import get_standard_gate_name_mapping
+
+# The primitive operations a composite instruction expands to, each with
+# the positions of its qubits and classical bits among the operands of the
+# composite instruction.
+Expansion = List[Tuple[Instruction, Tuple[int, ...], Tuple[int, ...]]]
+
+# The classes of the standard library gates, whose definition only depends
+# on their parameters.
+_STANDARD_GATES = {
+    name: gate.base_class for name, gate in get_standard_gate_name_mapping().items()
+}
+
+
+def _defined_by_content(instruction: Instruction) -> bool:
+    """Whether the definition of the instruction is not determined by its
+    name and parameters, as for custom gates and gates built from a user
+    circuit or operator."""
+    if isinstance(instruction, ControlFlowOp):
+        return False
+    return _STANDARD_GATES.get(instruction.name) is not instruction.base_class
+
+
+def _hash_value(hasher, value: Any) -> None:
+    if isinstance(value, QuantumCircuit):
+        _hash_circuit(hasher, value)
+    elif isinstance(value, ParameterExpression):
+        hasher.update(b"P" + str(value).encode())
+    elif isinstance(value, np.ndarray):
+        hasher.update(b"A" + str(value.shape).encode() + value.tobytes())
+    elif isinstance(value, (list, tuple)):
+        hasher.update(b"L%d" % len(value))
+        for item in value:
+            _hash_value(hasher, item)
+    else:
+        hasher.update(b"V" + repr(value).encode())
+
+
+def _bit_key(circuit: QuantumCircuit, target: Any) -> Any:
+    if isinstance(target, Clbit):
+        return circuit.find_bit(target).index
+    if isinstance(target, ClassicalRegister):
+        return (target.name, target.size)
+    return repr(target)
+
+
+def _expr_key(circuit: QuantumCircuit, value: expr.Expr) -> Any:
+    """A key of a classical expression naming bits by their index."""
+    if isinstance(value, expr.Var):
+        return ("var", _bit_key(circuit, value.var))
+    if isinstance(value, expr.Value):
+        return ("value", value.value)
+    if isinstance(value, expr.Unary):
+        return (value.op.name, _expr_key(circuit, value.operand))
+    if isinstance(value, expr.Binary):
+        return (
+            value.op.name,
+            _expr_key(circuit, value.left),
+            _expr_key(circuit, value.right),
+        )
+    if isinstance(value, expr.Cast):
+        return ("cast", repr(value.type), _expr_key(circuit, value.operand))
+    return repr(value)
+
+
+def _hash_circuit(hasher, circuit: QuantumCircuit, named: bool = False) -> None:
+    """Hashes the content of the circuit. The names of nested circuits,
+    often generated, do not change their translation, so only ``named``
+    circuits hash their name."""
+    name = circuit.name if named else None
+    hasher.update(repr((name, circuit.num_qubits, circuit.num_clbits)).encode())
+    for registers in (circuit.qregs, circuit.cregs):
+        hasher.update(repr([(r.name, r.size) for r in registers]).encode())
+    for item in circuit.data:
+        instruction = item.operation
+        # Instruction.duration, unit and condition are deprecated, but are
+        # still set by scheduling and c_if. Delays keep their public unit
+        # and hold their duration in their parameters.
+        if isinstance(instruction, Delay):
+            timing = (None, instruction.unit)
+        else:
+            timing = (
+                getattr(instruction, "_duration", None),
+                getattr(instruction, "_unit", None),
+            )
+        hasher.update(
+            repr(
+                (
+                    instruction.name,
+                    [circuit.find_bit(q).index for q in item.qubits],
+                    [circuit.find_bit(c).index for c in item.clbits],
+                )
+                + timing
+            ).encode()
+        )
+        _hash_value(hasher, instruction.params)
+        condition = getattr(instruction, "_condition", None)
+        if isinstance(condition, expr.Expr):
+            hasher.update(repr(("if", _expr_key(circuit, condition))).encode())
+        elif condition is not None:
+            target, value = condition
+            hasher.update(repr(("if", _bit_key(circuit, target), value)).encode())
+        if isinstance(instruction, SwitchCaseOp):
+            # The blocks are the only parameters of a switch.
+            target = instruction.target
+            if isinstance(target, expr.Expr):
+                target = _expr_key(circuit, target)
+            else:
+                target = _bit_key(circuit, target)
+            cases = [
+                tuple(map(str, values)) for values, _ in instruction.cases_specifier()
+            ]
+            hasher.update(repr(("switch", target, cases)).encode())
+        if _defined_by_content(instruction):
+            definition = instruction.definition
+            if definition is not None:
+                _hash_circuit(hasher, definition)
+
+
+class CompositeCache:
+    """Flattened expansions of composite instructions.
+
+    Expansions are keyed by instruction name, parameters and arity, so the
+    definition of a custom gate is mapped and flattened once however many
+    times the gate is applied. Instructions other than standard library
+    gates are also keyed by the content of their definition, since distinct
+    definitions may share a name and parameters, e.g. the evolutions of
+    different operators. ``hits`` counts the expansions replayed from the
+    cache and ``misses`` the expansions built.
+
+    The cache keeps the ``max_entries`` most recently used expansions, so
+    that a stream of circuits with gates of their own translates in
+    bounded memory. Definitions are not kept alive by the cache.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self._max_entries = max_entries
+        self._expansions: "OrderedDict[Hashable, Expansion]" = OrderedDict()
+        # Digests of the live definitions keyed so far, by id. An entry is
+        # dropped when its definition is collected, so ids are not reused.
+        self._digests: Dict[int, Tuple[weakref.ref, str]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def key(
+        self, instruction: Instruction, num_qubits: int, num_clbits: int
+    ) -> Optional[Hashable]:
+        """The cache key of the instruction applied to that many qubits and
+        classical bits, or ``None`` if its parameters are not hashable."""
+        key = (instruction.name, tuple(instruction.params), num_qubits, num_clbits)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        if _defined_by_content(instruction):
+            definition = instruction.definition
+            if definition is not None:
+                key += (self._digest(definition),)
+        return key
+
+    def _digest(self, definition: QuantumCircuit) -> str:
+        entry = self._digests.get(id(definition))
+        if entry is not None and entry[0]() is definition:
+            return entry[1]
+        hasher = hashlib.sha256()
+        _hash_circuit(hasher, definition)
+        digest = hasher.hexdigest()
+        number = id(definition)
+        digests = self._digests
+
+        def _forget(ref: weakref.ref) -> None:
+            if digests.get(number, (None,))[0] is ref:
+                del digests[number]
+
+        digests[number] = (weakref.ref(definition, _forget), digest)
+        return digest
+
+    def get(self, key: Optional[Hashable]) -> Optional[Expansion]:
+        expansion = self._expansions.get(key) if key is not None else None
+        if expansion is None:
+            return None
+        self._expansions.move_to_end(key)
+        self.hits += 1
+        return expansion
+
+    def store(self, key: Optional[Hashable], expansion: Expansion) -> None:
+        self.misses += 1
+        if key is not None:
+            self._expansions[key] = expansion
+            self._expansions.move_to_end(key)
+            while len(self._expansions) > self._max_entries:
+                self._expansions.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._expansions)
@@ -0,0 +1,43 @@
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+from typing import Dict
+
+import pyqir
+from pyqir import Context, Value
+
+
+class ConstantPool:
+    """Qubit and result pointer constants of an LLVM context.
+
+    Each constant is built once and returned again on later requests, for
+    every instruction and every circuit translated into modules of the
+    context. ``hits`` counts the requests served from the pool and
+    ``misses`` the constants built.
+    """
+
+    def __init__(self, context: Context):
+        self._context = context
+        self._qubits: Dict[int, Value] = {}
+        self._results: Dict[int, Value] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def qubit(self, n: int) -> Value:
+        value = self._qubits.get(n)
+        if value is None:
+            value = self._qubits[n] = pyqir.qubit(self._context, n)
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def result(self, n: int) -> Value:
+        value = self._results.get(n)
+        if value is None:
+            value = self._results[n] = pyqir.result(self._context, n)
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
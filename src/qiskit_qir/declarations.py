@@ -0,0 +1,60 @@
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+from typing import Dict, Hashable, Optional
+
+from pyqir import Function, FunctionType, Linkage, Module
+
+
+class DeclarationRegistry:
+    """External functions declared in a module, and internal functions
+    defined by the translation.
+
+    Each function is declared once and returned again on later requests,
+    for every circuit translated into the module. A function the module
+    already declares, e.g. through the pyqir ``qis`` helpers, is reused:
+    declaring it again would make LLVM rename the new declaration.
+    Internal functions are keyed by what they compute rather than by name.
+    """
+
+    def __init__(self, module: Module):
+        self._module = module
+        self._functions: Dict[str, Function] = {}
+        self._definitions: Dict[Hashable, Function] = {}
+
+    def declare(self, name: str, function_type: FunctionType) -> Function:
+        function = self._functions.get(name)
+        if function is None:
+            for existing in self._module.functions:
+                if existing.name == name:
+                    function = existing
+                    break
+            else:
+                function = Function(function_type, Linkage.EXTERNAL, name, self._module)
+            self._functions[name] = function
+        return function
+
+    def definition(self, key: Hashable) -> Optional[Function]:
+        """The internal function defined for ``key``, if any."""
+        return self._definitions.get(key)
+
+    def define(self, key: Hashable, name: str, function_type: FunctionType) -> Function:
+        """Adds an internal function for ``key`` and returns it for the
+        caller to emit its body. A serial number is appended to ``name``, as
+        LLVM renaming a clashing name would also change the names it later
+        gives to entry points."""
+        function = Function(
+            function_type,
+            Linkage.INTERNAL,
+            f"{name}_{len(self._definitions)}",
+            self._module,
+        )
+        self._definitions[key] = function
+        return function
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._functions
+
+    def __len__(self) -> int:
+        return len(self._functions)
@@ -9,6 +9,15 @@ from qiskit.circuit.bit import Bit
 from qiskit.circuit.quantumcircuit import QuantumCircuit, Instruction
 from abc import ABCMeta, abstractmethod
 
+from qiskit_qir.passes import (
+    InstructionTriple,
+    Repeat,
+    check_optimization_level,
+    find_repeats,
+    fuse_measure_reset,
+    peephole,
+)
+
 
 class _QuantumCircuitElement(metaclass=ABCMeta):
     @classmethod
@@ -38,6 +47,15 @@ class _Instruction(_QuantumCircuitElement):
         visitor.visit_instruction(self._instruction, self._qargs, self._cargs)
 
 
+class _Repeat(_QuantumCircuitElement):
+    def __init__(self, count: int, instructions: List[InstructionTriple]):
+        self._count = count
+        self._instructions = instructions
+
+    def accept(self, visitor):
+        visitor.visit_repeat(self._count, self._instructions)
+
+
 class QiskitModule:
     def __init__(
         self,
@@ -48,6 +66,9 @@ class QiskitModule:
         num_clbits: int,
         reg_sizes: List[int],
         elements: List[_QuantumCircuitElement],
+        removed_gates: int = 0,
+        fused_measure_resets: int = 0,
+        instruction_count: int = 0,
     ):
         self._circuit = circuit
         self._name = name
@@ -56,6 +77,12 @@ class QiskitModule:
         self._num_qubits = num_qubits
         self._num_clbits = num_clbits
         self.reg_sizes = reg_sizes
+        # Gates removed by optimization passes.
+        self.removed_gates = removed_gates
+        # Measurements fused with the reset following them.
+        self.fused_measure_resets = fused_measure_resets
+        # Instructions left after the optimization passes.
+        self.instruction_count = instruction_count
 
     @property
     def circuit(self) -> QuantumCircuit:
@@ -79,9 +106,22 @@ class QiskitModule:
 
     @classmethod
     def from_quantum_circuit(
-        cls, circuit: QuantumCircuit, module: Optional[Module] = None
+        cls,
+        circuit: QuantumCircuit,
+        module: Optional[Module] = None,
+        optimization_level: int = 0,
+        fuse_measure_resets: bool = False,
+        loop_threshold: Optional[int] = None,
     ) -> "QiskitModule":
-        """Create a new QiskitModule from a qiskit.QuantumCircuit object."""
+        """Create a new QiskitModule from a qiskit.QuantumCircuit object.
+
+        With an ``optimization_level`` of 1, the instructions go through
+        the peephole pass of ``qiskit_qir.passes``. With
+        ``fuse_measure_resets``, measurements followed by a reset of the
+        same qubit are fused. With a ``loop_threshold``, consecutive
+        repetitions of instructions covering at least that many
+        instructions are visited as a repeat.
+        """
         elements: List[_QuantumCircuitElement] = []
         reg_sizes = [len(creg) for creg in circuit.cregs]
 
@@ -90,8 +130,24 @@ class QiskitModule:
         elements.extend(_Register.from_element_list(circuit.cregs))
 
         # Instructions
-        for instruction, qargs, cargs in circuit._data:
-            elements.append(_Instruction(instruction, qargs, cargs))
+        check_optimization_level(optimization_level)
+        instructions = circuit._data
+        removed_gates = 0
+        if optimization_level > 0:
+            instructions, removed_gates = peephole(instructions)
+        fused_measure_resets = 0
+        if fuse_measure_resets:
+            instructions, fused_measure_resets = fuse_measure_reset(instructions)
+        instruction_count = len(instructions)
+        if loop_threshold is not None:
+            for item in find_repeats(instructions, loop_threshold):
+                if isinstance(item, Repeat):
+                    elements.append(_Repeat(item.count, item.instructions))
+                else:
+                    elements.append(_Instruction(*item))
+        else:
+            for instruction, qargs, cargs in instructions:
+                elements.append(_Instruction(instruction, qargs, cargs))
 
         if module is None:
             module = Module(Context(), circuit.name)
@@ -103,6 +159,9 @@ class QiskitModule:
             num_clbits=circuit.num_clbits,
             reg_sizes=reg_sizes,
             elements=elements,
+            removed_gates=removed_gates,
+            fused_measure_resets=fused_measure_resets,
+            instruction_count=instruction_count,
         )
 
     def accept(self, visitor):
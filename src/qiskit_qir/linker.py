@@ -0,0 +1,213 @@
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+import re
+from typing import Dict, List, Optional, Tuple
+
+from pyqir import Context, Module
+
+from qiskit_qir import loops, switches
+
+# Global identifiers are either plain (`@name`) or quoted (`@"my name"`).
+_GLOBAL_REF = re.compile(r'@("(?:[^"\\]|\\.)*"|[-a-zA-Z$._0-9]+)')
+_ATTRIBUTE_GROUP = re.compile(r"^attributes #(\d+) = (.*)$")
+_ATTRIBUTE_REFS = re.compile(r"((?: #\d+)+)( \{)?$")
+# LLVM makes clashing names unique by appending `.<n>`.
+_UNIQUED_NAME = re.compile(r"^(.*)\.\d+$")
+
+
+def _unquote(name: str) -> str:
+    if name.startswith('"'):
+        return re.sub(
+            r"\\([0-9A-Fa-f]{2})", lambda m: chr(int(m.group(1), 16)), name[1:-1]
+        )
+    return name
+
+
+def _quote(name: str) -> str:
+    if re.fullmatch(r"[-a-zA-Z$._][-a-zA-Z$._0-9]*", name):
+        return name
+    escaped = "".join(
+        c if c.isprintable() and c not in '"\\' else "\\%02X" % ord(c) for c in name
+    )
+    return '"' + escaped + '"'
+
+
+def _global_name(line: str) -> str:
+    match = _GLOBAL_REF.search(line)
+    assert match is not None, f"No global name in '{line}'"
+    return _unquote(match.group(1))
+
+
+class _Function:
+    def __init__(self, name: str, lines: List[str]):
+        self.name = name
+        self.lines = lines
+
+
+class ModuleLinker:
+    """Links the textual IR of several QIR modules into a single module.
+
+    pyqir does not expose LLVM's module linker, so modules are combined at
+    the textual level: entry point definitions are appended in order,
+    external declarations are merged by name and attribute groups are
+    renumbered. Identical internal definitions are merged, and others are
+    renamed if their name is already taken. Loops and switches marked by
+    the visitor are lowered. The linked text is parsed back into a
+    ``pyqir.Module``.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._types: Dict[str, None] = {}
+        self._definitions: List[_Function] = []
+        # Linked names of the internal definitions, by text without name.
+        self._internal: Dict[str, str] = {}
+        self._internal_names: Dict[str, None] = {}
+        self._declarations: Dict[str, str] = {}
+        self._attributes: Dict[str, int] = {}
+        self._metadata: Optional[List[str]] = None
+
+    def add(self, ir: str, renames: Optional[Dict[str, str]] = None) -> List[str]:
+        """Adds the functions of the module ``ir`` to the linked module.
+
+        ``renames`` maps function names of ``ir`` to their name in the
+        linked module. Uniqued declarations (``name.<n>``) are folded back
+        onto the declaration they duplicate.
+
+        Returns the linked names of the functions defined by ``ir``, other
+        than internal functions.
+        """
+        definitions = self.extract(ir, renames)
+        for name, text in definitions:
+            self.define(name, text)
+        return [name for name, _ in definitions if name not in self._internal_names]
+
+    def extract(
+        self, ir: str, renames: Optional[Dict[str, str]] = None
+    ) -> List[Tuple[str, str]]:
+        """Adds the declarations, types and attributes of the module ``ir``
+        to the linked module and returns its function definitions as
+        ``(name, text)`` pairs, renamed and renumbered for the linked module,
+        without adding them.
+        """
+        renames = dict(renames or {})
+        groups: Dict[str, int] = {}
+        functions: List[_Function] = []
+        metadata: List[str] = []
+        lines = ir.splitlines()
+        index = 0
+        while index < len(lines):
+            line = lines[index]
+            index += 1
+            if line.startswith("define "):
+                body = [line]
+                while lines[index] != "}":
+                    body.append(lines[index])
+                    index += 1
+                body.append(lines[index])
+                index += 1
+                name = _global_name(line)
+                if switches.has_switches(body):
+                    body = switches.lower_switches(body)
+                if loops.has_loops(body):
+                    body = loops.lower_loops(body)
+                if line.startswith("define internal ") and not self._link_internal(
+                    name, body, renames
+                ):
+                    continue
+                functions.append(_Function(name, body))
+            elif line.startswith("declare "):
+                name = _global_name(line)
+                if loops.is_marker(name) or switches.is_marker(name):
+                    continue
+                match = _UNIQUED_NAME.match(name)
+                if match is not None and name not in renames:
+                    renames[name] = match.group(1)
+                functions.append(_Function(name, [line]))
+            elif line.startswith("attributes #"):
+                match = _ATTRIBUTE_GROUP.match(line)
+                content = match.group(2)
+                if content not in self._attributes:
+                    self._attributes[content] = len(self._attributes)
+                groups[match.group(1)] = self._attributes[content]
+            elif line.startswith("%") and " = type " in line:
+                self._types[line] = None
+            elif line.startswith("!"):
+                metadata.append(line)
+        if self._metadata is None:
+            self._metadata = metadata
+
+        def _rename(match: re.Match) -> str:
+            name = _unquote(match.group(1))
+            if name in renames:
+                return "@" + _quote(renames[name])
+            return match.group(0)
+
+        def _renumber(match: re.Match) -> str:
+            refs = " ".join("#%d" % groups[ref[1:]] for ref in match.group(1).split())
+            return " " + refs + (match.group(2) or "")
+
+        definitions = []
+        for function in functions:
+            lines = [_GLOBAL_REF.sub(_rename, line) for line in function.lines]
+            lines[0] = _ATTRIBUTE_REFS.sub(_renumber, lines[0])
+            name = renames.get(function.name, function.name)
+            if len(lines) == 1:
+                self._declarations.setdefault(name, lines[0])
+            else:
+                definitions.append((name, "\n".join(lines)))
+        return definitions
+
+    def _link_internal(
+        self, name: str, body: List[str], renames: Dict[str, str]
+    ) -> bool:
+        """Maps the internal function ``name`` to its linked name in
+        ``renames``. Returns whether the definition is new, rather than a
+        copy of one already linked."""
+        text = "\n".join([_GLOBAL_REF.sub("@", body[0], count=1)] + body[1:])
+        linked = self._internal.get(text)
+        new = linked is None
+        if new:
+            linked = name
+            suffix = 0
+            while linked in self._internal_names:
+                suffix += 1
+                linked = f"{name}.{suffix}"
+            self._internal[text] = linked
+            self._internal_names[linked] = None
+        if linked != name:
+            renames[name] = linked
+        return new
+
+    def define(self, name: str, text: str) -> None:
+        """Appends the function definition ``text`` named ``name``. The
+        text must already use the names and attribute groups of the linked
+        module, as returned by :meth:`extract`."""
+        self._definitions.append(_Function(name, [text]))
+
+    def ir(self) -> str:
+        lines = [
+            f"; ModuleID = '{self._name}'",
+            f'source_filename = "{self._name}"',
+            "",
+        ]
+        lines.extend(self._types)
+        lines.append("")
+        for function in self._definitions:
+            lines.extend(function.lines)
+            lines.append("")
+        for declaration in self._declarations.values():
+            lines.append(declaration)
+            lines.append("")
+        for content, group in self._attributes.items():
+            lines.append(f"attributes #{group} = {content}")
+        lines.append("")
+        lines.extend(self._metadata or [])
+        return "\n".join(lines) + "\n"
+
+    def link(self, context: Optional[Context] = None) -> Module:
+        if context is None:
+            context = Context()
+        return Module.from_ir(context, self.ir(), self._name)
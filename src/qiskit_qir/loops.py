@@ -0,0 +1,99 @@
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+import re
+from typing import Dict, List, Optional, Tuple
+
+# pyqir's builder cannot emit phi nodes, so the visitor marks the start
+# and the end of a counted loop with calls to these functions, and the
+# marked functions are rewritten into loops in their textual IR. Markers
+# name their loop by a number unique in the function, since the blocks of
+# nested branches do not appear in the order they are nested in.
+LOOP_BEGIN = "__qiskit_qir__loop_begin"
+LOOP_END = "__qiskit_qir__loop_end"
+# Computes an angle linear in the iteration count of an enclosing loop,
+# given the number of the loop, the angle step and the first angle.
+LOOP_ANGLE = "__qiskit_qir__loop_angle"
+
+_BEGIN = re.compile(r"^\s*call void @" + LOOP_BEGIN + r"\(i64 (\d+), i64 (-?\d+)\)$")
+_END = re.compile(r"^\s*call void @" + LOOP_END + r"\(i64 (\d+)\)$")
+_ANGLE = re.compile(
+    r"^\s*(%\S+) = call double @"
+    + LOOP_ANGLE
+    + r"\(i64 (\d+), double ([^,]+), double ([^)]+)\)$"
+)
+# Basic block labels, e.g. `entry:`, `3:` or `"my block":`.
+_LABEL = re.compile(r'^("(?:[^"\\]|\\.)*"|[-a-zA-Z$._0-9]+):')
+
+
+def has_loops(lines: List[str]) -> bool:
+    """Whether the function definition ``lines`` has loop markers."""
+    return any(LOOP_BEGIN in line for line in lines)
+
+
+def is_marker(name: str) -> bool:
+    """Whether ``name`` is a loop marker function."""
+    return name in (LOOP_BEGIN, LOOP_END, LOOP_ANGLE)
+
+
+def lower_loops(lines: List[str]) -> List[str]:
+    """Rewrites the marked loops of the function definition ``lines``.
+
+    The instructions between the markers become the body of a loop block
+    counting its iterations in a phi node, run the number of times given to
+    the begin marker. The body may branch; the back edge leaves the block
+    holding the end marker. Angles depending on the iteration count are
+    computed from the counter of their loop.
+    """
+    output: List[str] = []
+    # Per open loop, by number: the position of its phi node in the output,
+    # the label of the block entering it and its iteration count.
+    loops: Dict[str, Tuple[int, str, int]] = {}
+    angles = 0
+    block: Optional[str] = None
+    for line in lines:
+        label = _LABEL.match(line)
+        if label is not None:
+            block = "%" + label.group(1)
+            output.append(line)
+            continue
+        begin = _BEGIN.match(line)
+        if begin is not None:
+            assert block is not None, "Loop marker outside of a basic block"
+            name = f"loop.{begin.group(1)}"
+            output.append(f"  br label %{name}")
+            output.append("")
+            output.append(f"{name}:")
+            loops[name] = (len(output), block, int(begin.group(2)))
+            output.append("")
+            block = f"%{name}"
+            continue
+        angle = _ANGLE.match(line)
+        if angle is not None:
+            value, number, step, first = angle.groups()
+            name = f"loop.{number}"
+            count = f"%{name}.count.{angles}"
+            scaled = f"%{name}.scaled.{angles}"
+            angles += 1
+            output.append(f"  {count} = sitofp i64 %{name}.i to double")
+            output.append(f"  {scaled} = fmul double {count}, {step}")
+            output.append(f"  {value} = fadd double {scaled}, {first}")
+            continue
+        end = _END.match(line)
+        if end is not None:
+            name = f"loop.{end.group(1)}"
+            phi, entering, count = loops.pop(name)
+            output[phi] = (
+                f"  %{name}.i = phi i64 [ 0, {entering} ], [ %{name}.next, {block} ]"
+            )
+            output.append(f"  %{name}.next = add i64 %{name}.i, 1")
+            output.append(f"  %{name}.done = icmp eq i64 %{name}.next, {count}")
+            output.append(f"  br i1 %{name}.done, label %{name}.exit, label %{name}")
+            output.append("")
+            output.append(f"{name}.exit:")
+            block = f"%{name}.exit"
+            continue
+        output.append(line)
+    assert not loops, "Unterminated loop marker"
+    return output
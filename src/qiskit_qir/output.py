@@ -0,0 +1,123 @@
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+import os
+from typing import BinaryIO, Iterator, List, Optional, Union
+
+from pyqir import Context, Module
+
+# Number of IR characters encoded and written at a time.
+_IR_CHUNK = 1 << 20
+
+PathOrFile = Union[str, os.PathLike, int, BinaryIO]
+
+
+def _write(path_or_fd: PathOrFile, chunks: Iterator[memoryview]) -> int:
+    if hasattr(path_or_fd, "write"):
+        file = path_or_fd
+        close = False
+    elif isinstance(path_or_fd, int):
+        file = open(path_or_fd, "wb", closefd=False)
+        close = True
+    else:
+        file = open(path_or_fd, "wb")
+        close = True
+    written = 0
+    try:
+        for chunk in chunks:
+            file.write(chunk)
+            written += len(chunk)
+        file.flush()
+    finally:
+        if close:
+            file.close()
+    return written
+
+
+class QirOutput:
+    """A translated module with its serialized bitcode.
+
+    The bitcode is serialized at most once and shared by every consumer:
+    :attr:`bitcode` and ``bytes(output)`` return the same ``bytes`` object
+    each time, and :meth:`memoryview` and the write methods read from it
+    without copying. On Python 3.12 and later the output is itself a
+    bytes-like object; earlier versions should pass :meth:`memoryview` to
+    APIs expecting one. Unpacks like the result of ``to_qir_module``::
+
+        module, entry_points = output
+
+    An output may be created from its bitcode alone, in which case the
+    module named ``name`` is parsed from it on first use.
+    """
+
+    def __init__(
+        self,
+        module: Optional[Module],
+        entry_points: List[str],
+        bitcode: Optional[bytes] = None,
+        name: Optional[str] = None,
+    ):
+        if module is None and bitcode is None:
+            raise ValueError("Either the module or its bitcode is required")
+        self._module = module
+        self._entry_points = entry_points
+        self._bitcode = bitcode
+        self._name = name
+
+    @property
+    def module(self) -> Module:
+        """The module, parsed from the bitcode on first use."""
+        if self._module is None:
+            self._module = Module.from_bitcode(Context(), self._bitcode, self._name)
+        return self._module
+
+    @property
+    def entry_points(self) -> List[str]:
+        return self._entry_points
+
+    @property
+    def bitcode(self) -> bytes:
+        """The bitcode of the module, serialized on first use."""
+        if self._bitcode is None:
+            self._bitcode = self._module.bitcode
+        return self._bitcode
+
+    def memoryview(self) -> memoryview:
+        """A read-only view of the bitcode, e.g. for upload APIs accepting
+        bytes-like objects."""
+        return memoryview(self.bitcode)
+
+    @property
+    def size(self) -> int:
+        """The size of the bitcode in bytes, serialized on first use."""
+        return len(self.bitcode)
+
+    def __bytes__(self) -> bytes:
+        return self.bitcode
+
+    def __buffer__(self, flags: int) -> memoryview:
+        # The buffer protocol of PEP 688, only used by Python 3.12+.
+        return self.memoryview()
+
+    def __iter__(self):
+        return iter((self.module, self._entry_points))
+
+    def write_bitcode(self, path_or_fd: PathOrFile) -> int:
+        """Writes the bitcode to a path, a file descriptor or a binary file
+        object and returns the number of bytes written."""
+        return _write(path_or_fd, iter([self.memoryview()]))
+
+    def write_ir(self, path_or_fd: PathOrFile) -> int:
+        """Writes the textual IR to a path, a file descriptor or a binary
+        file object and returns the number of bytes written.
+
+        The text is encoded a chunk at a time rather than as a whole.
+        """
+        ir = str(self.module)
+
+        def _chunks() -> Iterator[memoryview]:
+            for start in range(0, len(ir), _IR_CHUNK):
+                yield memoryview(ir[start : start + _IR_CHUNK].encode("utf-8"))
+
+        return _write(path_or_fd, _chunks())
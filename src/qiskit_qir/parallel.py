@@ -0,0 +1,131 @@
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+import logging
+import os
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from itertools import islice
+from typing import (
+    Any,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from pyqir import Context, Module
+from qiskit.circuit.quantumcircuit import QuantumCircuit
+
+from qiskit_qir.linker import ModuleLinker
+from qiskit_qir.pipeline import (
+    EntryPointRecord,
+    SerialNames,
+    TranslationStats,
+    translate_batch,
+)
+
+_log = logging.getLogger(name=__name__)
+
+# Used when the number of circuits is not known in advance.
+_DEFAULT_CHUNKSIZE = 16
+
+
+def _translate_chunk(
+    name: str,
+    circuits: Sequence[QuantumCircuit],
+    profile: str,
+    first_index: int,
+    kwargs: Dict[str, Any],
+) -> Tuple[bytes, List[EntryPointRecord], TranslationStats]:
+    """Translates a chunk of circuits into its own module.
+
+    Runs in a worker process, so everything it returns must be picklable.
+    """
+    stats = TranslationStats()
+    llvm_module, records = translate_batch(
+        name, circuits, profile, stats=stats, first_index=first_index, **kwargs
+    )
+    return (llvm_module.bitcode, records, stats)
+
+
+def _chunks(
+    circuits: Iterable[QuantumCircuit], size: int
+) -> Iterator[List[QuantumCircuit]]:
+    iterator = iter(circuits)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+        del chunk
+
+
+def translate_parallel(
+    name: str,
+    circuits: Iterable[QuantumCircuit],
+    profile: str,
+    workers: Optional[int] = None,
+    executor: Optional[Executor] = None,
+    chunksize: Optional[int] = None,
+    size_hint: Optional[int] = None,
+    stats: Optional[TranslationStats] = None,
+    **kwargs,
+) -> Tuple[Module, List[str]]:
+    """Translates the circuits on an executor and links the per-chunk
+    modules into a single module.
+
+    Circuits are consumed lazily: at most a few chunks per worker are in
+    flight at any time. Entry points keep the names and order a serial
+    translation produces.
+    """
+    if workers is None:
+        workers = getattr(executor, "_max_workers", None) or os.cpu_count() or 1
+    if chunksize is None:
+        if size_hint is not None:
+            chunksize = max(1, -(-size_hint // (4 * workers)))
+        else:
+            chunksize = _DEFAULT_CHUNKSIZE
+
+    owned = executor is None
+    if owned:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    names = SerialNames(name)
+    linker = ModuleLinker(name)
+    entry_points: List[str] = []
+
+    def _link(future: Future) -> None:
+        bitcode, records, chunk_stats = future.result()
+        if stats is not None:
+            stats.merge(chunk_stats)
+        ir = str(Module.from_bitcode(Context(), bitcode))
+        entry_points.extend(linker.add(ir, names.assign(records)))
+
+    pending: Deque[Future] = deque()
+    first_index = 0
+    try:
+        for chunk in _chunks(circuits, chunksize):
+            pending.append(
+                executor.submit(
+                    _translate_chunk, name, chunk, profile, first_index, kwargs
+                )
+            )
+            first_index += len(chunk)
+            del chunk
+            if len(pending) >= 2 * workers:
+                _link(pending.popleft())
+        while pending:
+            _link(pending.popleft())
+    finally:
+        for future in pending:
+            future.cancel()
+        if owned:
+            executor.shutdown()
+
+    _log.debug(f"Linked {len(entry_points)} entry points")
+    return (linker.link(), entry_points)
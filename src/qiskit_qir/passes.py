@@ -0,0 +1,334 @@
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+from numbers import Real
+from typing import (
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from qiskit.circuit import CircuitInstruction, Delay, QuantumCircuit
+from qiskit.circuit.bit import Bit
+from qiskit.circuit.instruction import Instruction
+
+from qiskit_qir.composites import CompositeCache
+
+OPTIMIZATION_LEVELS = (0, 1)
+
+# An instruction with its qubits and classical bits, as in QuantumCircuit.data.
+InstructionTriple = Tuple[Instruction, List[Bit], List[Bit]]
+
+# Single qubit gates undone by the gate they are paired with.
+_INVERSES = {
+    "h": "h",
+    "x": "x",
+    "y": "y",
+    "z": "z",
+    "s": "sdg",
+    "sdg": "s",
+    "t": "tdg",
+    "tdg": "t",
+}
+
+_ROTATIONS = frozenset(["rx", "ry", "rz"])
+
+# Computational basis measurements, as lowered to mz.
+_MZ_INSTRUCTIONS = frozenset(["measure", "m", "mz"])
+
+
+def _triples(
+    instructions: Iterable[Union[CircuitInstruction, InstructionTriple]],
+) -> Iterator[InstructionTriple]:
+    # Unpacking a CircuitInstruction, as found in QuantumCircuit.data, is
+    # deprecated: its named attributes are read instead.
+    for item in instructions:
+        if isinstance(item, CircuitInstruction):
+            yield (item.operation, list(item.qubits), list(item.clbits))
+        else:
+            yield item
+
+
+class MeasureReset(Instruction):
+    """A measurement of a qubit in the computational basis followed by a
+    reset of the qubit, lowered to a single ``mresetz`` call."""
+
+    def __init__(self):
+        super().__init__("mresetz", 1, 1, [])
+
+    def _define(self):
+        circuit = QuantumCircuit(1, 1, name=self.name)
+        circuit.measure(0, 0)
+        circuit.reset(0)
+        self.definition = circuit
+
+
+def check_optimization_level(level: int) -> None:
+    if level not in OPTIMIZATION_LEVELS:
+        raise ValueError(
+            f"Unknown optimization level {level}, expected {OPTIMIZATION_LEVELS}"
+        )
+
+
+def _angle(operation: Instruction) -> Optional[float]:
+    """The angle of a rotation, if it is a number rather than an expression."""
+    (angle,) = operation.params
+    return angle if isinstance(angle, Real) else None
+
+
+def _is_candidate(operation: Instruction, qargs: List[Bit], cargs: List[Bit]) -> bool:
+    """Whether the instruction may be dropped, cancelled or merged with the
+    previous gate on its qubit."""
+    if len(qargs) != 1 or cargs or getattr(operation, "_condition", None) is not None:
+        return False
+    name = operation.name
+    if name in _ROTATIONS:
+        return _angle(operation) is not None
+    return name in _INVERSES or name == "delay" or name == "id"
+
+
+def _is_identity(operation: Instruction) -> bool:
+    name = operation.name
+    return name == "id" or (name in _ROTATIONS and _angle(operation) == 0)
+
+
+# Returned by _combine for gates that do not combine.
+_KEEP = object()
+
+
+def _combine(first: Instruction, second: Instruction):
+    """Returns the operation equivalent to ``first`` then ``second``,
+    ``None`` when they cancel out, or ``_KEEP`` when they do not combine."""
+    name = first.name
+    if _INVERSES.get(name) == second.name:
+        return None
+    if name != second.name:
+        return _KEEP
+    if name in _ROTATIONS:
+        angle = _angle(first) + _angle(second)
+        return None if angle == 0 else type(first)(angle)
+    if name == "delay" and first.unit == second.unit:
+        return Delay(first.duration + second.duration, first.unit)
+    return _KEEP
+
+
+def peephole(
+    instructions: Iterable[InstructionTriple],
+) -> Tuple[List[InstructionTriple], int]:
+    """Cancels and merges adjacent single qubit gates in one pass.
+
+    ``h``, ``x``, ``y`` and ``z`` pairs, ``s``/``sdg`` and ``t``/``tdg``
+    pairs cancel, consecutive rotations about the same axis and delays in
+    the same unit merge, and ``id`` gates and zero angle rotations are
+    dropped. A gate is only combined with the previous gate on its qubit,
+    so nothing moves across a measurement, a conditioned instruction, a
+    barrier or any other instruction on that qubit.
+
+    Returns the remaining instructions and the number of gates removed.
+    """
+    output: List[Optional[InstructionTriple]] = []
+    # Positions in the output of the trailing run of candidate gates on each
+    # qubit, most recent last.
+    runs: Dict[Bit, List[int]] = {}
+    removed = 0
+    for operation, qargs, cargs in _triples(instructions):
+        if not _is_candidate(operation, qargs, cargs):
+            for bit in qargs:
+                runs.pop(bit, None)
+            output.append((operation, qargs, cargs))
+            continue
+        if _is_identity(operation):
+            removed += 1
+            continue
+        run = runs.setdefault(qargs[0], [])
+        if run:
+            previous = output[run[-1]]
+            combined = _combine(previous[0], operation)
+            if combined is None:
+                output[run.pop()] = None
+                removed += 2
+                continue
+            if combined is not _KEEP:
+                output[run[-1]] = (combined, previous[1], previous[2])
+                removed += 1
+                continue
+        run.append(len(output))
+        output.append((operation, qargs, cargs))
+    return ([item for item in output if item is not None], removed)
+
+
+def _is_unconditioned(operation: Instruction, qargs: List[Bit], names) -> bool:
+    return (
+        operation.name in names
+        and len(qargs) == 1
+        and getattr(operation, "_condition", None) is None
+    )
+
+
+def fuse_measure_reset(
+    instructions: Iterable[InstructionTriple],
+) -> Tuple[List[InstructionTriple], int]:
+    """Replaces each measurement followed by a reset of the same qubit with
+    a :class:`MeasureReset`, provided no other instruction uses the qubit
+    in between. Neither may be conditioned.
+
+    Returns the resulting instructions and the number of pairs fused.
+    """
+    output: List[InstructionTriple] = []
+    # Position in the output of the last instruction on each qubit, if it
+    # is a measurement.
+    measured: Dict[Bit, int] = {}
+    fused = 0
+    for operation, qargs, cargs in _triples(instructions):
+        if _is_unconditioned(operation, qargs, ("reset",)) and qargs[0] in measured:
+            position = measured.pop(qargs[0])
+            _, measured_qargs, measured_cargs = output[position]
+            output[position] = (MeasureReset(), measured_qargs, measured_cargs)
+            fused += 1
+            continue
+        for bit in qargs:
+            measured.pop(bit, None)
+        if _is_unconditioned(operation, qargs, _MZ_INSTRUCTIONS) and len(cargs) == 1:
+            measured[qargs[0]] = len(output)
+        output.append((operation, qargs, cargs))
+    return (output, fused)
+
+
+class Repeat(NamedTuple):
+    """Instructions applied ``count`` times in a row."""
+
+    count: int
+    instructions: List[InstructionTriple]
+
+
+# Occurrences of the first instructions of a window considered as the
+# start of its next repetition. Bounds the search on circuits repeating
+# few instructions often, without repeating windows of them.
+_MAX_CANDIDATES = 64
+
+# Modulus and base of the polynomial hashes comparing windows.
+_HASH_MODULUS = (1 << 61) - 1
+_HASH_BASE = 1_000_003
+
+
+def _instruction_key(
+    operation: Instruction,
+    qargs: List[Bit],
+    cargs: List[Bit],
+    composites: CompositeCache,
+) -> Optional[Hashable]:
+    key = composites.key(operation, len(qargs), len(cargs))
+    if key is None:
+        return None
+    return (key, tuple(qargs), tuple(cargs), getattr(operation, "_condition", None))
+
+
+class _WindowHashes:
+    """Polynomial hashes of the prefixes of a sequence of ids, hashing any
+    window of it in constant time."""
+
+    def __init__(self, ids: List[int]):
+        self._hashes = [0]
+        self._powers = [1]
+        for ident in ids:
+            self._hashes.append(
+                (self._hashes[-1] * _HASH_BASE + ident + 1) % _HASH_MODULUS
+            )
+            self._powers.append(self._powers[-1] * _HASH_BASE % _HASH_MODULUS)
+
+    def window(self, start: int, width: int) -> int:
+        hashes = self._hashes
+        return (
+            hashes[start + width] - hashes[start] * self._powers[width]
+        ) % _HASH_MODULUS
+
+
+def _repeat_count(ids: List[int], hashes: _WindowHashes, start: int, width: int) -> int:
+    """Returns how many times the window of ``width`` ids at ``start`` is
+    repeated in a row."""
+    window = hashes.window(start, width)
+    end = start + width
+    while end + width <= len(ids) and hashes.window(end, width) == window:
+        end += width
+    # Hashes may collide: the ids must be periodic over the repetitions.
+    while end > start + width and ids[start : end - width] != ids[start + width : end]:
+        end -= width
+    return (end - start) // width
+
+
+def find_repeats(
+    instructions: Iterable[InstructionTriple], threshold: int
+) -> List[Union[InstructionTriple, Repeat]]:
+    """Groups consecutive repetitions of a window of instructions into a
+    :class:`Repeat`.
+
+    Instructions repeat when they match in operation, parameters, operands
+    and condition, operations other than standard library gates also in the
+    content of their definition. Starting from each instruction, the window saving the
+    most instructions is chosen, provided its repetitions cover at least
+    ``threshold`` instructions; the search resumes after them. Windows are
+    not searched for repetitions themselves.
+    """
+    instructions = list(_triples(instructions))
+    ids: List[int] = []
+    interned: Dict[Hashable, int] = {}
+    composites = CompositeCache()
+    for position, (operation, qargs, cargs) in enumerate(instructions):
+        key = _instruction_key(operation, qargs, cargs, composites)
+        if key is None:
+            # Unhashable parameters: never matched.
+            key = ("unique", position)
+        ids.append(interned.setdefault(key, len(interned)))
+    # A repetition covering ``threshold`` instructions is periodic over at
+    # least half of them past its first window, so the next window starts
+    # with the same ``length`` ids as the first.
+    length = max(1, (threshold + 1) // 2)
+    hashes = _WindowHashes(ids)
+    # Positions of each sequence of ``length`` ids, by hash.
+    positions: Dict[int, List[int]] = {}
+    for position in range(len(ids) - length + 1):
+        positions.setdefault(hashes.window(position, length), []).append(position)
+    # Index of the next occurrence to consider, by hash.
+    cursors = dict.fromkeys(positions, 0)
+
+    output: List[Union[InstructionTriple, Repeat]] = []
+    size = len(ids)
+    start = 0
+    # Repetitions cover at least two instructions.
+    while size - start >= max(threshold, 2):
+        prefix = hashes.window(start, length)
+        occurrences = positions[prefix]
+        cursor = cursors[prefix]
+        while occurrences[cursor] <= start:
+            cursor += 1
+            if cursor == len(occurrences):
+                break
+        cursors[prefix] = cursor
+        best: Optional[Tuple[int, int, int]] = None
+        for following in occurrences[cursor : cursor + _MAX_CANDIDATES]:
+            width = following - start
+            if 2 * width > size - start or (
+                best is not None and size - start - width <= best[0]
+            ):
+                break
+            count = _repeat_count(ids, hashes, start, width)
+            saved = width * (count - 1)
+            if count > 1 and width * count >= threshold:
+                if best is None or saved > best[0]:
+                    best = (saved, width, count)
+        if best is None:
+            output.append(instructions[start])
+            start += 1
+            continue
+        _, width, count = best
+        output.append(Repeat(count, instructions[start : start + width]))
+        start += width * count
+    output.extend(instructions[start:])
+    return output
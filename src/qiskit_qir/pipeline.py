@@ -0,0 +1,280 @@
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pyqir
+from pyqir import Context, FunctionType, Module, qir_module
+from qiskit.circuit.quantumcircuit import QuantumCircuit
+
+from qiskit_qir.composites import CompositeCache
+from qiskit_qir.constants import ConstantPool
+from qiskit_qir.declarations import DeclarationRegistry
+from qiskit_qir.elements import QiskitModule
+from qiskit_qir.linker import ModuleLinker
+from qiskit_qir.visitor import BasicQisVisitor
+
+_log = logging.getLogger(name=__name__)
+
+VERIFY_MODES = ("module", "per_entry_point", "sampled", "off")
+
+# (circuit name, entry point name, declared functions)
+EntryPointRecord = Tuple[str, str, List[str]]
+
+
+class VerificationError(Exception):
+    """Raised when the module generated for a circuit fails LLVM verification."""
+
+    def __init__(self, index: int, circuit_name: str, entry_point: str, err: str):
+        self.index = index
+        self.circuit_name = circuit_name
+        self.entry_point = entry_point
+        self.msg = f"Entry point '{entry_point}' of circuit {index} ('{circuit_name}') failed verification: {err}"
+        Exception.__init__(self, self.msg)
+
+    def __reduce__(self):
+        return (
+            self.__class__,
+            (self.index, self.circuit_name, self.entry_point, str(self.args[0])),
+        )
+
+
+class TranslationStats:
+    """Counters and timings collected while translating a batch.
+
+    Pass an instance to ``to_qir_module`` through the ``stats`` keyword
+    argument to have it filled in.
+    """
+
+    def __init__(self):
+        self.entry_points = 0
+        self.verify_mode: Optional[str] = None
+        self.verify_seconds = 0.0
+        self.verified_entry_points = 0
+        self.constant_hits = 0
+        self.constant_misses = 0
+        self.composite_hits = 0
+        self.composite_misses = 0
+        self.removed_gates = 0
+        self.removed_swaps = 0
+        self.fused_measure_resets = 0
+        self.instructions = 0
+        self.looped_instructions = 0
+        self.loops = 0
+        self.switches = 0
+
+    def merge(self, other: "TranslationStats") -> None:
+        """Adds the counters of ``other``, e.g. collected by a worker."""
+        self.entry_points += other.entry_points
+        self.verify_seconds += other.verify_seconds
+        self.verified_entry_points += other.verified_entry_points
+        self.constant_hits += other.constant_hits
+        self.constant_misses += other.constant_misses
+        self.composite_hits += other.composite_hits
+        self.composite_misses += other.composite_misses
+        self.removed_gates += other.removed_gates
+        self.removed_swaps += other.removed_swaps
+        self.fused_measure_resets += other.fused_measure_resets
+        self.instructions += other.instructions
+        self.looped_instructions += other.looped_instructions
+        self.loops += other.loops
+        self.switches += other.switches
+
+    def count_constants(self, pool: ConstantPool) -> None:
+        """Adds the hits and misses of a constant pool."""
+        self.constant_hits += pool.hits
+        self.constant_misses += pool.misses
+
+    @property
+    def compression_ratio(self) -> float:
+        """The number of circuit instructions translated over the number
+        emitted, counting the instructions of a loop once."""
+        emitted = self.instructions - self.looped_instructions
+        return self.instructions / emitted if emitted else 1.0
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{k}={v!r}" for k, v in vars(self).items())
+        return f"TranslationStats({fields})"
+
+
+class SerialNames:
+    """Replays the function creation order of a serial translation in an
+    empty module so that LLVM assigns the same unique entry point names."""
+
+    def __init__(self, name: str):
+        self._module = qir_module(Context(), name)
+        self._registry = DeclarationRegistry(self._module)
+        self._function_type = FunctionType(pyqir.Type.void(self._module.context), [])
+
+    def assign(self, records: Iterable[EntryPointRecord]) -> Dict[str, str]:
+        renames = {}
+        for circuit_name, entry_point, declared in records:
+            function = pyqir.entry_point(self._module, circuit_name, 0, 0)
+            renames[entry_point] = function.name
+            for function_name in declared:
+                self._registry.declare(function_name, self._function_type)
+        return renames
+
+
+def _translate_circuit(
+    llvm_module: Module,
+    circuit: QuantumCircuit,
+    profile: str,
+    stats: Optional[TranslationStats] = None,
+    **kwargs,
+) -> EntryPointRecord:
+    module = QiskitModule.from_quantum_circuit(
+        circuit,
+        llvm_module,
+        kwargs.get("optimization_level", 0),
+        kwargs.get("fuse_measure_resets", False),
+        kwargs.get("loop_threshold"),
+    )
+    if stats is not None:
+        stats.removed_gates += module.removed_gates
+        stats.fused_measure_resets += module.fused_measure_resets
+        stats.instructions += module.instruction_count
+    visitor_class = kwargs.get("visitor_class", BasicQisVisitor)
+    visitor = visitor_class(profile, **kwargs)
+    module.accept(visitor)
+    if stats is not None:
+        stats.removed_swaps += visitor.removed_swaps
+        stats.looped_instructions += visitor.looped_instructions
+        stats.loops += visitor.loops
+        stats.switches += visitor.switches
+        stats.composite_hits += visitor.composite_hits
+        stats.composite_misses += visitor.composite_misses
+    declared = [function.name for function in visitor._declarations.values()]
+    return (circuit.name, visitor.entry_point, declared)
+
+
+def _verify_isolated(
+    name: str,
+    index: int,
+    circuit: QuantumCircuit,
+    profile: str,
+    stats: TranslationStats,
+    scratch: bool = False,
+    **kwargs,
+) -> Tuple[Module, EntryPointRecord]:
+    """Translates the circuit into a module of its own and verifies it.
+
+    The gates removed from a ``scratch`` translation, which only serves to
+    verify a circuit translated elsewhere, are not counted."""
+    llvm_module = qir_module(Context(), name)
+    pool = ConstantPool(llvm_module.context)
+    record = _translate_circuit(
+        llvm_module,
+        circuit,
+        profile,
+        stats=None if scratch else stats,
+        constant_pool=pool,
+        **kwargs,
+    )
+    stats.count_constants(pool)
+    start = time.perf_counter()
+    err = llvm_module.verify()
+    stats.verify_seconds += time.perf_counter() - start
+    stats.verified_entry_points += 1
+    if err is not None:
+        raise VerificationError(index, circuit.name, record[1], err)
+    return (llvm_module, record)
+
+
+def translate_batch(
+    name: str,
+    circuits: Iterable[QuantumCircuit],
+    profile: str,
+    verify: str = "module",
+    verify_sample_rate: int = 10,
+    stats: Optional[TranslationStats] = None,
+    first_index: int = 0,
+    **kwargs,
+) -> Tuple[Module, List[EntryPointRecord]]:
+    """Translates the circuits one at a time into a module named ``name``.
+
+    Only the circuit being translated is referenced: the circuit and its
+    wrapped elements are released as soon as its entry point is emitted.
+
+    ``verify`` selects how entry points are verified while translating:
+
+    * ``"module"`` and ``"off"`` do not verify; the caller verifies the
+      whole module, or not at all.
+    * ``"per_entry_point"`` translates each circuit into a module of its
+      own, verifies it, and links the modules together.
+    * ``"sampled"`` also translates one in ``verify_sample_rate`` circuits
+      into a scratch module and verifies it.
+
+    Circuits are numbered from ``first_index`` in verification errors.
+    Returns the module and one record per entry point, naming the entry
+    point as it appears in the returned module.
+    """
+    if verify not in VERIFY_MODES:
+        raise ValueError(f"Unknown verification mode {verify}, expected {VERIFY_MODES}")
+    if stats is None:
+        stats = TranslationStats()
+    stats.verify_mode = verify
+    records = []
+    # Composite instructions are expanded once for the whole batch.
+    kwargs.setdefault("composite_cache", CompositeCache())
+    # enumerate() would hold on to the previous circuit while the next one
+    # is produced, so the index is tracked by hand.
+    index = first_index
+    if verify == "per_entry_point":
+        linker = ModuleLinker(name)
+        names = SerialNames(name)
+        for circuit in circuits:
+            llvm_module, record = _verify_isolated(
+                name, index, circuit, profile, stats, **kwargs
+            )
+            index += 1
+            del circuit
+            (entry_point,) = linker.add(str(llvm_module), names.assign([record]))
+            records.append((record[0], entry_point, record[2]))
+        llvm_module = linker.link()
+    else:
+        llvm_module = qir_module(Context(), name)
+        # Circuits translated into the same module share its constants and
+        # declarations.
+        pool = ConstantPool(llvm_module.context)
+        registry = DeclarationRegistry(llvm_module)
+        markers = stats.loops + stats.switches
+        for circuit in circuits:
+            if verify == "sampled" and index % verify_sample_rate == 0:
+                _verify_isolated(
+                    name, index, circuit, profile, stats, scratch=True, **kwargs
+                )
+            records.append(
+                _translate_circuit(
+                    llvm_module,
+                    circuit,
+                    profile,
+                    stats=stats,
+                    constant_pool=pool,
+                    declarations=registry,
+                    **kwargs,
+                )
+            )
+            index += 1
+            del circuit
+        stats.count_constants(pool)
+        if stats.loops + stats.switches > markers:
+            # Loops and switches are lowered by the linker.
+            linker = ModuleLinker(name)
+            linker.add(str(llvm_module))
+            llvm_module = linker.link()
+    stats.entry_points += len(records)
+    return (llvm_module, records)
+
+
+def verify_module(llvm_module: Module, stats: TranslationStats) -> None:
+    """Verifies the whole module at once."""
+    start = time.perf_counter()
+    err = llvm_module.verify()
+    stats.verify_seconds += time.perf_counter() - start
+    stats.verified_entry_points = stats.entry_points
+    if err is not None:
+        raise Exception(err)
@@ -0,0 +1,228 @@
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+import logging
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pyqir import Context, Module, qir_module
+from qiskit.circuit.quantumcircuit import QuantumCircuit
+
+from qiskit_qir.composites import CompositeCache
+from qiskit_qir.constants import ConstantPool
+from qiskit_qir.linker import ModuleLinker
+from qiskit_qir.pipeline import (
+    VERIFY_MODES,
+    SerialNames,
+    TranslationStats,
+    _translate_circuit,
+    _verify_isolated,
+    translate_batch,
+    verify_module,
+)
+
+_log = logging.getLogger(name=__name__)
+
+# A shard module and the entry point names of its circuits, keyed by the
+# index of the circuit in the batch.
+Shard = Tuple[Module, Dict[int, str]]
+
+
+def estimate_instructions(circuit: QuantumCircuit) -> int:
+    """Estimates the number of QIR instructions emitted for the circuit: one
+    call per operation and one output recording call per classical bit."""
+    return circuit.size() + circuit.num_clbits
+
+
+class ShardLimits:
+    """Upper bounds on the contents of a shard. ``None`` means unbounded.
+
+    A circuit exceeding a limit on its own gets a shard of its own.
+    """
+
+    def __init__(
+        self,
+        max_entry_points: Optional[int] = None,
+        max_instructions: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        limits = (max_entry_points, max_instructions, max_bytes)
+        if all(limit is None for limit in limits):
+            raise ValueError(
+                "Sharding requires max_entry_points, max_instructions or max_bytes"
+            )
+        if any(limit is not None and limit < 1 for limit in limits):
+            raise ValueError("Shard limits must be positive")
+        self.max_entry_points = max_entry_points
+        self.max_instructions = max_instructions
+        self.max_bytes = max_bytes
+
+    def fits(self, entry_points: int, instructions: int, size: int) -> bool:
+        """Whether a shard with these totals is within the limits."""
+        return (
+            (self.max_entry_points is None or entry_points <= self.max_entry_points)
+            and (self.max_instructions is None or instructions <= self.max_instructions)
+            and (self.max_bytes is None or size <= self.max_bytes)
+        )
+
+
+def _groups(
+    circuits: Iterable[QuantumCircuit], limits: ShardLimits
+) -> Iterator[List[QuantumCircuit]]:
+    """Groups consecutive circuits within the entry point and instruction
+    limits."""
+    group: List[QuantumCircuit] = []
+    instructions = 0
+    for circuit in circuits:
+        estimate = estimate_instructions(circuit)
+        if group and not limits.fits(len(group) + 1, instructions + estimate, 0):
+            yield group
+            group = []
+            instructions = 0
+        group.append(circuit)
+        instructions += estimate
+        del circuit
+    if group:
+        yield group
+
+
+def _sized_shards(
+    name: str,
+    circuits: Iterable[QuantumCircuit],
+    profile: str,
+    limits: ShardLimits,
+    verify: str,
+    verify_sample_rate: int,
+    stats: TranslationStats,
+    **kwargs,
+) -> Iterator[Tuple[ModuleLinker, Dict[int, str]]]:
+    """Translates each circuit into a module of its own and links the
+    modules into shards within the limits.
+
+    A shard is sized as an empty module plus, for each circuit, the size of
+    its own module less that of an empty module. Declarations shared by
+    circuits are counted for each of them, so the estimate errs on the
+    large side.
+    """
+    overhead = len(qir_module(Context(), name).bitcode)
+    linker = names = None
+    shard = 0
+    entry_points: Dict[int, str] = {}
+    instructions = 0
+    size = overhead
+    index = 0
+    for circuit in circuits:
+        estimate = estimate_instructions(circuit)
+        if verify == "per_entry_point" or (
+            verify == "sampled" and index % verify_sample_rate == 0
+        ):
+            llvm_module, record = _verify_isolated(
+                name, index, circuit, profile, stats, **kwargs
+            )
+        else:
+            llvm_module = qir_module(Context(), name)
+            pool = ConstantPool(llvm_module.context)
+            record = _translate_circuit(
+                llvm_module,
+                circuit,
+                profile,
+                stats=stats,
+                constant_pool=pool,
+                **kwargs,
+            )
+            stats.count_constants(pool)
+        del circuit
+        circuit_size = max(len(llvm_module.bitcode) - overhead, 0)
+        ir = str(llvm_module)
+        del llvm_module
+
+        if entry_points and not limits.fits(
+            len(entry_points) + 1, instructions + estimate, size + circuit_size
+        ):
+            yield (linker, entry_points)
+            linker = None
+            shard += 1
+        if linker is None:
+            linker = ModuleLinker(f"{name}_{shard}")
+            names = SerialNames(name)
+            entry_points = {}
+            instructions = 0
+            size = overhead
+        (entry_points[index],) = linker.add(ir, names.assign([record]))
+        instructions += estimate
+        size += circuit_size
+        index += 1
+        stats.entry_points += 1
+    if linker is not None:
+        yield (linker, entry_points)
+
+
+def translate_shards(
+    name: str,
+    circuits: Iterable[QuantumCircuit],
+    profile: str,
+    limits: ShardLimits,
+    verify: str = "module",
+    verify_sample_rate: int = 10,
+    stats: Optional[TranslationStats] = None,
+    **kwargs,
+) -> Iterator[Shard]:
+    """Translates the circuits into consecutive shards, yielding each shard
+    as soon as it is complete. Shard modules are named ``<name>_<shard>``.
+
+    Entry point and instruction limits are applied before translating, so
+    circuits are translated straight into their shard. A byte limit needs
+    the size of each translated circuit, so circuits are then translated
+    on their own and linked into their shard.
+    """
+    if verify not in VERIFY_MODES:
+        raise ValueError(f"Unknown verification mode {verify}, expected {VERIFY_MODES}")
+    if stats is None:
+        stats = TranslationStats()
+    stats.verify_mode = verify
+    kwargs.setdefault("composite_cache", CompositeCache())
+    shard = 0
+    if limits.max_bytes is None:
+        first_index = 0
+        for group in _groups(circuits, limits):
+            llvm_module, records = translate_batch(
+                f"{name}_{shard}",
+                group,
+                profile,
+                verify=verify,
+                verify_sample_rate=verify_sample_rate,
+                stats=stats,
+                first_index=first_index,
+                **kwargs,
+            )
+            del group
+            entry_points = {
+                first_index + position: record[1]
+                for position, record in enumerate(records)
+            }
+            first_index += len(records)
+            if verify == "module":
+                verify_module(llvm_module, stats)
+            _log.debug(f"Shard {shard} has {len(entry_points)} entry points")
+            yield (llvm_module, entry_points)
+            shard += 1
+    else:
+        for linker, entry_points in _sized_shards(
+            name,
+            circuits,
+            profile,
+            limits,
+            verify,
+            verify_sample_rate,
+            stats,
+            **kwargs,
+        ):
+            llvm_module = linker.link()
+            del linker
+            if verify == "module":
+                verify_module(llvm_module, stats)
+            _log.debug(f"Shard {shard} has {len(entry_points)} entry points")
+            yield (llvm_module, entry_points)
+            shard += 1
+    if shard == 0:
+        raise ValueError("No QuantumCircuits provided")
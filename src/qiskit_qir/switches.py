@@ -0,0 +1,107 @@
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+import re
+from typing import Dict, List, Optional, Tuple
+
+# pyqir's builder cannot emit switch instructions, branch on a bit to blocks
+# of its choosing, nor widen the results of a register into an integer, so
+# the visitor marks switches with calls to these functions, and the marked
+# functions are rewritten in their textual IR. Markers name their switch by
+# a number unique in the function.
+#
+# Each bit of the switched register is marked, least significant first.
+SWITCH_BIT = "__qiskit_qir__switch_bit"
+# Marks the switch, which is followed by the branch to its default block.
+SWITCH = "__qiskit_qir__switch"
+# Marks a value of the switch at the start of the block of its case.
+SWITCH_CASE = "__qiskit_qir__switch_case"
+
+_BIT = re.compile(r"^\s*call void @" + SWITCH_BIT + r"\(i64 (\d+), i1 ([^)]+)\)$")
+_SWITCH = re.compile(r"^\s*call void @" + SWITCH + r"\(i64 (\d+)\)$")
+_CASE = re.compile(r"^\s*call void @" + SWITCH_CASE + r"\(i64 (\d+), i64 (\d+)\)$")
+_BRANCH = re.compile(r"^\s*br label (%\S+)$")
+# Basic block labels, e.g. `entry:`, `3:` or `"my block":`.
+_LABEL = re.compile(r'^("(?:[^"\\]|\\.)*"|[-a-zA-Z$._0-9]+):')
+
+
+def has_switches(lines: List[str]) -> bool:
+    """Whether the function definition ``lines`` has switch markers."""
+    return any(SWITCH in line for line in lines)
+
+
+def is_marker(name: str) -> bool:
+    """Whether ``name`` is a switch marker function."""
+    return name in (SWITCH_BIT, SWITCH, SWITCH_CASE)
+
+
+def lower_switches(lines: List[str]) -> List[str]:
+    """Rewrites the marked switches of the function definition ``lines``.
+
+    Each switch marker and the branch following it become a switch on the
+    integer value of the marked bits to the blocks of its cases, defaulting
+    to the branch target. A switch on a single bit becomes a conditional
+    branch, so that it needs no integer computations.
+    """
+    # The bits of each switch, and the values of its cases with the labels
+    # of the blocks they select.
+    bits: Dict[str, List[str]] = {}
+    cases: Dict[str, List[Tuple[int, str]]] = {}
+    block: Optional[str] = None
+    for line in lines:
+        label = _LABEL.match(line)
+        if label is not None:
+            block = "%" + label.group(1)
+            continue
+        bit = _BIT.match(line)
+        if bit is not None:
+            bits.setdefault(bit.group(1), []).append(bit.group(2))
+            continue
+        case = _CASE.match(line)
+        if case is not None:
+            assert block is not None, "Switch marker outside of a basic block"
+            number, value = case.groups()
+            cases.setdefault(number, []).append((int(value), block))
+
+    output: List[str] = []
+    index = 0
+    while index < len(lines):
+        line = lines[index]
+        index += 1
+        if _CASE.match(line) is not None or _BIT.match(line) is not None:
+            continue
+        switch = _SWITCH.match(line)
+        if switch is None:
+            output.append(line)
+            continue
+        number = switch.group(1)
+        branch = _BRANCH.match(lines[index])
+        assert branch is not None, "Switch marker without a default branch"
+        index += 1
+        default = branch.group(1)
+        values = bits.pop(number)
+        targets = cases.get(number, [])
+        if len(values) == 1:
+            selected = dict(targets)
+            one = selected.get(1, default)
+            zero = selected.get(0, default)
+            output.append(f"  br i1 {values[0]}, label {one}, label {zero}")
+            continue
+        name = f"%switch.{number}"
+        value = None
+        for position, bit in enumerate(values):
+            extended = f"{name}.bit.{position}"
+            output.append(f"  {extended} = zext i1 {bit} to i64")
+            if value is None:
+                value = extended
+                continue
+            shifted = f"{name}.shifted.{position}"
+            combined = f"{name}.value.{position}"
+            output.append(f"  {shifted} = shl i64 {extended}, {position}")
+            output.append(f"  {combined} = or i64 {value}, {shifted}")
+            value = combined
+        labels = " ".join(f"i64 {value}, label {target}" for value, target in targets)
+        output.append(f"  switch i64 {value}, label {default} [ {labels} ]")
+    assert not bits, "Switch bits without a switch marker"
+    return output
@@ -0,0 +1,246 @@
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+import logging
+import re
+import struct
+from typing import Dict, Iterable, List, Mapping, Sequence, Set, Tuple, Type, Union
+
+import pyqir
+from pyqir import Context, Module, qir_module
+from qiskit.circuit import ControlFlowOp, ForLoopOp, Parameter, ParameterExpression
+from qiskit.circuit.quantumcircuit import QuantumCircuit
+
+from qiskit_qir.elements import QiskitModule
+from qiskit_qir.linker import ModuleLinker, _quote
+from qiskit_qir.visitor import BasicQisVisitor
+
+_log = logging.getLogger(name=__name__)
+
+# Parameterized angles are emitted as quiet NaNs carrying the slot index in
+# their payload. LLVM prints NaNs in hexadecimal, which makes every slot
+# easy to find in the textual IR.
+_SLOT_BITS = 0x7FF8514900000000
+_SLOT_PATTERN = re.compile(r"double 0x7FF85149([0-9A-F]{8})")
+
+ParameterBinds = Union[Mapping[Parameter, float], Sequence[float]]
+
+
+def _slot_value(slot: int) -> float:
+    return struct.unpack("<d", struct.pack("<Q", _SLOT_BITS | slot))[0]
+
+
+def _double_literal(value: float) -> str:
+    return "double 0x%016X" % struct.unpack("<Q", struct.pack("<d", value))[0]
+
+
+def _loop_parameters(circuit: QuantumCircuit) -> Set[Parameter]:
+    """The loop parameters of the for loops of the circuit, which qiskit
+    counts among the circuit parameters."""
+    found = set()
+    for item in circuit.data:
+        operation = item.operation
+        if isinstance(operation, ForLoopOp) and operation.params[1] is not None:
+            found.add(operation.params[1])
+        if isinstance(operation, ControlFlowOp):
+            for block in operation.blocks:
+                found |= _loop_parameters(block)
+    return found
+
+
+class _TemplateVisitor(BasicQisVisitor):
+    def __init__(self, profile: str = "AdaptiveExecution", **kwargs):
+        super().__init__(profile, **kwargs)
+        # Slots are substituted in the entry point alone.
+        self._composite_functions = False
+        self.slots: List[ParameterExpression] = []
+
+    def _rotation_angle(self, param):
+        if (
+            isinstance(param, ParameterExpression)
+            and param.parameters
+            and param.parameters.isdisjoint(self._loop_parameters)
+        ):
+            self.slots.append(param)
+            return _slot_value(len(self.slots) - 1)
+        return super()._rotation_angle(param)
+
+
+# Template visitors lowering instructions as each visitor class does.
+_TEMPLATE_VISITORS: Dict[Type[BasicQisVisitor], Type[_TemplateVisitor]] = {
+    BasicQisVisitor: _TemplateVisitor
+}
+
+
+def _template_visitor(visitor_class: Type[BasicQisVisitor]) -> Type[_TemplateVisitor]:
+    template_class = _TEMPLATE_VISITORS.get(visitor_class)
+    if template_class is None:
+        template_class = type(
+            f"_Template{visitor_class.__name__}", (_TemplateVisitor, visitor_class), {}
+        )
+        _TEMPLATE_VISITORS[visitor_class] = template_class
+    return template_class
+
+
+class QirTemplate:
+    """A parameterized circuit translated once, from which an entry point
+    is produced for each set of parameter values by substituting the
+    rotation angles in the emitted IR.
+
+    Instantiating a set of values costs time proportional to the number of
+    parameterized rotations (slots), not to the number of gates.
+    """
+
+    def __init__(
+        self, circuit: QuantumCircuit, profile: str = "AdaptiveExecution", **kwargs
+    ):
+        self._name = circuit.name
+        loop_parameters = _loop_parameters(circuit)
+        self._parameters: List[Parameter] = [
+            parameter
+            for parameter in circuit.parameters
+            if parameter not in loop_parameters
+        ]
+        llvm_module = qir_module(Context(), circuit.name)
+        module = QiskitModule.from_quantum_circuit(
+            circuit,
+            llvm_module,
+            kwargs.get("optimization_level", 0),
+            kwargs.get("fuse_measure_resets", False),
+            kwargs.get("loop_threshold"),
+        )
+        visitor_class = _template_visitor(kwargs.get("visitor_class", BasicQisVisitor))
+        visitor = visitor_class(profile, **kwargs)
+        module.accept(visitor)
+        self._entry_point = visitor.entry_point
+        self._slots = visitor.slots
+        self._removed_gates = module.removed_gates
+        self._removed_swaps = visitor.removed_swaps
+        self._fused_measure_resets = module.fused_measure_resets
+        self._instruction_count = module.instruction_count
+        self._looped_instructions = visitor.looped_instructions
+        self._loops = visitor.loops
+        self._switches = visitor.switches
+        self._composite_hits = visitor.composite_hits
+        self._composite_misses = visitor.composite_misses
+        self._ir = str(llvm_module)
+        _log.debug(
+            f"Template '{self._name}' has {len(self._slots)} parameterized slots"
+        )
+
+    @property
+    def removed_gates(self) -> int:
+        """The number of gates removed from each entry point by the
+        ``optimization_level`` passes."""
+        return self._removed_gates
+
+    @property
+    def removed_swaps(self) -> int:
+        """The number of swaps removed from each entry point by relabeling
+        qubits."""
+        return self._removed_swaps
+
+    @property
+    def fused_measure_resets(self) -> int:
+        """The number of measurements fused with a reset in each entry
+        point."""
+        return self._fused_measure_resets
+
+    @property
+    def instruction_count(self) -> int:
+        """The number of circuit instructions translated into each entry
+        point."""
+        return self._instruction_count
+
+    @property
+    def looped_instructions(self) -> int:
+        """The number of instructions left out of each entry point by
+        emitting repeats as loops."""
+        return self._looped_instructions
+
+    @property
+    def loops(self) -> int:
+        """The number of loops in each entry point."""
+        return self._loops
+
+    @property
+    def switches(self) -> int:
+        """The number of marked switches, on a register or a bit, in each
+        entry point."""
+        return self._switches
+
+    @property
+    def composite_hits(self) -> int:
+        """The number of composite expansions found in the cache while
+        translating the template."""
+        return self._composite_hits
+
+    @property
+    def composite_misses(self) -> int:
+        """The number of composite instructions flattened while translating
+        the template."""
+        return self._composite_misses
+
+    @property
+    def parameters(self) -> List[Parameter]:
+        """The circuit parameters, in the order used for sequences of values."""
+        return self._parameters
+
+    @property
+    def num_slots(self) -> int:
+        """The number of parameterized rotation angles in the template."""
+        return len(self._slots)
+
+    def _slot_values(self, binds: ParameterBinds) -> List[float]:
+        if not isinstance(binds, Mapping):
+            if len(binds) != len(self._parameters):
+                raise ValueError(
+                    f"Expected {len(self._parameters)} parameter values, {len(binds)} provided"
+                )
+            binds = dict(zip(self._parameters, binds))
+        missing = [p for p in self._parameters if p not in binds]
+        if missing:
+            raise ValueError(f"No values provided for parameters {missing}")
+        values = []
+        for slot in self._slots:
+            if isinstance(slot, Parameter):
+                values.append(float(binds[slot]))
+            else:
+                bound = slot.bind({p: binds[p] for p in slot.parameters})
+                values.append(float(bound))
+        return values
+
+    def bind(
+        self, parameter_binds: Iterable[ParameterBinds]
+    ) -> Tuple[Module, List[str]]:
+        """Produces a module with one entry point per set of parameter values.
+
+        :param parameter_binds:
+            Sets of parameter values, each either a mapping from circuit
+            parameters to values or a sequence of values ordered as
+            :attr:`parameters`.
+        :returns:
+            Tuple containing the QIR ``pyqir.Module`` and the list of entry
+            point names, in the order of ``parameter_binds``.
+        """
+        linker = ModuleLinker(self._name)
+        ((_, text),) = linker.extract(self._ir)
+        header, body = text.split("\n", 1)
+        prefix, suffix = header.split("@" + _quote(self._entry_point) + "(", 1)
+        segments = _SLOT_PATTERN.split(body)
+        # Even segments are IR text, odd segments are slot indices.
+        slot_indices = [int(index, 16) for index in segments[1::2]]
+
+        names = qir_module(Context(), self._name)
+        entry_points = []
+        for binds in parameter_binds:
+            values = self._slot_values(binds)
+            name = pyqir.entry_point(names, self._name, 0, 0).name
+            parts = [prefix, "@", _quote(name), "(", suffix, "\n", segments[0]]
+            for position, slot in enumerate(slot_indices):
+                parts.append(_double_literal(values[slot]))
+                parts.append(segments[2 * position + 2])
+            linker.define(name, "".join(parts))
+            entry_points.append(name)
+        return (linker.link(), entry_points)
@@ -2,26 +2,48 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 ##
-from qiskit_qir.visitor import BasicQisVisitor
+import logging
 from qiskit.circuit.quantumcircuit import QuantumCircuit
-from typing import List, Tuple, Union
-from pyqir import Context, Module, qir_module
-from qiskit_qir.elements import QiskitModule
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sized, Tuple, Union
+from pyqir import Context, Module
+from qiskit_qir.asynchronous import AsyncTranslation
+from qiskit_qir.cache import translation_key
+from qiskit_qir.output import QirOutput
+from qiskit_qir.parallel import translate_parallel
+from qiskit_qir.passes import check_optimization_level
+from qiskit_qir.pipeline import (
+    VERIFY_MODES,
+    TranslationStats,
+    translate_batch,
+    verify_module,
+)
+from qiskit_qir.sharding import Shard, ShardLimits, translate_shards
+from qiskit_qir.template import QirTemplate
+
+_log = logging.getLogger(name=__name__)
+
+_INPUT_ERROR = "Input must be Union[QuantumCircuit, Iterable[QuantumCircuit]]"
 
 
 def to_qir_module(
-    circuits: Union[QuantumCircuit, List[QuantumCircuit]],
+    circuits: Union[QuantumCircuit, Iterable[QuantumCircuit]],
     profile: str = "AdaptiveExecution",
-    **kwargs
+    **kwargs,
 ) -> Tuple[Module, List[str]]:
     r"""Converts the Qiskit QuantumCircuit(s) to a QIR Module with
     its entry point names.
 
     :param circuits:
-        Qiskit circuit(s) to be converted to QIR
-    :type circuit: ``Union[QuantumCircuit, List[QuantumCircuit]]``
+        Qiskit circuit(s) to be converted to QIR. Any iterable is accepted,
+        including a generator: circuits are consumed and released one at a
+        time, so memory use depends on the largest circuit rather than on
+        the size of the batch.
+    :type circuit: ``Union[QuantumCircuit, Iterable[QuantumCircuit]]``
     :param profile:
-        The target profile for capability verification
+        The target profile for capability verification: `"BasicExecution"`,
+        `"AdaptiveExecution"` or `"Adaptive_RI"`, which also allows integer
+        computations on results and lowers each register condition to a
+        single branch
     :type profile: ``str``
     :param \**kwargs:
         See below
@@ -34,32 +56,394 @@ def to_qir_module(
           Whether to record output calls for registers, default `True`
         * *emit_barrier_calls* (``bool``) --
           Whether to emit barrier calls in the QIR, default `False`
+        * *merge_conditions* (``bool``) --
+          Whether consecutive instructions with the same condition are
+          lowered under a single branch, default `True`. A run ends at
+          an instruction writing a bit of the condition
+        * *optimization_level* (``int``) --
+          `1` cancels and merges adjacent single qubit gates before
+          emitting them, e.g. ``h; h`` or consecutive ``rz`` rotations,
+          and drops ``id`` gates and zero angle rotations. Gates are not
+          combined across measurements, conditions or barriers. The number
+          of gates removed is reported in ``stats``, default `0`
+        * *virtual_swaps* (``bool``) --
+          Whether unconditioned swaps are removed by exchanging the qubits
+          used by the rest of the circuit instead, default `False`. Swaps
+          in branches are emitted. Results and their recorded order are
+          unchanged. The number of swaps removed is reported in ``stats``
+        * *fuse_measure_resets* (``bool``) --
+          Whether a measurement followed by a reset of the same qubit, with
+          nothing else using the qubit in between, is emitted as a single
+          ``__quantum__qis__mresetz__body`` call, default `False`. Profiles
+          without qubit use after measurement still reject the reset. The
+          number of fused pairs is reported in ``stats``
+        * *composite_functions* (``bool``) --
+          Whether each distinct composite instruction is emitted once per
+          module as an internal function taking its qubits and results as
+          arguments, and called wherever it is applied, default `False`.
+          Composite instructions with conditions, and all composite
+          instructions under profiles without qubit use after measurement
+          or with ``parameter_binds``, are inlined
+        * *loop_threshold* (``int``) --
+          Minimum number of instructions covered by consecutive repetitions
+          of a window of instructions for them to be emitted once, in a
+          counted loop, default `None` (no loops). Instructions repeat when
+          they match in operation, parameters, operands and condition.
+          Profiles without qubit use after measurement or integer
+          computations unroll the loops.
+          The ``compression_ratio`` achieved is reported in ``stats``
+        * *workers* (``int``) --
+          Number of worker processes used to translate the circuits in
+          parallel, default `None` (serial translation)
+        * *executor* (``concurrent.futures.Executor``) --
+          Executor used to translate the circuits in parallel instead of
+          a process pool created for the call, default `None`
+        * *chunksize* (``int``) --
+          Number of circuits translated per parallel task, default `None`
+          (chosen from the number of circuits and workers)
+        * *parameter_binds* (``Iterable[Union[Mapping[Parameter, float], Sequence[float]]]``) --
+          Sets of parameter values for a single parameterized circuit. The
+          circuit is translated once as a template and an entry point is
+          produced per set of values, default `None`
+        * *cache* (``TranslationCache``) --
+          Cache of translation results keyed on the circuit contents, the
+          profile and the other keyword arguments. On a hit the stored
+          bitcode is returned without translating. The input is
+          materialized to compute the key, default `None`
+        * *verify* (``str``) --
+          How the module is verified: `"module"` verifies the whole module
+          once, `"per_entry_point"` verifies each circuit as it is
+          translated and names the failing circuit, `"sampled"` verifies one
+          in `verify_sample_rate` circuits and `"off"` skips verification,
+          default `"module"`
+        * *verify_sample_rate* (``int``) --
+          One in how many circuits are verified in `"sampled"` mode,
+          default `10`
+        * *stats* (``TranslationStats``) --
+          Filled in with counters and timings of the translation, such as
+          the time spent verifying, default `None`
+        * *visitor_class* (``Type[BasicQisVisitor]``) --
+          Visitor class lowering the circuits, e.g. a subclass with
+          instruction handlers registered on it, default
+          ``BasicQisVisitor``. Worker processes import it, so it must be
+          defined at module level
+    """
+    module, entry_points = to_qir_output(circuits, profile, **kwargs)
+    return (module, entry_points)
+
+
+def to_qir_output(
+    circuits: Union[QuantumCircuit, Iterable[QuantumCircuit]],
+    profile: str = "AdaptiveExecution",
+    **kwargs,
+) -> QirOutput:
+    r"""Converts the Qiskit QuantumCircuit(s) to a QIR Module, keeping its
+    serialized bitcode with it.
+
+    Takes the same arguments as ``to_qir_module``. The returned
+    ``QirOutput`` serializes the module at most once, and exposes the
+    bitcode as ``bytes``, as a ``memoryview`` and through ``write_bitcode``
+    and ``write_ir`` without further copies. Results served from a cache
+    reuse the stored bitcode.
+
+    :returns:
+        ``QirOutput`` holding the QIR ``pyqir.Module``, the list of entry
+        point names and the bitcode.
+    """
+    parameter_binds = kwargs.pop("parameter_binds", None)
+    workers = kwargs.pop("workers", None)
+    executor = kwargs.pop("executor", None)
+    chunksize = kwargs.pop("chunksize", None)
+    cache = kwargs.pop("cache", None)
+    stats = kwargs.pop("stats", None)
+    if stats is None:
+        stats = TranslationStats()
+    verify = kwargs.pop("verify", "module")
+    _check_verify_mode(verify)
+    check_optimization_level(kwargs.get("optimization_level", 0))
+    stats.verify_mode = verify
+
+    if parameter_binds is not None and not isinstance(circuits, QuantumCircuit):
+        raise ValueError("parameter_binds requires a single QuantumCircuit")
+    name, circuits, size_hint = _batch_input(circuits)
+
+    if cache is not None:
+        # The key covers the whole batch, so the input is materialized.
+        circuits = list(circuits)
+        options = dict(kwargs, verify=verify)
+        if parameter_binds is not None:
+            parameter_binds = list(parameter_binds)
+            options["parameter_binds"] = parameter_binds
+        key = translation_key(circuits, profile, options)
+        cached = cache.get(key)
+        if cached is not None:
+            bitcode, entry_points = cached
+            module = Module.from_bitcode(Context(), bitcode, name)
+            return QirOutput(module, entry_points, bitcode)
+
+    if parameter_binds is not None:
+        # Entry points instantiated from a template are identical but for
+        # their angles, so verifying them per entry point is the same as
+        # verifying the module.
+        template = QirTemplate(next(iter(circuits)), profile, **kwargs)
+        llvm_module, entry_points = template.bind(parameter_binds)
+        stats.entry_points += len(entry_points)
+        stats.removed_gates += template.removed_gates * len(entry_points)
+        stats.removed_swaps += template.removed_swaps * len(entry_points)
+        stats.fused_measure_resets += template.fused_measure_resets * len(entry_points)
+        stats.instructions += template.instruction_count * len(entry_points)
+        stats.looped_instructions += template.looped_instructions * len(entry_points)
+        stats.loops += template.loops * len(entry_points)
+        stats.switches += template.switches * len(entry_points)
+        # The template is translated once for all its entry points.
+        stats.composite_hits += template.composite_hits
+        stats.composite_misses += template.composite_misses
+        if verify != "off":
+            verify = "module"
+    elif workers is not None or executor is not None:
+        llvm_module, entry_points = translate_parallel(
+            name,
+            circuits,
+            profile,
+            workers=workers,
+            executor=executor,
+            chunksize=chunksize,
+            size_hint=size_hint,
+            stats=stats,
+            verify=verify,
+            **kwargs,
+        )
+    else:
+        llvm_module, records = translate_batch(
+            name, circuits, profile, verify=verify, stats=stats, **kwargs
+        )
+        entry_points = [record[1] for record in records]
+
+    if len(entry_points) == 0:
+        raise ValueError("No QuantumCircuits provided")
+    if verify == "module":
+        verify_module(llvm_module, stats)
+    _log.debug(
+        f"Verified {stats.verified_entry_points} of {stats.entry_points} entry points "
+        f"in {stats.verify_seconds:.3f}s ({stats.verify_mode})"
+    )
+
+    output = QirOutput(llvm_module, entry_points)
+    if cache is not None:
+        cache.put(key, output.bitcode, entry_points)
+    return output
+
+
+def iter_qir_shards(
+    circuits: Union[QuantumCircuit, Iterable[QuantumCircuit]],
+    profile: str = "AdaptiveExecution",
+    **kwargs,
+) -> Iterator[Shard]:
+    r"""Converts the Qiskit QuantumCircuit(s) to several QIR Modules within
+    size limits, yielding each module as soon as it is complete.
+
+    Circuits keep their order: each shard holds consecutive circuits. Takes
+    the same arguments as ``to_qir_shards``.
+
+    :returns:
+        Iterator of tuples containing a QIR ``pyqir.Module`` and a dict from
+        the index of each of its circuits in the input to the circuit's
+        entry point name.
+    """
+    for option in ("parameter_binds", "workers", "executor", "cache"):
+        if option in kwargs:
+            raise ValueError(f"{option} is not supported when sharding")
+    limits = ShardLimits(
+        kwargs.pop("max_entry_points", None),
+        kwargs.pop("max_instructions", None),
+        kwargs.pop("max_bytes", None),
+    )
+    _check_verify_mode(kwargs.get("verify", "module"))
+    check_optimization_level(kwargs.get("optimization_level", 0))
+    name, circuits, _ = _batch_input(circuits)
+    return translate_shards(name, circuits, profile, limits, **kwargs)
+
+
+def to_qir_shards(
+    circuits: Union[QuantumCircuit, Iterable[QuantumCircuit]],
+    profile: str = "AdaptiveExecution",
+    **kwargs,
+) -> Tuple[List[Module], Dict[int, Tuple[int, str]]]:
+    r"""Converts the Qiskit QuantumCircuit(s) to several QIR Modules, each
+    within the given limits.
+
+    :param circuits:
+        Qiskit circuit(s) to be converted to QIR, consumed lazily from any
+        iterable.
+    :type circuit: ``Union[QuantumCircuit, Iterable[QuantumCircuit]]``
+    :param profile:
+        The target profile for capability verification: `"BasicExecution"`,
+        `"AdaptiveExecution"` or `"Adaptive_RI"`, which also allows integer
+        computations on results and lowers each register condition to a
+        single branch
+    :type profile: ``str``
+    :param \**kwargs:
+        See below
+    :returns:
+        Tuple containing the list of QIR ``pyqir.Module`` shards and a dict
+        from the index of each input circuit to its shard index and entry
+        point name.
+
+    :Keyword Arguments:
+        * *max_entry_points* (``int``) --
+          Maximum number of entry points per shard, default `None`
+        * *max_instructions* (``int``) --
+          Maximum estimated number of instructions per shard, counting one
+          per circuit operation and one per classical bit, default `None`
+        * *max_bytes* (``int``) --
+          Maximum bitcode size of a shard, bounded by the sizes of its
+          circuits translated on their own, default `None`
+        * *record_output* (``bool``) --
+          Whether to record output calls for registers, default `True`
+        * *emit_barrier_calls* (``bool``) --
+          Whether to emit barrier calls in the QIR, default `False`
+        * *merge_conditions* (``bool``) --
+          As for ``to_qir_module``, default `True`
+        * *optimization_level* (``int``) --
+          As for ``to_qir_module``, default `0`
+        * *virtual_swaps* (``bool``) --
+          As for ``to_qir_module``, default `False`
+        * *fuse_measure_resets* (``bool``) --
+          As for ``to_qir_module``, default `False`
+        * *composite_functions* (``bool``) --
+          As for ``to_qir_module``, default `False`
+        * *loop_threshold* (``int``) --
+          As for ``to_qir_module``, default `None`
+        * *verify* (``str``) --
+          Verification mode, as for ``to_qir_module``, applied to each
+          shard, default `"module"`
+        * *verify_sample_rate* (``int``) --
+          One in how many circuits are verified in `"sampled"` mode,
+          default `10`
+        * *stats* (``TranslationStats``) --
+          Filled in with counters and timings of the translation,
+          default `None`
+
+    At least one limit is required. A circuit exceeding a limit on its own
+    is placed in a shard of its own.
+    """
+    modules = []
+    locations = {}
+    for module, entry_points in iter_qir_shards(circuits, profile, **kwargs):
+        for index, entry_point in entry_points.items():
+            locations[index] = (len(modules), entry_point)
+        modules.append(module)
+    return (modules, locations)
+
+
+def to_qir_module_async(
+    circuits: Union[QuantumCircuit, Iterable[QuantumCircuit]],
+    profile: str = "AdaptiveExecution",
+    **kwargs,
+) -> AsyncTranslation:
+    r"""Converts the Qiskit QuantumCircuit(s) to a QIR Module without
+    blocking the running event loop.
+
+    Circuits are translated on an executor while the event loop keeps
+    running. The returned translation can be awaited for the same result
+    as ``to_qir_module``, or iterated with ``async for`` to receive each
+    entry point name as soon as its circuit is translated::
+
+        translation = to_qir_module_async(circuits)
+        async for entry_point in translation:
+            ...
+        module, entry_points = await translation
+
+    Cancelling the awaiting task or calling ``aclose`` stops the
+    translation: circuits not yet started are dropped along with the
+    partially linked module.
+
+    :param circuits:
+        Qiskit circuit(s) to be converted to QIR, consumed lazily from any
+        iterable.
+    :type circuit: ``Union[QuantumCircuit, Iterable[QuantumCircuit]]``
+    :param profile:
+        The target profile for capability verification
+    :type profile: ``str``
+    :param \**kwargs:
+        See below
+    :returns:
+        An ``AsyncTranslation`` producing the QIR ``pyqir.Module`` and the
+        list of entry point names.
+
+    :Keyword Arguments:
+        * *record_output* (``bool``) --
+          Whether to record output calls for registers, default `True`
+        * *emit_barrier_calls* (``bool``) --
+          Whether to emit barrier calls in the QIR, default `False`
+        * *merge_conditions* (``bool``) --
+          As for ``to_qir_module``, default `True`
+        * *optimization_level* (``int``) --
+          As for ``to_qir_module``, default `0`
+        * *virtual_swaps* (``bool``) --
+          As for ``to_qir_module``, default `False`
+        * *fuse_measure_resets* (``bool``) --
+          As for ``to_qir_module``, default `False`
+        * *composite_functions* (``bool``) --
+          As for ``to_qir_module``, default `False`
+        * *loop_threshold* (``int``) --
+          As for ``to_qir_module``, default `None`
+        * *executor* (``concurrent.futures.Executor``) --
+          Executor translating the circuits, default `None` (the default
+          executor of the event loop)
+        * *workers* (``int``) --
+          Number of worker processes of a process pool created for the
+          translation when no executor is given, default `None`
+        * *chunksize* (``int``) --
+          Number of circuits translated per executor task, default `1`
+        * *verify* (``str``) --
+          Verification mode, as for ``to_qir_module``, default `"module"`
+        * *verify_sample_rate* (``int``) --
+          One in how many circuits are verified in `"sampled"` mode,
+          default `10`
+        * *stats* (``TranslationStats``) --
+          Filled in with counters and timings of the translation,
+          default `None`
     """
+    executor = kwargs.pop("executor", None)
+    workers = kwargs.pop("workers", None)
+    chunksize = kwargs.pop("chunksize", None) or 1
+    stats = kwargs.pop("stats", None)
+    if stats is None:
+        stats = TranslationStats()
+    verify = kwargs.get("verify", "module")
+    _check_verify_mode(verify)
+    check_optimization_level(kwargs.get("optimization_level", 0))
+    stats.verify_mode = verify
+    name, circuits, _ = _batch_input(circuits)
+    return AsyncTranslation(
+        name, circuits, profile, executor, workers, chunksize, stats, kwargs
+    )
+
 
+def _check_verify_mode(verify: str) -> None:
+    if verify not in VERIFY_MODES:
+        raise ValueError(f"Unknown verification mode {verify}, expected {VERIFY_MODES}")
+
+
+def _batch_input(
+    circuits: Union[QuantumCircuit, Iterable[Any]]
+) -> Tuple[str, Iterator[QuantumCircuit], Optional[int]]:
+    """Returns the module name, the checked circuits and the number of
+    circuits when it is known in advance."""
     name = "batch"
     if isinstance(circuits, QuantumCircuit):
         name = circuits.name
         circuits = [circuits]
-    elif isinstance(circuits, list):
-        for value in circuits:
-            if not isinstance(value, QuantumCircuit):
-                raise ValueError(
-                    "Input must be Union[QuantumCircuit, List[QuantumCircuit]]"
-                )
-    else:
-        raise ValueError("Input must be Union[QuantumCircuit, List[QuantumCircuit]]")
+    elif not isinstance(circuits, Iterable) or isinstance(circuits, (str, bytes)):
+        raise ValueError(_INPUT_ERROR)
+    size_hint = len(circuits) if isinstance(circuits, Sized) else None
+    return (name, _checked_circuits(circuits), size_hint)
 
-    if len(circuits) == 0:
-        raise ValueError("No QuantumCircuits provided")
 
-    llvm_module = qir_module(Context(), name)
-    entry_points = []
+def _checked_circuits(circuits: Iterable[Any]) -> Iterator[QuantumCircuit]:
     for circuit in circuits:
-        module = QiskitModule.from_quantum_circuit(circuit, llvm_module)
-        visitor = BasicQisVisitor(profile, **kwargs)
-        module.accept(visitor)
-        entry_points.append(visitor.entry_point)
-    err = llvm_module.verify()
-    if err is not None:
-        raise Exception(err)
-    return (llvm_module, entry_points)
+        if not isinstance(circuit, QuantumCircuit):
+            raise ValueError(_INPUT_ERROR)
+        yield circuit
+        del circuit
@@ -5,8 +5,21 @@
 from io import UnsupportedOperation
 import logging
 from abc import ABCMeta, abstractmethod
+from functools import partial
 from qiskit import ClassicalRegister, QuantumRegister
-from qiskit.circuit import Qubit, Clbit
+from qiskit.circuit import (
+    CASE_DEFAULT,
+    Clbit,
+    ControlFlowOp,
+    ForLoopOp,
+    IfElseOp,
+    Parameter,
+    ParameterExpression,
+    QuantumCircuit,
+    Qubit,
+    SwitchCaseOp,
+)
+from qiskit.circuit.classical import expr
 from qiskit.circuit.instruction import Instruction
 from qiskit.circuit.bit import Bit
 import pyqir.qis as qis
@@ -19,21 +32,27 @@ from pyqir import (
     Function,
     FunctionType,
     IntType,
-    Linkage,
     Module,
     PointerType,
+    Value,
     const,
     entry_point,
     qubit_id,
+    result_id,
 )
-from typing import List, Union
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple, Union
 
 from qiskit_qir.capability import (
     Capability,
     ConditionalBranchingOnResultError,
     QubitUseAfterMeasurementError,
 )
+from qiskit_qir.composites import CompositeCache, Expansion
+from qiskit_qir.constants import ConstantPool
+from qiskit_qir.declarations import DeclarationRegistry
 from qiskit_qir.elements import QiskitModule
+from qiskit_qir.loops import LOOP_ANGLE, LOOP_BEGIN, LOOP_END
+from qiskit_qir.switches import SWITCH, SWITCH_BIT, SWITCH_CASE
 
 _log = logging.getLogger(name=__name__)
 
@@ -96,6 +115,175 @@ _QUANTUM_INSTRUCTIONS = [
 
 _SUPPORTED_INSTRUCTIONS = _QUANTUM_INSTRUCTIONS
 
+_SUPPORTED_INSTRUCTION_SET = frozenset(_SUPPORTED_INSTRUCTIONS)
+
+# us is chosen as the default time unit in QIR since it is well
+# suited to current performance of qubit implementations.
+# When using dt, the backend-dependent time unit, the duration
+# value is left untouched.
+_DELAY_MULTIPLIERS = {
+    "s": 1e6,
+    "ms": 1e3,
+    "us": 1,
+    "ns": 1e-3,
+    "ps": 1e-6,
+    "dt": 1.0,
+}
+
+# Lowers an instruction given the visitor, the instruction and the pyqir
+# constants of its qubits and results.
+InstructionHandler = Callable[
+    ["BasicQisVisitor", Instruction, List[Constant], List[Constant]], None
+]
+
+
+def _visit_measure(visitor, instruction, qubits, results):
+    for qubit, result in zip(qubits, results):
+        visitor._measured_qubits[qubit_id(qubit)] = True
+        qis.mz(visitor._builder, qubit, result)
+
+
+def _visit_measure_x(visitor, instruction, qubits, results):
+    for qubit, result in zip(qubits, results):
+        visitor._measured_qubits[qubit_id(qubit)] = True
+        visitor._call_mx_instruction(qubit, result)
+
+
+def _visit_mresetz(visitor, instruction, qubits, results):
+    for qubit, result in zip(qubits, results):
+        visitor._measured_qubits[qubit_id(qubit)] = True
+        visitor._call_mresetz_instruction(qubit, result)
+
+
+def _visit_barrier(visitor, instruction, qubits, results):
+    if visitor._emit_barrier_calls:
+        qis.barrier(visitor._builder)
+
+
+def _visit_delay(visitor, instruction, qubits, results):
+    duration = instruction.duration * _DELAY_MULTIPLIERS[instruction.unit]
+    visitor._call_delay_instruction(duration, *qubits)
+
+
+def _visit_initialize(visitor, instruction, qubits, results):
+    state = str(instruction.params[0])
+    visitor._call_prepare_basis_instruction(state, *qubits)
+
+
+def _visit_reset(visitor, instruction, qubits, results):
+    qis.reset(visitor._builder, qubits[0])
+
+
+def _visit_id(visitor, instruction, qubits, results):
+    # See: https://github.com/qir-alliance/pyqir/issues/74
+    (qubit,) = qubits
+    qis.x(visitor._builder, qubit)
+    qis.x(visitor._builder, qubit)
+
+
+def _gate(function) -> InstructionHandler:
+    def _visit_gate(visitor, instruction, qubits, results):
+        function(visitor._builder, *qubits)
+
+    return _visit_gate
+
+
+def _rotation(function) -> InstructionHandler:
+    def _visit_rotation(visitor, instruction, qubits, results):
+        function(
+            visitor._builder, visitor._rotation_angle(*instruction.params), *qubits
+        )
+
+    return _visit_rotation
+
+
+_INSTRUCTION_HANDLERS: Dict[str, InstructionHandler] = {
+    "measure": _visit_measure,
+    "m": _visit_measure,
+    "mz": _visit_measure,
+    "measure_x": _visit_measure_x,
+    "mresetz": _visit_mresetz,
+    "barrier": _visit_barrier,
+    "delay": _visit_delay,
+    "initialize": _visit_initialize,
+    "swap": _gate(qis.swap),
+    "ccx": _gate(qis.ccx),
+    "cx": _gate(qis.cx),
+    "cz": _gate(qis.cz),
+    "h": _gate(qis.h),
+    "reset": _visit_reset,
+    "rx": _rotation(qis.rx),
+    "ry": _rotation(qis.ry),
+    "rz": _rotation(qis.rz),
+    "s": _gate(qis.s),
+    "sdg": _gate(qis.s_adj),
+    "t": _gate(qis.t),
+    "tdg": _gate(qis.t_adj),
+    "x": _gate(qis.x),
+    "y": _gate(qis.y),
+    "z": _gate(qis.z),
+    "id": _visit_id,
+}
+
+_MEASUREMENT_INSTRUCTIONS = frozenset(["measure", "m", "mz", "measure_x"])
+
+# Measurements may target measured qubits under any profile.
+_MEASUREMENT_CHECKED_INSTRUCTIONS = (
+    _SUPPORTED_INSTRUCTION_SET - _MEASUREMENT_INSTRUCTIONS
+)
+
+
+def _linear_angles(body: QuantumCircuit, parameter: Parameter) -> bool:
+    """Whether ``parameter`` is only used by the rotations of ``body`` and
+    of its nested control flow, as the sole parameter of linear angles."""
+    for item in body.data:
+        operation = item.operation
+        if isinstance(operation, ControlFlowOp):
+            if not all(_linear_angles(block, parameter) for block in operation.blocks):
+                return False
+            continue
+        for param in operation.params:
+            if parameter not in getattr(param, "parameters", ()):
+                continue
+            if operation.name not in ("rx", "ry", "rz") or param.parameters != {
+                parameter
+            }:
+                return False
+            gradient = param.gradient(parameter)
+            if isinstance(gradient, ParameterExpression) and gradient.parameters:
+                return False
+    return True
+
+
+_NOT_OPS = (expr.Unary.Op.LOGIC_NOT, expr.Unary.Op.BIT_NOT)
+_AND_OPS = (expr.Binary.Op.LOGIC_AND, expr.Binary.Op.BIT_AND)
+_OR_OPS = (expr.Binary.Op.LOGIC_OR, expr.Binary.Op.BIT_OR)
+_EQUALITY_OPS = (expr.Binary.Op.EQUAL, expr.Binary.Op.NOT_EQUAL)
+
+
+def _condition_expr(condition) -> expr.Expr:
+    """The condition of an if-else operation as a boolean expression."""
+    if isinstance(condition, expr.Expr):
+        return condition
+    target, value = condition
+    if isinstance(target, Clbit):
+        return expr.lift(target) if value else expr.logic_not(target)
+    if value >= 1 << target.size:
+        raise ValueError(f"Value {value} is larger than register width {target.size}.")
+    return expr.equal(target, value)
+
+
+def _condition_bits(target) -> List[Clbit]:
+    """The bits of the bit or register read by a condition or switch,
+    least significant first."""
+    if isinstance(target, expr.Var):
+        target = target.var
+    if isinstance(target, Clbit):
+        return [target]
+    if isinstance(target, ClassicalRegister):
+        return list(target)
+    raise ValueError(f"Condition on {target} is not supported.")
+
 
 class QuantumCircuitElementVisitor(metaclass=ABCMeta):
     @abstractmethod
@@ -108,19 +296,84 @@ class QuantumCircuitElementVisitor(metaclass=ABCMeta):
 
 
 class BasicQisVisitor(QuantumCircuitElementVisitor):
+    # Lowering of each natively supported instruction, by name. Use
+    # register_instruction_handler to extend it.
+    _instruction_handlers: Dict[str, InstructionHandler] = _INSTRUCTION_HANDLERS
+    # Instructions rejected on measured qubits when the profile does not
+    # allow qubit use after measurement.
+    _measurement_checked_instructions: FrozenSet[str] = (
+        _MEASUREMENT_CHECKED_INSTRUCTIONS
+    )
+
     def __init__(self, profile: str = "AdaptiveExecution", **kwargs):
         self._module = None
+        self._context = None
+        self._constants: ConstantPool | None = kwargs.get("constant_pool")
+        self._registry: DeclarationRegistry | None = kwargs.get("declarations")
+        self._composites: CompositeCache | None = kwargs.get("composite_cache")
+        if self._composites is None:
+            self._composites = CompositeCache()
         self._qiskitModule: QiskitModule | None = None
         self._builder = None
         self._entry_point = None
+        self._function: Optional[Function] = None
         self._qubit_labels = {}
         self._clbit_labels = {}
         self._profile = profile
         self._capabilities = self._map_profile_to_capabilities(profile)
+        self._conditional_branching = bool(
+            self._capabilities & Capability.CONDITIONAL_BRANCHING_ON_RESULT
+        )
+        self._qubit_use_after_measurement = bool(
+            self._capabilities & Capability.QUBIT_USE_AFTER_MEASUREMENT
+        )
+        self._integer_computations = bool(
+            self._capabilities & Capability.INTEGER_COMPUTATIONS
+        )
         self._measured_qubits = {}
         self._emit_barrier_calls = kwargs.get("emit_barrier_calls", False)
         self._record_output = kwargs.get("record_output", True)
+        self._merge_conditions = kwargs.get("merge_conditions", True)
+        self._virtual_swaps = kwargs.get("virtual_swaps", False)
+        self.removed_swaps = 0
+        # Composite instructions are emitted as internal functions, only
+        # where measured qubits need not be tracked.
+        self._composite_functions = (
+            kwargs.get("composite_functions", False)
+            and self._qubit_use_after_measurement
+        )
+        # Internal functions created by this visitor, emitted on finalize,
+        # with the expansion and number of qubits of their composite.
+        self._function_bodies: List[Tuple[Function, Expansion, int]] = []
+        # Keys of the composite instructions inlined rather than called.
+        self._inlined_composites = set()
+        # Composite expansions found in the cache, and flattened and stored.
+        self.composite_hits = 0
+        self.composite_misses = 0
+        # Repeats are emitted as loops where the visitor need not track
+        # measured qubits across iterations, and where the profile allows
+        # the integer computations counting the iterations.
+        self._loops = self._qubit_use_after_measurement and self._integer_computations
+        # Loops emitted, and instructions not emitted thanks to repeats
+        # emitted as loops.
+        self.loops = 0
+        # Switches emitted, as marked switches on a register or a bit.
+        self.switches = 0
+        self.looped_instructions = 0
+        # Loop parameters of the loops being emitted, with the number of
+        # their loop, their first value and their step.
+        self._loop_parameters: Dict[Parameter, Tuple[int, float, float]] = {}
+        # Consecutive instructions sharing a condition, lowered under one
+        # branch once the run ends.
+        self._conditioned_run: List[Tuple[Instruction, List[Bit], List[Bit]]] = []
+        self._run_condition = None
+        self._run_bits: FrozenSet[Clbit] = frozenset()
+        # Number of conditions being lowered around the current instruction.
+        self._branch_depth = 0
         self._declarations = {}
+        # Result values read since the last write of each result, by result
+        # id, with a scope per branch being lowered.
+        self._result_values: List[Dict[int, Value]] = [{}]
 
     def visit_qiskit_module(self, module: QiskitModule):
         _log.debug(
@@ -129,11 +382,17 @@ class BasicQisVisitor(QuantumCircuitElementVisitor):
         self._module = module.module
         self._qiskitModule = module
         context = self._module.context
+        self._context = context
+        if self._constants is None:
+            self._constants = ConstantPool(context)
+        if self._registry is None:
+            self._registry = DeclarationRegistry(self._module)
         entry = entry_point(
             self._module, module.name, module.num_qubits, module.num_clbits
         )
 
         self._entry_point = entry.name
+        self._function = entry
         self._builder = Builder(context)
         self._builder.insert_at_end(BasicBlock(context, "entry", entry))
 
@@ -146,13 +405,16 @@ class BasicQisVisitor(QuantumCircuitElementVisitor):
         return self._entry_point
 
     def finalize(self):
+        self._flush_conditioned_run()
         self._builder.ret(None)
+        self._emit_function_bodies()
 
     def record_output(self, module: QiskitModule):
+        self._flush_conditioned_run()
         if self._record_output == False:
             return
 
-        i8p = PointerType(IntType(self._module.context, 8))
+        i8p = PointerType(IntType(self._context, 8))
 
         # qiskit inverts the ordering of the results within each register
         # but keeps the overall register ordering
@@ -163,11 +425,11 @@ class BasicQisVisitor(QuantumCircuitElementVisitor):
         for size in module.reg_sizes:
             rt.array_record_output(
                 self._builder,
-                const(IntType(self._module.context, 64), size),
+                const(IntType(self._context, 64), size),
                 Constant.null(i8p),
             )
             for index in range(size - 1, -1, -1):
-                result_ref = pyqir.result(self._module.context, logical_id_base + index)
+                result_ref = self._constants.result(logical_id_base + index)
                 rt.result_record_output(self._builder, result_ref, Constant.null(i8p))
             logical_id_base += size
 
@@ -187,30 +449,466 @@ class BasicQisVisitor(QuantumCircuitElementVisitor):
         else:
             raise ValueError(f"Register of type {type(register)} not supported.")
 
+    def visit_repeat(
+        self, count: int, instructions: List[Tuple[Instruction, List[Bit], List[Bit]]]
+    ):
+        """Visits instructions applied ``count`` times in a row, emitting
+        them once in a loop if the profile allows it."""
+
+        def _body():
+            for instruction, qargs, cargs in instructions:
+                self.visit_instruction(instruction, qargs, cargs)
+
+        if not self._loops:
+            for _ in range(count):
+                _body()
+            return
+        _log.debug(f"Visiting {len(instructions)} instructions repeated {count} times")
+        self._emit_loop(count, _body)
+        self.looped_instructions += len(instructions) * (count - 1)
+
+    def _emit_loop(self, count: int, body: Callable[[], None]) -> None:
+        """Emits the instructions emitted by ``body`` in a loop running
+        ``count`` times, at least once."""
+        if self._branch_depth == 0:
+            self._flush_conditioned_run()
+        # Values read in an iteration are stale in the next, and values
+        # read in the loop are not read when it does not run.
+        self._forget_all_result_values()
+        void = pyqir.Type.void(self._context)
+        i64 = IntType(self._context, 64)
+        # Loops are numbered in the order they begin.
+        loop = const(i64, self.loops)
+        self.loops += 1
+        self._builder.call(
+            self.declare_function(LOOP_BEGIN, FunctionType(void, [i64, i64])),
+            [loop, const(i64, count)],
+        )
+        # Instructions in the loop are lowered as in a branch: each qubit
+        # keeps its label across iterations.
+        self._branch_depth += 1
+        try:
+            body()
+        finally:
+            self._branch_depth -= 1
+        self._forget_all_result_values()
+        self._builder.call(
+            self.declare_function(LOOP_END, FunctionType(void, [i64])), [loop]
+        )
+
+    def _visit_control_flow(
+        self, instruction: ControlFlowOp, qargs: List[Qubit], cargs: List[Clbit]
+    ):
+        if isinstance(instruction, ForLoopOp):
+            self._visit_for_loop(instruction, qargs, cargs)
+        elif isinstance(instruction, IfElseOp):
+            self._visit_if_else(instruction, qargs, cargs)
+        elif isinstance(instruction, SwitchCaseOp):
+            self._visit_switch(instruction, qargs, cargs)
+        else:
+            raise ValueError(
+                f"Control flow instruction {instruction.name} is not supported."
+            )
+
+    def _visit_block(
+        self,
+        block: QuantumCircuit,
+        qargs: List[Qubit],
+        cargs: List[Clbit],
+        binds: Optional[Dict[Parameter, float]] = None,
+    ) -> None:
+        """Visits the instructions of a control flow block applied to the
+        operands of its instruction."""
+        if binds:
+            block = block.assign_parameters(binds)
+        qubits = dict(zip(block.qubits, qargs))
+        clbits = dict(zip(block.clbits, cargs))
+        # Conditions in the block name its own bits.
+        for bit, operand in clbits.items():
+            if bit not in self._clbit_labels:
+                self._clbit_labels[bit] = self._clbit_labels[operand]
+        for item in block.data:
+            self.visit_instruction(
+                item.operation,
+                [qubits[bit] for bit in item.qubits],
+                [clbits[bit] for bit in item.clbits],
+            )
+
+    def _visit_for_loop(
+        self, instruction: ForLoopOp, qargs: List[Qubit], cargs: List[Clbit]
+    ):
+        indexset, parameter, body = instruction.params
+        values = list(indexset)
+        step = values[1] - values[0] if len(values) > 1 else 0
+        native = (
+            self._loops
+            and len(values) > 1
+            and all(value == values[0] + n * step for n, value in enumerate(values))
+            and (parameter is None or _linear_angles(body, parameter))
+        )
+        if not native:
+            _log.debug(f"Unrolling {instruction.name} over {len(values)} values")
+            for value in values:
+                binds = {parameter: value} if parameter in body.parameters else None
+                self._visit_block(body, qargs, cargs, binds)
+            return
+        _log.debug(f"Visiting {instruction.name} over {len(values)} values")
+        if parameter is not None:
+            # The loop is numbered by the loops begun before it.
+            self._loop_parameters[parameter] = (self.loops, values[0], step)
+        try:
+            self._emit_loop(len(values), lambda: self._visit_block(body, qargs, cargs))
+        finally:
+            self._loop_parameters.pop(parameter, None)
+
+    def _visit_if_else(
+        self, instruction: IfElseOp, qargs: List[Qubit], cargs: List[Clbit]
+    ):
+        true_body, false_body = instruction.params
+        _log.debug(f"Visiting {instruction.name} with {len(instruction.blocks)} blocks")
+
+        def _block(body: Optional[QuantumCircuit]) -> Optional[Callable[[], None]]:
+            if body is None:
+                return None
+            return lambda: self._visit_block(body, qargs, cargs)
+
+        self._branch_depth += 1
+        try:
+            self._branch_on_condition(
+                _condition_expr(instruction.condition),
+                one=_block(true_body),
+                zero=_block(false_body),
+            )
+        finally:
+            self._branch_depth -= 1
+
+    def _visit_switch(
+        self, instruction: SwitchCaseOp, qargs: List[Qubit], cargs: List[Clbit]
+    ):
+        if not self._conditional_branching:
+            raise ConditionalBranchingOnResultError(
+                self._qiskitModule.circuit, instruction, qargs, cargs, self._profile
+            )
+        constants = self._constants
+        results = [
+            constants.result(self._clbit_labels.get(bit))
+            for bit in _condition_bits(instruction.target)
+        ]
+        # The block of each case value, and of the values matching no case.
+        cases: Dict[int, Callable[[], None]] = {}
+        default = None
+        for values, body in instruction.cases_specifier():
+            block = lambda body=body: self._visit_block(body, qargs, cargs)
+            for value in values:
+                if value is CASE_DEFAULT:
+                    default = block
+                elif int(value) < 1 << len(results):
+                    cases[int(value)] = block
+        _log.debug(f"Visiting {instruction.name} with {len(cases)} cases")
+        self._branch_depth += 1
+        try:
+            self._emit_switch(results, cases, default)
+        finally:
+            self._branch_depth -= 1
+
+    def _emit_switch(
+        self,
+        results: List[Constant],
+        cases: Dict[int, Callable[[], None]],
+        default: Optional[Callable[[], None]],
+    ) -> None:
+        """Emits a block per case and one for the default, selected by the
+        value of the results.
+
+        Profiles with integer computations switch once on the value of the
+        results. Others branch on each result in turn, every value matching
+        no case branching to the one default block.
+        """
+        context = self._context
+        builder = self._builder
+        number = self.switches
+        # Cases sharing a block are selected by each of their values.
+        values: Dict[Callable[[], None], List[int]] = {}
+        for value, case in cases.items():
+            values.setdefault(case, []).append(value)
+        blocks = [
+            (BasicBlock(context, f"switch.{number}.case.{n}", self._function), case)
+            for n, case in enumerate(values)
+        ]
+        end = BasicBlock(context, f"switch.{number}.end", self._function)
+        default_block = end
+        if default is not None:
+            default_block = BasicBlock(
+                context, f"switch.{number}.default", self._function
+            )
+        if not cases:
+            builder.br(default_block)
+        elif self._integer_computations and len(results) > 1:
+            self._mark_switch(
+                [self._read_result_value(result) for result in results],
+                [(block, values[case]) for block, case in blocks],
+                default_block,
+            )
+        else:
+            self._switch_tree(
+                results,
+                {value: block for block, case in blocks for value in values[case]},
+                default_block,
+                0,
+                f"switch.{number}.bit",
+            )
+        for block, case in blocks:
+            builder.insert_at_end(block)
+            self._visit_scoped(case)
+            builder.br(end)
+        if default is not None:
+            builder.insert_at_end(default_block)
+            self._visit_scoped(default)
+            builder.br(end)
+        builder.insert_at_end(end)
+
+    def _switch_tree(
+        self,
+        results: List[Constant],
+        cases: Dict[int, BasicBlock],
+        default: BasicBlock,
+        position: int,
+        name: str,
+    ) -> None:
+        """Ends the current block with branches on the results from
+        ``position`` on, to the block of the case matching their value or to
+        ``default`` where none does. The blocks branching on the next
+        results are named ``name``."""
+        targets = []
+        for bit in (1, 0):
+            matching = {
+                value: block
+                for value, block in cases.items()
+                if value >> position & 1 == bit
+            }
+            if not matching:
+                targets.append((default, None))
+            elif position + 1 == len(results):
+                (block,) = matching.values()
+                targets.append((block, None))
+            else:
+                block = BasicBlock(self._context, name, self._function)
+                targets.append((block, matching))
+        (one, _), (zero, _) = targets
+        self._branch_to(self._read_result_value(results[position]), one, zero)
+        for block, matching in targets:
+            if matching is not None:
+                self._builder.insert_at_end(block)
+                self._visit_scoped(
+                    partial(
+                        self._switch_tree,
+                        results,
+                        matching,
+                        default,
+                        position + 1,
+                        name,
+                    )
+                )
+
+    def _branch_to(self, value: Value, one: BasicBlock, zero: BasicBlock) -> None:
+        """Ends the current block with a branch on ``value`` to ``one`` or
+        ``zero``."""
+        if one is zero:
+            self._builder.br(one)
+        else:
+            self._mark_switch([value], [(one, [1])], zero)
+
+    def _mark_switch(
+        self,
+        bits: List[Value],
+        cases: List[Tuple[BasicBlock, List[int]]],
+        default: BasicBlock,
+    ) -> None:
+        """Ends the current block with a switch on the integer value of
+        ``bits`` to the block of each case value, or to ``default``. The
+        switch is marked for the linker to lower: a switch on one bit becomes
+        a conditional branch. Leaves the builder in the last case block."""
+        context = self._context
+        builder = self._builder
+        void = pyqir.Type.void(context)
+        i64 = IntType(context, 64)
+        switch = const(i64, self.switches)
+        self.switches += 1
+        marker = self.declare_function(
+            SWITCH_BIT, FunctionType(void, [i64, IntType(context, 1)])
+        )
+        for bit in bits:
+            builder.call(marker, [switch, bit])
+        builder.call(self.declare_function(SWITCH, FunctionType(void, [i64])), [switch])
+        builder.br(default)
+        marker = self.declare_function(SWITCH_CASE, FunctionType(void, [i64, i64]))
+        for block, values in cases:
+            builder.insert_at_end(block)
+            for value in values:
+                builder.call(marker, [switch, const(i64, value)])
+
+    def _visit_scoped(self, callback: Callable[[], None]) -> None:
+        """Runs ``callback`` in a branch: values it reads are only reused
+        within it."""
+        self._result_values.append({})
+        try:
+            callback()
+        finally:
+            self._result_values.pop()
+
     def process_composite_instruction(
         self, instruction: Instruction, qargs: List[Qubit], cargs: List[Clbit]
     ):
-        subcircuit = instruction.definition
         _log.debug(
             f"Processing composite instruction {instruction.name} with qubits {qargs}"
         )
-        if len(qargs) != subcircuit.num_qubits:
+        expansion = self._composite_expansion(instruction, len(qargs), len(cargs))
+        if self._composite_functions:
+            function = self._composite_function(
+                instruction, expansion, len(qargs), len(cargs)
+            )
+            if function is not None:
+                self._call_composite_function(function, qargs, cargs)
+                return
+        for operation, qubit_slots, clbit_slots in expansion:
+            self.visit_instruction(
+                operation,
+                [qargs[n] for n in qubit_slots],
+                [cargs[n] for n in clbit_slots],
+            )
+
+    def _composite_function(
+        self,
+        instruction: Instruction,
+        expansion: Expansion,
+        num_qubits: int,
+        num_clbits: int,
+    ) -> Optional[Function]:
+        """Returns the internal function applying a composite instruction,
+        defining it on first use in the module, or ``None`` if the
+        instruction is inlined.
+
+        Functions are shared by the instructions with the same cache key,
+        which covers the content of their definition, so composites sharing
+        a name and parameters only share a function if they are the same.
+        Instructions whose expansion has conditions are inlined, as their
+        conditions read results of the entry point. So are instructions
+        without a cache key.
+        """
+        key = self._composites.key(instruction, num_qubits, num_clbits)
+        if key is None or key in self._inlined_composites:
+            return None
+        function = self._registry.definition(key)
+        if function is not None:
+            return function
+        if any(
+            getattr(operation, "_condition", None) is not None
+            for operation, _, _ in expansion
+        ):
+            self._inlined_composites.add(key)
+            return None
+        context = self._context
+        function_type = FunctionType(
+            pyqir.Type.void(context),
+            [pyqir.qubit_type(context)] * num_qubits
+            + [pyqir.result_type(context)] * num_clbits,
+        )
+        function = self._registry.define(
+            key, f"__qiskit_qir__{instruction.name}", function_type
+        )
+        self._function_bodies.append((function, expansion, num_qubits))
+        return function
+
+    def _call_composite_function(
+        self, function: Function, qargs: List[Qubit], cargs: List[Clbit]
+    ) -> None:
+        constants = self._constants
+        qubit_labels = self._qubit_labels
+        clbit_labels = self._clbit_labels
+        labels = [clbit_labels.get(bit) for bit in cargs]
+        if labels:
+            self._forget_result_values(labels)
+        self._builder.call(
+            function,
+            [constants.qubit(qubit_labels.get(bit)) for bit in qargs]
+            + [constants.result(n) for n in labels],
+        )
+
+    def _emit_function_bodies(self) -> None:
+        """Emits the bodies of the internal functions created for composite
+        instructions, each operation lowered by its handler on the qubit
+        and result parameters of the function."""
+        handlers = self._instruction_handlers
+        builder = self._builder
+        for function, expansion, num_qubits in self._function_bodies:
+            builder.insert_at_end(BasicBlock(self._context, "entry", function))
+            params = function.params
+            for operation, qubit_slots, clbit_slots in expansion:
+                handlers[operation.name](
+                    self,
+                    operation,
+                    [params[n] for n in qubit_slots],
+                    [params[num_qubits + n] for n in clbit_slots],
+                )
+            builder.ret(None)
+        self._function_bodies = []
+
+    def _composite_expansion(
+        self, instruction: Instruction, num_qubits: int, num_clbits: int
+    ) -> Expansion:
+        """Returns the primitive operations of a composite instruction,
+        flattening its definition on first use."""
+        composites = self._composites
+        key = composites.key(instruction, num_qubits, num_clbits)
+        expansion = composites.get(key)
+        if expansion is not None:
+            self.composite_hits += 1
+            return expansion
+        subcircuit = instruction.definition
+        if not subcircuit:
+            raise ValueError(
+                f"Gate {instruction.name} is not supported. \
+    Please transpile using the list of supported gates: {_SUPPORTED_INSTRUCTIONS}."
+            )
+        if num_qubits != subcircuit.num_qubits:
             raise ValueError(
                 f"Composite instruction {instruction.name} called with the wrong number of qubits; \
-{subcircuit.num_qubits} expected, {len(qargs)} provided"
+{subcircuit.num_qubits} expected, {num_qubits} provided"
             )
-        if len(cargs) != subcircuit.num_clbits:
+        if num_clbits != subcircuit.num_clbits:
             raise ValueError(
                 f"Composite instruction {instruction.name} called with the wrong number of classical bits; \
-{subcircuit.num_clbits} expected, {len(cargs)} provided"
+{subcircuit.num_clbits} expected, {num_clbits} provided"
             )
-        for inst, i_qargs, i_cargs in subcircuit.data:
-            mapped_qbits = [qargs[subcircuit.qubits.index(i)] for i in i_qargs]
-            mapped_clbits = [cargs[subcircuit.clbits.index(i)] for i in i_cargs]
-            _log.debug(
-                f"Processing sub-instruction {inst.name} with mapped qubits {mapped_qbits}"
-            )
-            self.visit_instruction(inst, mapped_qbits, mapped_clbits)
+        qubit_slots = {bit: n for n, bit in enumerate(subcircuit.qubits)}
+        clbit_slots = {bit: n for n, bit in enumerate(subcircuit.clbits)}
+        handlers = self._instruction_handlers
+        expansion = []
+        for item in subcircuit.data:
+            operation = item.operation
+            qubits = tuple(qubit_slots[bit] for bit in item.qubits)
+            clbits = tuple(clbit_slots[bit] for bit in item.clbits)
+            # Conditioned operations are replayed as they are, so that their
+            # condition is lowered around the whole operation.
+            if (
+                operation.name in handlers
+                or getattr(operation, "_condition", None) is not None
+            ):
+                expansion.append((operation, qubits, clbits))
+                continue
+            for nested, nested_qubits, nested_clbits in self._composite_expansion(
+                operation, len(qubits), len(clbits)
+            ):
+                expansion.append(
+                    (
+                        nested,
+                        tuple(qubits[n] for n in nested_qubits),
+                        tuple(clbits[n] for n in nested_clbits),
+                    )
+                )
+        self.composite_misses += 1
+        composites.store(key, expansion)
+        return expansion
 
     def visit_instruction(
         self,
@@ -219,177 +917,430 @@ class BasicQisVisitor(QuantumCircuitElementVisitor):
         cargs: List[Bit],
         skip_condition=False,
     ):
-        qlabels = [self._qubit_labels.get(bit) for bit in qargs]
-        clabels = [self._clbit_labels.get(bit) for bit in cargs]
-        qubits = [pyqir.qubit(self._module.context, n) for n in qlabels]
-        results = [pyqir.result(self._module.context, n) for n in clabels]
-
-        if (
-            instruction.condition is not None
-        ) and not self._capabilities & Capability.CONDITIONAL_BRANCHING_ON_RESULT:
+        name = instruction.name
+        # Instruction.condition warns of its deprecation on every access,
+        # which costs more than lowering most gates.
+        condition = getattr(instruction, "_condition", None)
+        debug = _log.isEnabledFor(logging.DEBUG)
+        if condition is not None and not self._conditional_branching:
             raise ConditionalBranchingOnResultError(
                 self._qiskitModule.circuit, instruction, qargs, cargs, self._profile
             )
+        if isinstance(instruction, ControlFlowOp):
+            # If-else operations hold the condition of their blocks, which is
+            # lowered with them.
+            condition = None
+
+        if condition is not None and skip_condition is False:
+            if debug:
+                _log.debug(
+                    f"Visiting condition for instruction '{name}' ({self._labels(qargs, cargs)})"
+                )
+            if self._merge_conditions and self._branch_depth == 0:
+                self._queue_conditioned(instruction, qargs, cargs, condition)
+            else:
+                self._visit_condition([(instruction, qargs, cargs)], condition)
+            return
+        if self._conditioned_run and self._branch_depth == 0:
+            self._flush_conditioned_run()
+        if debug:
+            _log.debug(f"Visiting instruction '{name}' ({self._labels(qargs, cargs)})")
+
+        handler = self._instruction_handlers.get(name)
+        if name == "mresetz" and not self._qubit_use_after_measurement:
+            # Lowered as the measurement and the reset it fuses, so that the
+            # reset of the measured qubit is rejected.
+            handler = None
+        if handler is None:
+            if isinstance(instruction, ControlFlowOp):
+                self._visit_control_flow(instruction, qargs, cargs)
+                return
+            if debug:
+                _log.debug(
+                    f"About to process composite instruction {name} with qubits {qargs}"
+                )
+            self.process_composite_instruction(instruction, qargs, cargs)
+            return
+
+        constants = self._constants
+        qubit_labels = self._qubit_labels
+        qubits = [constants.qubit(qubit_labels.get(bit)) for bit in qargs]
+        if (
+            not self._qubit_use_after_measurement
+            and name in self._measurement_checked_instructions
+        ):
+            if any(map(self._measured_qubits.get, map(qubit_id, qubits))):
+                raise QubitUseAfterMeasurementError(
+                    self._qiskitModule.circuit,
+                    instruction,
+                    qargs,
+                    cargs,
+                    self._profile,
+                )
+        if name == "swap" and self._virtual_swaps and self._branch_depth == 0:
+            # Rather than exchanging the states of the qubits, the rest of
+            # the circuit uses each qubit in place of the other. Results are
+            # labeled by classical bit, so the output is unchanged.
+            first, second = qargs
+            qubit_labels[first], qubit_labels[second] = (
+                qubit_labels[second],
+                qubit_labels[first],
+            )
+            self.removed_swaps += 1
+            return
+        clbit_labels = self._clbit_labels
+        labels = [clbit_labels.get(bit) for bit in cargs]
+        results = [constants.result(n) for n in labels]
+        if labels:
+            self._forget_result_values(labels)
+        handler(self, instruction, qubits, results)
 
-        labels = ", ".join([str(l) for l in qlabels + clabels])
-        if instruction.condition is None or skip_condition:
-            _log.debug(f"Visiting instruction '{instruction.name}' ({labels})")
+    @classmethod
+    def register_instruction_handler(
+        cls,
+        name: str,
+        handler: InstructionHandler,
+        check_measured_qubits: bool = True,
+    ) -> None:
+        """Lowers instructions named ``name`` with ``handler`` in this class
+        and its subclasses.
 
-        if instruction.condition is not None and skip_condition is False:
-            _log.debug(
-                f"Visiting condition for instruction '{instruction.name}' ({labels})"
+        The handler is called as ``handler(visitor, instruction, qubits,
+        results)`` with the pyqir qubit and result constants of the
+        instruction's operands, after its condition has been lowered.
+        Unless ``check_measured_qubits`` is false, profiles that do not
+        allow it reject the instruction on qubits already measured.
+        Registering a built-in name replaces its lowering.
+
+        Translations use the handlers of ``BasicQisVisitor`` unless another
+        class is passed to them as ``visitor_class``.
+        """
+        if "_instruction_handlers" not in cls.__dict__:
+            cls._instruction_handlers = dict(cls._instruction_handlers)
+            cls._measurement_checked_instructions = frozenset(
+                cls._measurement_checked_instructions
             )
+        cls._instruction_handlers[name] = handler
+        if check_measured_qubits:
+            cls._measurement_checked_instructions |= {name}
+        else:
+            cls._measurement_checked_instructions -= {name}
+
+    def _labels(self, qargs: List[Bit], cargs: List[Bit]) -> str:
+        qlabels = [self._qubit_labels.get(bit) for bit in qargs]
+        clabels = [self._clbit_labels.get(bit) for bit in cargs]
+        return ", ".join([str(l) for l in qlabels + clabels])
 
-            if isinstance(instruction.condition[0], Clbit):
-                bit_label = self._clbit_labels.get(instruction.condition[0])
-                conditions = [pyqir.result(self._module.context, bit_label)]
+    def _queue_conditioned(
+        self, instruction: Instruction, qargs: List[Bit], cargs: List[Bit], condition
+    ):
+        """Adds the instruction to the run of conditioned instructions, which
+        ends at an instruction with another condition and after an
+        instruction writing a bit of the condition."""
+        if self._conditioned_run and condition != self._run_condition:
+            self._flush_conditioned_run()
+        if not self._conditioned_run:
+            self._run_condition = condition
+            if isinstance(condition[0], Clbit):
+                self._run_bits = frozenset([condition[0]])
             else:
-                conditions = [
-                    pyqir.result(self._module.context, self._clbit_labels.get(bit))
-                    for bit in instruction.condition[0]
-                ]
-
-            # Convert value into a bitstring of the same length as classical register
-            # condition should be a
-            # - tuple (ClassicalRegister, int)
-            # - tuple (Clbit, bool)
-            # - tuple (Clbit, int)
-            if isinstance(instruction.condition[0], Clbit):
-                bit: Clbit = instruction.condition[0]
-                value: Union[int, bool] = instruction.condition[1]
-                if value:
-                    values = "1"
-                else:
-                    values = "0"
+                self._run_bits = frozenset(condition[0])
+        self._conditioned_run.append((instruction, qargs, cargs))
+        if not self._run_bits.isdisjoint(cargs):
+            self._flush_conditioned_run()
+
+    def _flush_conditioned_run(self):
+        run = self._conditioned_run
+        if run:
+            self._conditioned_run = []
+            self._visit_condition(run, self._run_condition)
+
+    def _visit_condition(
+        self, run: List[Tuple[Instruction, List[Bit], List[Bit]]], condition
+    ):
+        """Lowers the instructions of the run under one branch on their
+        shared condition."""
+        constants = self._constants
+        if isinstance(condition[0], Clbit):
+            bit_label = self._clbit_labels.get(condition[0])
+            conditions = [constants.result(bit_label)]
+        else:
+            conditions = [
+                constants.result(self._clbit_labels.get(bit)) for bit in condition[0]
+            ]
+
+        # Convert value into a bitstring of the same length as classical register
+        # condition should be a
+        # - tuple (ClassicalRegister, int)
+        # - tuple (Clbit, bool)
+        # - tuple (Clbit, int)
+        if isinstance(condition[0], Clbit):
+            bit: Clbit = condition[0]
+            value: Union[int, bool] = condition[1]
+            if value:
+                values = "1"
             else:
-                register: ClassicalRegister = instruction.condition[0]
-                value: int = instruction.condition[1]
-                values = format(value, f"0{register.size}b")
+                values = "0"
+        else:
+            register: ClassicalRegister = condition[0]
+            value: int = condition[1]
+            values = format(value, f"0{register.size}b")
 
-            # Add branches recursively for each bit in the bitstring
-            def __visit():
+        # Add branches recursively for each bit in the bitstring
+        def __visit():
+            for instruction, qargs, cargs in run:
                 self.visit_instruction(instruction, qargs, cargs, skip_condition=True)
 
-            def _branch(conditions_values):
-                try:
-                    cond, val = next(conditions_values)
+        def _branch(conditions_values):
+            try:
+                cond, val = next(conditions_values)
 
-                    def __branch():
-                        qis.if_result(
-                            self._builder,
-                            cond,
-                            one=_branch(conditions_values) if val == "1" else None,
-                            zero=_branch(conditions_values) if val == "0" else None,
-                        )
+                def __branch():
+                    self._branch_on(
+                        self._read_result_value(cond),
+                        one=_branch(conditions_values) if val == "1" else None,
+                        zero=_branch(conditions_values) if val == "0" else None,
+                    )
 
-                except StopIteration:
-                    return __visit
-                else:
-                    return __branch
+            except StopIteration:
+                return __visit
+            else:
+                return __branch
+
+        if len(conditions) < len(values):
+            raise ValueError(
+                f"Value {value} is larger than register width {len(conditions)}."
+            )
 
-            if len(conditions) < len(values):
-                raise ValueError(
-                    f"Value {value} is larger than register width {len(conditions)}."
+        if self._integer_computations and len(values) > 1:
+            # The register equals the value when each of its bits equals
+            # the bit of the value, so the bits are compared and combined
+            # into a single branch condition.
+            self._branch_depth += 1
+            try:
+                self._branch_on(
+                    self._register_equals(conditions, values[::-1]), one=__visit
                 )
+            finally:
+                self._branch_depth -= 1
+            return
 
-            # qiskit has the most significant bit on the right, so we
-            # must reverse the bit array for comparisons.
+        # qiskit has the most significant bit on the right, so we
+        # must reverse the bit array for comparisons.
+        self._branch_depth += 1
+        try:
             _branch(zip(conditions, values[::-1]))()
-        elif (
-            "measure" == instruction.name
-            or "m" == instruction.name
-            or "mz" == instruction.name
-        ):
-            for qubit, result in zip(qubits, results):
-                self._measured_qubits[qubit_id(qubit)] = True
-                qis.mz(self._builder, qubit, result)
-        elif "measure_x" == instruction.name:
-            for qubit, result in zip(qubits, results):
-                self._measured_qubits[qubit_id(qubit)] = True
-                self._call_mx_instruction(qubit, result)
+        finally:
+            self._branch_depth -= 1
+
+    def _read_result_value(self, result: Constant) -> Value:
+        """Returns the value of the result, reusing the value read in the
+        current block or a block dominating it if the result has not been
+        written since."""
+        n = result_id(result)
+        for values in reversed(self._result_values):
+            value = values.get(n)
+            if value is not None:
+                return value
+        value = self._builder.call(self._read_result_function(), [result])
+        self._result_values[-1][n] = value
+        return value
+
+    def _forget_all_result_values(self) -> None:
+        for values in self._result_values:
+            values.clear()
+
+    def _forget_result_values(self, labels: List[int]) -> None:
+        # A value read before a branch is stale after a write in the branch,
+        # so writes drop the result from every scope.
+        for values in self._result_values:
+            for n in labels:
+                values.pop(n, None)
+
+    def _branch_on(
+        self,
+        cond: Value,
+        one: Optional[Callable[[], None]] = None,
+        zero: Optional[Callable[[], None]] = None,
+    ) -> None:
+        """Branches on ``cond``. Values read in a branch are only reused
+        within it, since they do not dominate the code after it."""
+
+        def _scoped(callback):
+            if callback is None:
+                return None
+            return lambda: self._visit_scoped(callback)
+
+        self._builder.if_(cond, true=_scoped(one), false=_scoped(zero))
+
+    def _register_equals(self, results: List[Constant], bits: str) -> Value:
+        """Reads the results once and returns whether they match ``bits``."""
+        i1 = IntType(self._context, 1)
+        equal = None
+        for result, bit in zip(results, bits):
+            value = self._read_result_value(result)
+            if bit == "0":
+                value = self._builder.xor(value, const(i1, 1))
+            equal = value if equal is None else self._builder.and_(equal, value)
+        return equal
+
+    def _branch_on_condition(
+        self,
+        condition: expr.Expr,
+        one: Optional[Callable[[], None]] = None,
+        zero: Optional[Callable[[], None]] = None,
+    ) -> None:
+        """Branches on a boolean expression of bits and registers, to one
+        block lowering ``one`` and one lowering ``zero``.
+
+        Profiles with integer computations compute the expression and branch
+        once. Others branch on each result the expression reads. The blocks
+        are built here rather than by ``Builder.if_``, so that the branches
+        can hold control flow of their own.
+        """
+        context = self._context
+        builder = self._builder
+        blocks = [
+            (BasicBlock(context, name, self._function), callback)
+            for name, callback in (("then", one), ("else", zero))
+            if callback is not None
+        ]
+        end = BasicBlock(context, "continue", self._function)
+        one_block = blocks[0][0] if one is not None else end
+        zero_block = blocks[-1][0] if zero is not None else end
+        if self._integer_computations:
+            self._branch_to(self._condition_value(condition), one_block, zero_block)
         else:
-            if not self._capabilities & Capability.QUBIT_USE_AFTER_MEASUREMENT:
-                # If we have a supported instruction, apply the capability
-                # check. If we have a composite instruction then it will call
-                # back into this function with a supported name and we'll
-                # verify at that time
-                if instruction.name in _SUPPORTED_INSTRUCTIONS:
-                    if any(map(self._measured_qubits.get, map(qubit_id, qubits))):
-                        raise QubitUseAfterMeasurementError(
-                            self._qiskitModule.circuit,
-                            instruction,
-                            qargs,
-                            cargs,
-                            self._profile,
-                        )
-            if "barrier" == instruction.name:
-                if self._emit_barrier_calls:
-                    qis.barrier(self._builder)
-            elif "delay" == instruction.name:
-                # us is chosen as the default time unit in QIR since it is well
-                # suited to current performance of qubit implementations.
-                # When using dt, the backend-dependent time unit, the duration
-                # value is left untouched.
-                multipliers = {
-                    "s": 1e6,
-                    "ms": 1e3,
-                    "us": 1,
-                    "ns": 1e-3,
-                    "ps": 1e-6,
-                    "dt": 1.0,
-                }
-                duration = instruction.duration * multipliers[instruction.unit]
-                self._call_delay_instruction(duration, *qubits)
-            elif "initialize" == instruction.name:
-                state = str(instruction.params[0])
-                self._call_prepare_basis_instruction(state, *qubits)
-            elif "swap" == instruction.name:
-                qis.swap(self._builder, *qubits)
-            elif "ccx" == instruction.name:
-                qis.ccx(self._builder, *qubits)
-            elif "cx" == instruction.name:
-                qis.cx(self._builder, *qubits)
-            elif "cz" == instruction.name:
-                qis.cz(self._builder, *qubits)
-            elif "h" == instruction.name:
-                qis.h(self._builder, *qubits)
-            elif "reset" == instruction.name:
-                qis.reset(self._builder, qubits[0])
-            elif "rx" == instruction.name:
-                qis.rx(self._builder, *instruction.params, *qubits)
-            elif "ry" == instruction.name:
-                qis.ry(self._builder, *instruction.params, *qubits)
-            elif "rz" == instruction.name:
-                qis.rz(self._builder, *instruction.params, *qubits)
-            elif "s" == instruction.name:
-                qis.s(self._builder, *qubits)
-            elif "sdg" == instruction.name:
-                qis.s_adj(self._builder, *qubits)
-            elif "t" == instruction.name:
-                qis.t(self._builder, *qubits)
-            elif "tdg" == instruction.name:
-                qis.t_adj(self._builder, *qubits)
-            elif "x" == instruction.name:
-                qis.x(self._builder, *qubits)
-            elif "y" == instruction.name:
-                qis.y(self._builder, *qubits)
-            elif "z" == instruction.name:
-                qis.z(self._builder, *qubits)
-            elif "id" == instruction.name:
-                # See: https://github.com/qir-alliance/pyqir/issues/74
-                qubit = pyqir.qubit(self._module.context, qubit_id(*qubits))
-                qis.x(self._builder, qubit)
-                qis.x(self._builder, qubit)
-            elif instruction.definition:
-                _log.debug(
-                    f"About to process composite instruction {instruction.name} with qubits {qargs}"
-                )
-                self.process_composite_instruction(instruction, qargs, cargs)
+            self._condition_tree(condition, one_block, zero_block)
+        for block, callback in blocks:
+            builder.insert_at_end(block)
+            self._visit_scoped(callback)
+            builder.br(end)
+        builder.insert_at_end(end)
+
+    def _condition_tree(
+        self, condition: expr.Expr, one: BasicBlock, zero: BasicBlock
+    ) -> None:
+        """Ends the current block with branches on the results read by
+        ``condition`` to ``one`` where it is true, to ``zero`` otherwise."""
+        context = self._context
+        builder = self._builder
+        if isinstance(condition, expr.Value):
+            builder.br(one if condition.value else zero)
+        elif isinstance(condition, expr.Var):
+            (result,) = self._condition_results(condition)
+            self._branch_to(self._read_result_value(result), one, zero)
+        elif isinstance(condition, expr.Unary) and condition.op in _NOT_OPS:
+            self._condition_tree(condition.operand, zero, one)
+        elif isinstance(condition, expr.Binary) and condition.op in (
+            _AND_OPS + _OR_OPS
+        ):
+            right = BasicBlock(context, "right", self._function)
+            if condition.op in _AND_OPS:
+                self._condition_tree(condition.left, right, zero)
             else:
-                raise ValueError(
-                    f"Gate {instruction.name} is not supported. \
-    Please transpile using the list of supported gates: {_SUPPORTED_INSTRUCTIONS}."
-                )
+                self._condition_tree(condition.left, one, right)
+            builder.insert_at_end(right)
+            self._visit_scoped(
+                partial(self._condition_tree, condition.right, one, zero)
+            )
+        elif isinstance(condition, expr.Binary) and condition.op in _EQUALITY_OPS:
+            results, bits = self._comparison(condition)
+            if condition.op is expr.Binary.Op.NOT_EQUAL:
+                one, zero = zero, one
+
+            def _compare(position: int) -> None:
+                match = one
+                if position + 1 < len(results):
+                    match = BasicBlock(context, "equal", self._function)
+                value = self._read_result_value(results[position])
+                if bits[position] == "1":
+                    self._branch_to(value, match, zero)
+                else:
+                    self._branch_to(value, zero, match)
+                if match is not one:
+                    builder.insert_at_end(match)
+                    self._visit_scoped(partial(_compare, position + 1))
+
+            _compare(0)
+        else:
+            raise ValueError(f"Condition {condition} is not supported.")
+
+    def _condition_value(self, condition: expr.Expr) -> Value:
+        """Computes a boolean expression of bits and registers."""
+        i1 = IntType(self._context, 1)
+        if isinstance(condition, expr.Value):
+            return const(i1, int(bool(condition.value)))
+        if isinstance(condition, expr.Var):
+            (result,) = self._condition_results(condition)
+            return self._read_result_value(result)
+        if isinstance(condition, expr.Unary) and condition.op in _NOT_OPS:
+            return self._builder.xor(
+                self._condition_value(condition.operand), const(i1, 1)
+            )
+        if isinstance(condition, expr.Binary) and condition.op in _AND_OPS:
+            return self._builder.and_(
+                self._condition_value(condition.left),
+                self._condition_value(condition.right),
+            )
+        if isinstance(condition, expr.Binary) and condition.op in _OR_OPS:
+            return self._builder.or_(
+                self._condition_value(condition.left),
+                self._condition_value(condition.right),
+            )
+        if isinstance(condition, expr.Binary) and condition.op in _EQUALITY_OPS:
+            equal = self._register_equals(*self._comparison(condition))
+            if condition.op is expr.Binary.Op.NOT_EQUAL:
+                return self._builder.xor(equal, const(i1, 1))
+            return equal
+        raise ValueError(f"Condition {condition} is not supported.")
+
+    def _condition_results(self, target) -> List[Constant]:
+        """The results of the bit or register read by a condition, least
+        significant first."""
+        return [
+            self._constants.result(self._clbit_labels.get(bit))
+            for bit in _condition_bits(target)
+        ]
+
+    def _comparison(self, condition: expr.Binary) -> Tuple[List[Constant], str]:
+        """The results compared by an equality of a bit or register with a
+        value, and the bits of the value, least significant first."""
+        target, value = condition.left, condition.right
+        if isinstance(target, expr.Value):
+            target, value = value, target
+        if not isinstance(target, expr.Var) or not isinstance(value, expr.Value):
+            raise ValueError(f"Condition {condition} is not supported.")
+        results = self._condition_results(target)
+        return (results, format(int(value.value), f"0{len(results)}b")[::-1])
+
+    def _rotation_angle(self, param) -> Union[float, Value]:
+        """Returns the angle emitted for a rotation parameter, computed from
+        the iteration count when it depends on a loop parameter."""
+        if isinstance(param, ParameterExpression) and self._loop_parameters:
+            # Loops are only emitted when their parameter is the sole
+            # parameter of the angles using it.
+            parameter = next(iter(param.parameters), None)
+            loop = self._loop_parameters.get(parameter)
+            if loop is None:
+                return param
+            number, start, step = loop
+            scale = float(param.gradient(parameter))
+            offset = float(param.bind({parameter: start}))
+            double = pyqir.Type.double(self._context)
+            i64 = IntType(self._context, 64)
+            function = self.declare_function(
+                LOOP_ANGLE, FunctionType(double, [i64, double, double])
+            )
+            return self._builder.call(
+                function,
+                [
+                    const(i64, number),
+                    const(double, scale * step),
+                    const(double, offset),
+                ],
+            )
+        return param
 
     def ir(self) -> str:
         return str(self._module)
@@ -402,45 +1353,61 @@ class BasicQisVisitor(QuantumCircuitElementVisitor):
         if "BasicExecution".lower() == value:
             return Capability.NONE
         elif "AdaptiveExecution".lower() == value:
+            return (
+                Capability.CONDITIONAL_BRANCHING_ON_RESULT
+                | Capability.QUBIT_USE_AFTER_MEASUREMENT
+            )
+        elif "Adaptive_RI".lower() == value:
             return Capability.ALL
         else:
             raise UnsupportedOperation(
                 f"The supplied profile is not supported: {profile}."
             )
 
-    def _declare_delay_instruction(self) -> None:
-        mod = self._module
-        assert mod is not None
-        void = pyqir.Type.void(mod.context)
-        double = pyqir.Type.double(mod.context)
-        function_type = FunctionType(void, [double, pyqir.qubit_type(mod.context)])
-        return Function(
-            function_type, Linkage.EXTERNAL, "__quantum__qis__delay__body", mod
-        )
+    def declare_function(self, name: str, function_type: FunctionType) -> Function:
+        """Returns the external function ``name`` of the module, declaring it
+        on first use. Instruction handlers calling functions that pyqir does
+        not provide should declare them here, so that each is declared once
+        per module."""
+        return self._registry.declare(name, function_type)
+
+    def _declare_delay_instruction(self) -> Function:
+        void = pyqir.Type.void(self._context)
+        double = pyqir.Type.double(self._context)
+        function_type = FunctionType(void, [double, pyqir.qubit_type(self._context)])
+        return self.declare_function("__quantum__qis__delay__body", function_type)
 
-    def _declare_prepare_basis_instruction(self, basis: str) -> None:
-        mod = self._module
-        assert mod is not None
-        void = pyqir.Type.void(mod.context)
-        boolean = pyqir.IntType(mod.context, width=1)
-        function_type = FunctionType(void, [boolean, pyqir.qubit_type(mod.context)])
-        return Function(
-            function_type,
-            Linkage.EXTERNAL,
-            f"__quantum__qis__prepare_{basis}__body",
-            mod,
+    def _declare_prepare_basis_instruction(self, basis: str) -> Function:
+        void = pyqir.Type.void(self._context)
+        boolean = pyqir.IntType(self._context, width=1)
+        function_type = FunctionType(void, [boolean, pyqir.qubit_type(self._context)])
+        return self.declare_function(
+            f"__quantum__qis__prepare_{basis}__body", function_type
         )
 
-    def _declare_mx_instruction(self) -> None:
-        mod = self._module
-        assert mod is not None
-        void = pyqir.Type.void(mod.context)
+    def _declare_mx_instruction(self) -> Function:
+        void = pyqir.Type.void(self._context)
         function_type = FunctionType(
-            void, [pyqir.qubit_type(mod.context), pyqir.result_type(mod.context)]
+            void, [pyqir.qubit_type(self._context), pyqir.result_type(self._context)]
         )
-        return Function(
-            function_type, Linkage.EXTERNAL, f"__quantum__qis__mx__body", mod
+        return self.declare_function("__quantum__qis__mx__body", function_type)
+
+    def _declare_mresetz_instruction(self) -> Function:
+        void = pyqir.Type.void(self._context)
+        function_type = FunctionType(
+            void, [pyqir.qubit_type(self._context), pyqir.result_type(self._context)]
         )
+        return self.declare_function("__quantum__qis__mresetz__body", function_type)
+
+    def _read_result_function(self) -> Function:
+        if "read_result" not in self._declarations:
+            function_type = FunctionType(
+                IntType(self._context, 1), [pyqir.result_type(self._context)]
+            )
+            self._declarations["read_result"] = self.declare_function(
+                "__quantum__qis__read_result__body", function_type
+            )
+        return self._declarations["read_result"]
 
     def _call_delay_instruction(self, duration: float, qubit: Constant) -> None:
         assert self._module is not None
@@ -448,7 +1415,7 @@ class BasicQisVisitor(QuantumCircuitElementVisitor):
         # if we call it multiple times.
         if "delay" not in self._declarations:
             self._declarations["delay"] = self._declare_delay_instruction()
-        double = pyqir.Type.double(self._module.context)
+        double = pyqir.Type.double(self._context)
         self._builder.call(
             self._declarations["delay"], [const(double, duration), qubit]
         )
@@ -459,6 +1426,12 @@ class BasicQisVisitor(QuantumCircuitElementVisitor):
             self._declarations["mx"] = self._declare_mx_instruction()
         self._builder.call(self._declarations["mx"], [qubit, bit])
 
+    def _call_mresetz_instruction(self, qubit: Constant, bit: Constant) -> None:
+        assert self._module is not None
+        if "mresetz" not in self._declarations:
+            self._declarations["mresetz"] = self._declare_mresetz_instruction()
+        self._builder.call(self._declarations["mresetz"], [qubit, bit])
+
     def _call_prepare_basis_instruction(self, state: str, qubit: Constant) -> None:
         assert self._module is not None
         known_states = {
@@ -473,5 +1446,5 @@ class BasicQisVisitor(QuantumCircuitElementVisitor):
             self._declarations[prep_name] = self._declare_prepare_basis_instruction(
                 basis
             )
-        boolean = pyqir.IntType(self._module.context, width=1)
+        boolean = pyqir.IntType(self._context, width=1)
         self._builder.call(self._declarations[prep_name], [const(boolean, arg), qubit])
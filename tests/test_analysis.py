@@ -0,0 +1,106 @@
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+from qiskit import QuantumCircuit
+from qiskit.circuit import Gate
+from qiskit_qir.analysis import analyze
+from qiskit_qir.capability import (
+    CapabilityError,
+    ConditionalBranchingOnResultError,
+    QubitUseAfterMeasurementError,
+)
+from qiskit_qir.translate import to_qir_module
+import pytest
+
+from test_circuits import core_tests
+
+PROFILES = ["BasicExecution", "AdaptiveExecution", "Adaptive_RI"]
+
+
+@pytest.mark.parametrize("circuit_name", core_tests)
+@pytest.mark.parametrize("profile", PROFILES)
+def test_analysis_agrees_with_translation(
+    circuit_name: str, profile: str, request
+) -> None:
+    circuit = request.getfixturevalue(circuit_name)
+    (analysis,) = analyze(circuit, profile)
+    assert analysis.num_qubits == circuit.num_qubits
+    assert analysis.num_results == circuit.num_clbits
+    try:
+        _ = to_qir_module(circuit, profile)
+    except CapabilityError as err:
+        assert not analysis.valid
+        assert type(err) in {type(violation) for violation in analysis.violations}
+    else:
+        assert analysis.valid
+
+
+def feed_forward() -> QuantumCircuit:
+    sub = QuantumCircuit(2, name="sub")
+    sub.h(0)
+    sub.cx(0, 1)
+    circuit = QuantumCircuit(3, 3, name="feed_forward")
+    circuit.h(0)
+    circuit.measure(0, 0)
+    circuit.x(0)
+    circuit.append(sub.to_gate(), [1, 2])
+    circuit.x(1).c_if(circuit.cregs[0], 3)
+    circuit.append(sub.to_gate(), [0, 1])
+    circuit.measure(1, 1)
+    circuit.h(1)
+    return circuit
+
+
+def test_gate_counts_expand_composites() -> None:
+    (analysis,) = analyze(feed_forward())
+    assert analysis.gate_counts == {"h": 4, "cx": 2, "x": 2, "measure": 2}
+    assert analysis.valid
+
+
+@pytest.mark.parametrize(
+    "profile, depth", [("AdaptiveExecution", 3), ("Adaptive_RI", 1)]
+)
+def test_max_branch_depth(profile: str, depth: int) -> None:
+    (analysis,) = analyze(feed_forward(), profile)
+    assert analysis.max_branch_depth == depth
+
+
+def test_all_violations_are_reported() -> None:
+    (analysis,) = analyze(feed_forward(), "BasicExecution")
+    assert not analysis.valid
+    kinds = [type(violation) for violation in analysis.violations]
+    assert kinds.count(ConditionalBranchingOnResultError) == 1
+    # x(0), sub on [0, 1] and h(1) follow a measurement of their qubits.
+    assert kinds.count(QubitUseAfterMeasurementError) == 3
+    names = [violation.instruction.name for violation in analysis.violations]
+    assert names == ["x", "x", "sub", "h"]
+
+
+def test_gate_counts_repeat_for_loop_bodies() -> None:
+    circuit = QuantumCircuit(2, 1)
+    with circuit.for_loop(range(3)) as parameter:
+        circuit.rx(parameter, 1)
+        circuit.cx(0, 1)
+    circuit.measure(0, 0)
+    (analysis,) = analyze(circuit)
+    assert analysis.gate_counts == {"rx": 3, "cx": 3, "measure": 1}
+    assert analysis.valid
+
+
+def test_unsupported_instructions_are_reported() -> None:
+    circuit = QuantumCircuit(1)
+    circuit.append(Gate("opaque", 1, []), [0])
+    circuit.h(0)
+    (analysis,) = analyze(circuit)
+    assert analysis.unsupported == {"opaque"}
+    assert analysis.gate_counts == {"h": 1}
+    assert not analysis.valid
+
+
+def test_analyze_batches() -> None:
+    circuits = [QuantumCircuit(1, name="empty"), feed_forward()]
+    analyses = analyze(iter(circuits))
+    assert [analysis.name for analysis in analyses] == ["empty", "feed_forward"]
+    assert analyses[0].gate_counts == {}
+    assert analyses[0].max_branch_depth == 0
@@ -0,0 +1,185 @@
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
+
+from qiskit import QuantumCircuit
+from qiskit_qir.linker import ModuleLinker
+from qiskit_qir.pipeline import TranslationStats
+from qiskit_qir.translate import to_qir_module, to_qir_module_async
+import pytest
+
+from test_utils import get_circuits, get_entry_point_bodies
+
+
+def test_awaiting_returns_same_module_as_serial_translation() -> None:
+    expected_module, expected_entry_points = to_qir_module(get_circuits(5, names=3))
+
+    async def translate():
+        return await to_qir_module_async(get_circuits(5, names=3))
+
+    module, entry_points = asyncio.run(translate())
+    assert entry_points == expected_entry_points
+    assert get_entry_point_bodies(module) == get_entry_point_bodies(expected_module)
+
+
+def test_entry_points_are_streamed_in_order() -> None:
+    _, expected_entry_points = to_qir_module(get_circuits(7, names=3))
+
+    async def translate():
+        streamed = []
+        with ThreadPoolExecutor(2) as executor:
+            translation = to_qir_module_async(
+                get_circuits(7, names=3), executor=executor, chunksize=2
+            )
+            async for entry_point in translation:
+                streamed.append(entry_point)
+            _, entry_points = await translation
+        return (streamed, entry_points)
+
+    streamed, entry_points = asyncio.run(translate())
+    assert streamed == expected_entry_points
+    assert entry_points == expected_entry_points
+
+
+def test_translation_does_not_block_event_loop() -> None:
+    async def translate():
+        ticks = 0
+        done = False
+
+        async def tick():
+            nonlocal ticks
+            while not done:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        ticker = asyncio.ensure_future(tick())
+        stats = TranslationStats()
+        _ = await to_qir_module_async(get_circuits(20, names=3), stats=stats)
+        done = True
+        await ticker
+        return (ticks, stats)
+
+    ticks, stats = asyncio.run(translate())
+    assert ticks >= 20
+    assert stats.entry_points == 20
+    assert stats.verified_entry_points == 20
+
+
+def test_chunks_are_linked_off_the_event_loop(monkeypatch) -> None:
+    threads = set()
+    add = ModuleLinker.add
+    ir = ModuleLinker.ir
+
+    def record_add(self, *args, **kwargs):
+        threads.add(threading.get_ident())
+        return add(self, *args, **kwargs)
+
+    def record_ir(self):
+        threads.add(threading.get_ident())
+        return ir(self)
+
+    monkeypatch.setattr(ModuleLinker, "add", record_add)
+    monkeypatch.setattr(ModuleLinker, "ir", record_ir)
+
+    async def translate():
+        with ThreadPoolExecutor(2) as executor:
+            return await to_qir_module_async(
+                get_circuits(6, names=3), executor=executor, chunksize=2
+            )
+
+    module, entry_points = asyncio.run(translate())
+    assert len(entry_points) == 6
+    assert module.verify() is None
+    assert len(threads) > 0
+    assert threading.get_ident() not in threads
+
+
+def test_output_parses_the_module_on_first_use() -> None:
+    expected_module, expected_entry_points = to_qir_module(get_circuits(4, names=3))
+
+    async def translate():
+        return await to_qir_module_async(get_circuits(4, names=3)).output()
+
+    output = asyncio.run(translate())
+    assert output.entry_points == expected_entry_points
+    assert len(output.bitcode) > 0
+    module, entry_points = output
+    assert module is output.module
+    assert entry_points == expected_entry_points
+    assert str(module).splitlines()[0] == str(expected_module).splitlines()[0]
+    assert get_entry_point_bodies(module) == get_entry_point_bodies(expected_module)
+
+
+def test_cancellation_stops_consuming_circuits() -> None:
+    consumed = 0
+
+    def generate(count: int) -> Iterator[QuantumCircuit]:
+        nonlocal consumed
+        for circuit in get_circuits(count, names=3):
+            consumed += 1
+            yield circuit
+
+    async def translate():
+        translated = []
+        first = asyncio.Event()
+
+        async def consume(translation):
+            async for entry_point in translation:
+                translated.append(entry_point)
+                first.set()
+
+        with ThreadPoolExecutor(1) as executor:
+            translation = to_qir_module_async(generate(1000), executor=executor)
+            task = asyncio.ensure_future(consume(translation))
+            await first.wait()
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+        return (translation, translated)
+
+    translation, translated = asyncio.run(translate())
+    assert 0 < len(translated) < 1000
+    assert consumed < 1000
+    assert translation.entry_points == translated
+
+
+def test_closed_translation_cannot_be_awaited() -> None:
+    async def translate():
+        async with to_qir_module_async(get_circuits(10, names=3)) as translation:
+            async for _ in translation:
+                break
+        await translation
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(translate())
+
+
+def test_worker_processes_translate_asynchronously() -> None:
+    _, expected_entry_points = to_qir_module(get_circuits(6, names=3))
+
+    async def translate():
+        return await to_qir_module_async(
+            get_circuits(6, names=3), workers=2, verify="off"
+        )
+
+    module, entry_points = asyncio.run(translate())
+    assert entry_points == expected_entry_points
+    assert module.verify() is None
+
+
+def test_empty_input_raises_value_error() -> None:
+    async def translate():
+        return await to_qir_module_async(iter([]))
+
+    with pytest.raises(ValueError):
+        asyncio.run(translate())
+
+
+def test_invalid_input_raises_value_error() -> None:
+    with pytest.raises(ValueError):
+        _ = to_qir_module_async("circuit")
@@ -2,19 +2,21 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 ##
+from qiskit_qir.template import QirTemplate
 from qiskit_qir.translate import to_qir_module
 from qiskit import QuantumCircuit, ClassicalRegister
 from qiskit.circuit import Parameter
 import numpy as np
 from pyqir import Context, Module, is_entry_point
-from typing import List
+from typing import List, Tuple
 import test_utils
+from test_utils import get_entry_point_bodies
 import pytest
+import gc
+import weakref
 
 
-def get_parameterized_circuit(num_qubits: int, num_params: int) -> List[QuantumCircuit]:
-    theta_range = np.linspace(0, 2 * np.pi, num_params)
-
+def get_unbound_circuit(num_qubits: int) -> Tuple[QuantumCircuit, Parameter]:
     theta = Parameter("θ")
     circuit = QuantumCircuit(num_qubits, 1)
 
@@ -30,6 +32,12 @@ def get_parameterized_circuit(num_qubits: int, num_params: int) -> List[QuantumC
         circuit.cx(i, i + 1)
     circuit.h(0)
     circuit.measure(0, 0)
+    return (circuit, theta)
+
+
+def get_parameterized_circuit(num_qubits: int, num_params: int) -> List[QuantumCircuit]:
+    theta_range = np.linspace(0, 2 * np.pi, num_params)
+    circuit, theta = get_unbound_circuit(num_qubits)
 
     circuits = [
         circuit.assign_parameters({theta: theta_val}, inplace=False)
@@ -111,3 +119,71 @@ def test_passing_non_quantum_circuits_raises_value_error() -> None:
 def test_passing_empty_list_of_quantum_circuits_raises_value_error() -> None:
     with pytest.raises(ValueError):
         _ = to_qir_module(list([]))
+
+
+def test_generator_of_circuits_generates_entry_points() -> None:
+    circuits = get_parameterized_circuit(2, 3)
+    module, entry_points = to_qir_module(circuit for circuit in circuits)
+    mod = Module.from_bitcode(Context(), module.bitcode)
+    functions = list(filter(is_entry_point, mod.functions))
+    assert len(functions) == 3
+    assert entry_points == list([x.name for x in functions])
+
+
+def test_generator_circuits_are_released_after_translation() -> None:
+    released = []
+
+    def circuits():
+        previous = None
+        for _ in range(3):
+            circuit = get_parameterized_circuit(2, 1)[0]
+            if previous is not None:
+                gc.collect()
+                released.append(previous() is None)
+            previous = weakref.ref(circuit)
+            yield circuit
+            del circuit
+
+    _ = to_qir_module(circuits())
+    assert released == [True, True]
+
+
+def test_passing_empty_generator_raises_value_error() -> None:
+    with pytest.raises(ValueError):
+        _ = to_qir_module(circuit for circuit in [])
+
+
+@pytest.mark.parametrize("num_params", [1, 2, 3])
+def test_template_binding_matches_assigned_circuits(num_params: int) -> None:
+    circuit, theta = get_unbound_circuit(3)
+    theta_range = np.linspace(0, 2 * np.pi, num_params)
+    module, entry_points = to_qir_module(
+        circuit, parameter_binds=[{theta: value} for value in theta_range]
+    )
+    expected, _ = to_qir_module(get_parameterized_circuit(3, num_params))
+    assert len(entry_points) == num_params
+    assert len(set(entry_points)) == num_params
+    assert get_entry_point_bodies(module) == get_entry_point_bodies(expected)
+
+
+def test_template_records_parameter_slots() -> None:
+    circuit, theta = get_unbound_circuit(3)
+    phi = Parameter("φ")
+    circuit.rx(2 * phi + theta, 0)
+    template = QirTemplate(circuit)
+    assert template.num_slots == 4
+    assert template.parameters == [theta, phi]
+    module, entry_points = template.bind([[0.5, 0.25]])
+    bound = circuit.assign_parameters({theta: 0.5, phi: 0.25})
+    expected, _ = to_qir_module(bound)
+    assert get_entry_point_bodies(module) == get_entry_point_bodies(expected)
+
+
+def test_template_requires_all_parameter_values() -> None:
+    circuit, theta = get_unbound_circuit(2)
+    with pytest.raises(ValueError):
+        _ = to_qir_module(circuit, parameter_binds=[{}])
+    with pytest.raises(ValueError):
+        _ = to_qir_module(circuit, parameter_binds=[[0.1, 0.2]])
+    with pytest.raises(ValueError):
+        _ = to_qir_module([circuit], parameter_binds=[[0.1]])
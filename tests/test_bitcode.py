@@ -0,0 +1,91 @@
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+import asyncio
+import io
+import os
+
+from qiskit_qir.cache import TranslationCache
+from qiskit_qir.output import QirOutput
+from qiskit_qir.translate import to_qir_module, to_qir_module_async, to_qir_output
+from pyqir import Context, Module
+import pytest
+
+from test_utils import get_circuits
+
+
+def test_output_unpacks_like_to_qir_module() -> None:
+    _, expected_entry_points = to_qir_module(get_circuits(3))
+    module, entry_points = to_qir_output(get_circuits(3))
+    assert isinstance(module, Module)
+    assert entry_points == expected_entry_points
+
+
+def test_bitcode_is_serialized_once() -> None:
+    output = to_qir_output(get_circuits(3))
+    assert output.bitcode is output.bitcode
+    view = output.memoryview()
+    assert view.readonly
+    assert view.obj is output.bitcode
+    assert output.size == len(output.bitcode)
+    assert bytes(output) is output.bitcode
+    assert Module.from_bitcode(Context(), bytes(view)).verify() is None
+
+
+def test_truth_does_not_serialize() -> None:
+    output = to_qir_output(get_circuits(3))
+    assert output
+    assert output._bitcode is None
+
+
+def test_cached_bitcode_is_reused() -> None:
+    cache = TranslationCache()
+    first = to_qir_output(get_circuits(3), cache=cache)
+    second = to_qir_output(get_circuits(3), cache=cache)
+    assert cache.hits == 1
+    assert second.bitcode is first.bitcode
+
+
+def test_write_bitcode_to_path_fd_and_file(tmp_path) -> None:
+    output = to_qir_output(get_circuits(3))
+    path = tmp_path / "batch.bc"
+    assert output.write_bitcode(str(path)) == output.size
+    assert path.read_bytes() == output.bitcode
+
+    fd_path = tmp_path / "fd.bc"
+    fd = os.open(fd_path, os.O_WRONLY | os.O_CREAT)
+    try:
+        output.write_bitcode(fd)
+        os.write(fd, b"!")
+    finally:
+        os.close(fd)
+    assert fd_path.read_bytes() == output.bitcode + b"!"
+
+    buffer = io.BytesIO()
+    output.write_bitcode(buffer)
+    assert buffer.getvalue() == output.bitcode
+
+
+def test_write_ir_in_chunks(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr("qiskit_qir.output._IR_CHUNK", 64)
+    output = to_qir_output(get_circuits(3))
+    path = tmp_path / "batch.ll"
+    written = output.write_ir(path)
+    assert path.read_text() == str(output.module)
+    assert written == path.stat().st_size
+
+
+def test_async_output_reuses_bitcode() -> None:
+    async def translate():
+        return await to_qir_module_async(get_circuits(3)).output()
+
+    output = asyncio.run(translate())
+    assert isinstance(output, QirOutput)
+    assert output._bitcode is not None
+    assert Module.from_bitcode(Context(), output.bitcode).verify() is None
+
+
+def test_empty_input_raises_value_error() -> None:
+    with pytest.raises(ValueError):
+        _ = to_qir_output([])
@@ -0,0 +1,255 @@
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+from qiskit import QuantumCircuit
+from qiskit.circuit.classical import expr
+from qiskit_qir.analysis import analyze
+from qiskit_qir.capability import ConditionalBranchingOnResultError
+from qiskit_qir.pipeline import TranslationStats
+from qiskit_qir.switches import SWITCH, SWITCH_BIT, SWITCH_CASE, lower_switches
+from qiskit_qir.translate import iter_qir_shards, to_qir_module
+import pytest
+
+from test_utils import get_entry_point_body
+
+
+def entry_point_body(circuit: QuantumCircuit, profile: str = "AdaptiveExecution"):
+    module, _ = to_qir_module(circuit, profile, record_output=False)
+    assert module.verify() is None
+    return [line for line in get_entry_point_body(str(module).splitlines()) if line]
+
+
+def if_else_circuit(condition) -> QuantumCircuit:
+    circuit = QuantumCircuit(2, 2)
+    circuit.measure([0, 1], [0, 1])
+    with circuit.if_test(condition(circuit)) as else_:
+        circuit.x(0)
+    with else_:
+        circuit.y(0)
+    return circuit
+
+
+def switch_circuit() -> QuantumCircuit:
+    circuit = QuantumCircuit(2, 2)
+    circuit.measure([0, 1], [0, 1])
+    with circuit.switch(circuit.cregs[0]) as case:
+        with case(0, 1):
+            circuit.x(0)
+        with case(3):
+            circuit.y(0)
+        with case(case.DEFAULT):
+            circuit.z(0)
+    return circuit
+
+
+def test_if_else_is_one_branch() -> None:
+    body = entry_point_body(if_else_circuit(lambda c: expr.lift(c.clbits[0])))
+    assert body[3:] == [
+        "%0 = call i1 @__quantum__qis__read_result__body(%Result* null)",
+        "br i1 %0, label %then, label %else",
+        "then:                                             ; preds = %entry",
+        "call void @__quantum__qis__x__body(%Qubit* null)",
+        "br label %continue",
+        "else:                                             ; preds = %entry",
+        "call void @__quantum__qis__y__body(%Qubit* null)",
+        "br label %continue",
+        "continue:                                         ; preds = %else, %then",
+        "ret void",
+    ]
+
+
+def test_register_condition_is_one_branch_with_integer_computations() -> None:
+    body = entry_point_body(if_else_circuit(lambda c: (c.cregs[0], 2)), "Adaptive_RI")
+    assert [line for line in body if line.startswith("br i1")] == [
+        "br i1 %3, label %then, label %else"
+    ]
+    assert body.count("call void @__quantum__qis__y__body(%Qubit* null)") == 1
+
+
+@pytest.mark.parametrize(
+    "condition, profile, branches",
+    [
+        (lambda c: expr.logic_not(c.clbits[1]), "AdaptiveExecution", 1),
+        (
+            lambda c: expr.logic_or(c.clbits[0], c.clbits[1]),
+            "AdaptiveExecution",
+            2,
+        ),
+        (lambda c: expr.logic_or(c.clbits[0], c.clbits[1]), "Adaptive_RI", 1),
+        (lambda c: expr.not_equal(c.cregs[0], 1), "AdaptiveExecution", 2),
+    ],
+)
+def test_expression_conditions(condition, profile, branches) -> None:
+    body = entry_point_body(if_else_circuit(condition), profile)
+    assert len([line for line in body if line.startswith("br i1")]) == branches
+
+
+def test_unsupported_condition() -> None:
+    with pytest.raises(ValueError, match="is not supported"):
+        to_qir_module(if_else_circuit(lambda c: expr.less(c.cregs[0], 2)))
+
+
+def test_switch_is_one_switch_with_integer_computations() -> None:
+    body = entry_point_body(switch_circuit(), "Adaptive_RI")
+    switches = [line for line in body if line.startswith("switch i64")]
+    assert switches == ["switch i64 %switch.0.value.1, label %switch.0.default ["]
+    assert "i64 0, label %switch.0.case.0" in body
+    assert "i64 1, label %switch.0.case.0" in body
+    assert "i64 3, label %switch.0.case.1" in body
+    assert body.count("call void @__quantum__qis__x__body(%Qubit* null)") == 1
+
+
+def test_switch_branches_on_each_bit_without_integer_computations() -> None:
+    body = entry_point_body(switch_circuit())
+    assert not any(SWITCH in line or line.startswith("switch ") for line in body)
+    assert len([line for line in body if line.startswith("br i1")]) == 3
+    assert body.count("call void @__quantum__qis__x__body(%Qubit* null)") == 1
+    assert body.count("call void @__quantum__qis__z__body(%Qubit* null)") == 1
+
+
+def test_values_matching_no_case_share_the_default_block() -> None:
+    circuit = QuantumCircuit(3, 3)
+    circuit.measure([0, 1, 2], [0, 1, 2])
+    with circuit.switch(circuit.cregs[0]) as case:
+        with case(5):
+            circuit.x(0)
+        with case(case.DEFAULT):
+            circuit.h(0)
+            circuit.z(1)
+    body = entry_point_body(circuit)
+    assert len([line for line in body if line.startswith("br i1")]) == 3
+    assert body.count("call void @__quantum__qis__h__body(%Qubit* null)") == 1
+    assert (
+        body.count(
+            "call void @__quantum__qis__z__body(%Qubit* inttoptr (i64 1 to %Qubit*))"
+        )
+        == 1
+    )
+
+
+@pytest.mark.parametrize(
+    "condition",
+    [
+        lambda c: expr.logic_and(c.clbits[0], c.clbits[1]),
+        lambda c: expr.logic_or(c.clbits[0], c.clbits[1]),
+        lambda c: expr.equal(c.cregs[0], 2),
+        lambda c: expr.not_equal(c.cregs[0], 2),
+    ],
+)
+def test_else_block_is_emitted_once(condition) -> None:
+    body = entry_point_body(if_else_circuit(condition))
+    assert len([line for line in body if line.startswith("br i1")]) == 2
+    assert body.count("call void @__quantum__qis__x__body(%Qubit* null)") == 1
+    assert body.count("call void @__quantum__qis__y__body(%Qubit* null)") == 1
+
+
+@pytest.mark.parametrize("profile", ["AdaptiveExecution", "Adaptive_RI"])
+def test_switch_inside_if_else(profile) -> None:
+    circuit = QuantumCircuit(3, 3)
+    circuit.measure([0, 1, 2], [0, 1, 2])
+    with circuit.if_test(expr.logic_or(circuit.clbits[2], circuit.clbits[0])):
+        with circuit.switch(circuit.cregs[0]) as case:
+            with case(3):
+                circuit.x(0)
+            with case(case.DEFAULT):
+                circuit.z(0)
+    body = entry_point_body(circuit, profile)
+    assert not any("__qiskit_qir__" in line for line in body)
+    assert body.count("call void @__quantum__qis__x__body(%Qubit* null)") == 1
+    assert body.count("call void @__quantum__qis__z__body(%Qubit* null)") == 1
+
+
+@pytest.mark.parametrize("build", [if_else_circuit, lambda _: switch_circuit()])
+def test_branches_require_conditional_branching(build) -> None:
+    with pytest.raises(ConditionalBranchingOnResultError):
+        to_qir_module(build(lambda c: expr.lift(c.clbits[0])), "BasicExecution")
+
+
+def test_lower_switches() -> None:
+    lines = [
+        "define void @main() #0 {",
+        "entry:",
+        f"  call void @{SWITCH_BIT}(i64 0, i1 %0)",
+        f"  call void @{SWITCH_BIT}(i64 0, i1 %1)",
+        f"  call void @{SWITCH}(i64 0)",
+        "  br label %default",
+        "",
+        "case:",
+        f"  call void @{SWITCH_CASE}(i64 0, i64 2)",
+        "  br label %default",
+        "",
+        "default:",
+        "  ret void",
+        "}",
+    ]
+    assert lower_switches(lines) == [
+        "define void @main() #0 {",
+        "entry:",
+        "  %switch.0.bit.0 = zext i1 %0 to i64",
+        "  %switch.0.bit.1 = zext i1 %1 to i64",
+        "  %switch.0.shifted.1 = shl i64 %switch.0.bit.1, 1",
+        "  %switch.0.value.1 = or i64 %switch.0.bit.0, %switch.0.shifted.1",
+        "  switch i64 %switch.0.value.1, label %default [ i64 2, label %case ]",
+        "",
+        "case:",
+        "  br label %default",
+        "",
+        "default:",
+        "  ret void",
+        "}",
+    ]
+
+
+def test_lower_switch_on_one_bit() -> None:
+    lines = [
+        "entry:",
+        f"  call void @{SWITCH_BIT}(i64 0, i1 %0)",
+        f"  call void @{SWITCH}(i64 0)",
+        "  br label %else",
+        "then:",
+        f"  call void @{SWITCH_CASE}(i64 0, i64 1)",
+        "  br label %else",
+        "else:",
+        "  ret void",
+    ]
+    assert lower_switches(lines) == [
+        "entry:",
+        "  br i1 %0, label %then, label %else",
+        "then:",
+        "  br label %else",
+        "else:",
+        "  ret void",
+    ]
+
+
+@pytest.mark.parametrize(
+    "options", [{}, {"verify": "per_entry_point"}, {"max_bytes": 1 << 20}]
+)
+def test_switches_in_loops_are_lowered(options) -> None:
+    circuit = switch_circuit()
+    # The loop body has bits of its own.
+    circuit.for_loop(range(4), None, switch_circuit(), [0, 1], [0, 1])
+    stats = TranslationStats()
+    if "max_bytes" in options:
+        ((module, _),) = iter_qir_shards(
+            [circuit, circuit], "Adaptive_RI", stats=stats, **options
+        )
+    else:
+        module, _ = to_qir_module(
+            [circuit, circuit], "Adaptive_RI", stats=stats, **options
+        )
+    ir = str(module)
+    assert module.verify() is None
+    assert "__qiskit_qir__" not in ir
+    assert ir.count("switch i64") == 4
+    assert (stats.loops, stats.switches) == (2, 4)
+
+
+def test_analysis_counts_every_block() -> None:
+    (analysis,) = analyze(switch_circuit())
+    assert analysis.gate_counts == {"measure": 2, "x": 1, "y": 1, "z": 1}
+    assert analysis.max_branch_depth == 2
+    assert analysis.valid
+    (analysis,) = analyze(switch_circuit(), "BasicExecution")
+    assert not analysis.valid
@@ -216,3 +216,125 @@ def test_two_bit_register_invalid_variations(value: int) -> None:
         _ = circuit.measure(2, 2).c_if(cr, value)
 
     assert exc_info is not None
+
+
+def count_result_reads(circuit: QuantumCircuit, **kwargs) -> int:
+    ir = str(to_qir_module(circuit, record_output=False, **kwargs)[0])
+    return ir.count("call i1 @__quantum__qis__read_result__body")
+
+
+def test_consecutive_conditions_share_a_branch() -> None:
+    circuit = QuantumCircuit(3, 3)
+    circuit.measure([0, 1, 2], [0, 1, 2])
+    for _ in range(10):
+        circuit.x(0).c_if(circuit.cregs[0], 5)
+        circuit.h(1).c_if(circuit.cregs[0], 5)
+
+    assert count_result_reads(circuit) == 3
+    # The first bit is read once, the other two in each of 20 branches.
+    assert count_result_reads(circuit, merge_conditions=False) == 41
+
+    module = to_qir_module(circuit, record_output=False)[0]
+    ir = str(module)
+    assert ir.count("call void @__quantum__qis__x__body") == 10
+    assert ir.count("call void @__quantum__qis__h__body") == 10
+    assert module.verify() is None
+
+
+def test_runs_end_at_writes_to_the_condition() -> None:
+    circuit = QuantumCircuit(2, 2)
+    circuit.measure(0, 0)
+    circuit.x(1).c_if(circuit.clbits[0], 1)
+    circuit.measure(1, 0).c_if(circuit.clbits[0], 1)
+    circuit.x(1).c_if(circuit.clbits[0], 1)
+    # Writes to other bits do not end the run.
+    circuit.measure(1, 1).c_if(circuit.clbits[0], 1)
+    circuit.h(1).c_if(circuit.clbits[0], 1)
+    assert count_result_reads(circuit) == 2
+
+
+def test_runs_end_at_other_instructions() -> None:
+    circuit = QuantumCircuit(2, 2)
+    circuit.measure(0, 0)
+    circuit.x(1).c_if(circuit.clbits[0], 1)
+    circuit.x(1).c_if(circuit.clbits[0], 0)
+    circuit.x(1).c_if(circuit.clbits[0], 0)
+    circuit.barrier()
+    circuit.x(1).c_if(circuit.clbits[0], 0)
+    circuit.h(0)
+    circuit.x(1).c_if(circuit.clbits[0], 0)
+    assert count_result_reads(circuit) == 1
+    assert count_result_reads(circuit, merge_conditions=False) == 1
+    ir = str(to_qir_module(circuit, record_output=False)[0])
+    assert ir.count("br i1 ") == 4
+
+
+def test_register_condition_with_integer_computations() -> None:
+    circuit = QuantumCircuit(5, 5)
+    circuit.measure(range(5), range(5))
+    circuit.x(0).c_if(circuit.cregs[0], 0b10110)
+    module = to_qir_module(circuit, "Adaptive_RI", record_output=False)[0]
+    ir = str(module)
+
+    assert module.verify() is None
+    assert ir.count("call i1 @__quantum__qis__read_result__body") == 5
+    # One xor per zero bit of the value, one and per bit after the first.
+    assert ir.count(" = xor i1 ") == 2
+    assert ir.count(" = and i1 ") == 4
+    assert ir.count("br i1 ") == 1
+    assert count_result_reads(circuit) == 5
+    assert str(module).count("br i1 ") < str(to_qir_module(circuit)[0]).count("br i1 ")
+
+
+def test_bit_conditions_with_integer_computations_share_read_result() -> None:
+    circuit = QuantumCircuit(2, 2)
+    circuit.measure([0, 1], [0, 1])
+    circuit.x(0).c_if(circuit.clbits[0], 1)
+    circuit.x(1).c_if(circuit.cregs[0], 2)
+    circuit.x(0).c_if(circuit.clbits[1], 0)
+    module = to_qir_module([circuit, circuit], "Adaptive_RI")[0]
+    ir = str(module)
+
+    assert module.verify() is None
+    assert ir.count("declare i1 @__quantum__qis__read_result__body") == 1
+    assert "read_result__body." not in ir
+
+
+def test_result_reads_are_reused_until_written() -> None:
+    circuit = QuantumCircuit(2, 2)
+    circuit.measure(0, 0)
+    circuit.x(1).c_if(circuit.clbits[0], 1)
+    circuit.h(0)
+    circuit.z(1).c_if(circuit.clbits[0], 1)
+    circuit.measure(0, 0)
+    circuit.x(1).c_if(circuit.clbits[0], 1)
+    module = to_qir_module(circuit, record_output=False)[0]
+
+    assert module.verify() is None
+    assert count_result_reads(circuit) == 2
+
+
+def test_result_reads_in_a_branch_are_not_reused_after_it() -> None:
+    circuit = QuantumCircuit(2, 2)
+    circuit.measure([0, 1], [0, 1])
+    circuit.x(0).c_if(circuit.cregs[0], 3)
+    circuit.x(1).c_if(circuit.clbits[1], 1)
+    circuit.x(0).c_if(circuit.cregs[0], 1)
+    module = to_qir_module(circuit, record_output=False)[0]
+
+    assert module.verify() is None
+    # The second bit is read in the first branch and again after it, where
+    # the read is reused by the last condition.
+    assert count_result_reads(circuit) == 3
+
+
+def test_writes_in_a_branch_invalidate_reads_before_it() -> None:
+    circuit = QuantumCircuit(2, 2)
+    circuit.measure([0, 1], [0, 1])
+    circuit.x(0).c_if(circuit.clbits[0], 1)
+    circuit.measure(1, 0).c_if(circuit.clbits[1], 1)
+    circuit.x(0).c_if(circuit.clbits[0], 1)
+    module = to_qir_module(circuit, record_output=False)[0]
+
+    assert module.verify() is None
+    assert count_result_reads(circuit) == 3
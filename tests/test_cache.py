@@ -0,0 +1,119 @@
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+import os
+
+from qiskit import QuantumCircuit
+from qiskit_qir.cache import TranslationCache
+from qiskit_qir.translate import to_qir_module
+from qiskit_qir.visitor import BasicQisVisitor
+import pytest
+
+
+def get_circuit(angle: float = 0.5, name: str = "cached") -> QuantumCircuit:
+    circuit = QuantumCircuit(2, 2, name=name)
+    circuit.h(0)
+    circuit.rx(angle, 1)
+    circuit.cx(0, 1)
+    circuit.measure([0, 1], [0, 1])
+    return circuit
+
+
+def fail_visit(self, module):
+    raise AssertionError("The visitor should not be used on a cache hit")
+
+
+def test_cache_hit_returns_stored_bitcode(monkeypatch) -> None:
+    cache = TranslationCache()
+    module, entry_points = to_qir_module(get_circuit(), cache=cache)
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    monkeypatch.setattr(BasicQisVisitor, "visit_qiskit_module", fail_visit)
+    cached_module, cached_entry_points = to_qir_module(get_circuit(), cache=cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cached_entry_points == entry_points
+    assert cached_module.bitcode == module.bitcode
+
+
+def test_cache_key_covers_circuit_profile_and_options() -> None:
+    cache = TranslationCache()
+    _ = to_qir_module(get_circuit(), cache=cache)
+    _ = to_qir_module(get_circuit(0.25), cache=cache)
+    _ = to_qir_module(get_circuit(name="renamed"), cache=cache)
+    _ = to_qir_module(get_circuit(), "BasicExecution", cache=cache)
+    _ = to_qir_module(get_circuit(), record_output=False, cache=cache)
+    _ = to_qir_module(get_circuit(), emit_barrier_calls=True, cache=cache)
+    _ = to_qir_module([get_circuit(), get_circuit()], cache=cache)
+    assert (cache.hits, cache.misses) == (0, 7)
+    _ = to_qir_module(get_circuit(), record_output=False, cache=cache)
+    assert (cache.hits, cache.misses) == (1, 7)
+
+
+def test_cache_key_covers_switch_cases() -> None:
+    def switch(value: int) -> QuantumCircuit:
+        circuit = QuantumCircuit(1, 2, name="switch")
+        circuit.measure(0, 0)
+        with circuit.switch(circuit.cregs[0]) as case:
+            with case(value):
+                circuit.x(0)
+        return circuit
+
+    cache = TranslationCache()
+    _ = to_qir_module(switch(1), cache=cache)
+    _ = to_qir_module(switch(2), cache=cache)
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_cache_evicts_least_recently_used_entries() -> None:
+    cache = TranslationCache(max_entries=2)
+    for angle in [0.1, 0.2, 0.1, 0.3]:
+        _ = to_qir_module(get_circuit(angle), cache=cache)
+    assert len(cache) == 2
+    assert cache.stats() == {
+        "hits": 1,
+        "memory_hits": 1,
+        "disk_hits": 0,
+        "misses": 3,
+        "evictions": 1,
+        "memory_evictions": 1,
+        "disk_evictions": 0,
+    }
+    _ = to_qir_module(get_circuit(0.1), cache=cache)
+    assert cache.memory_hits == 2
+
+
+def test_disk_cache_is_shared_between_caches(tmp_path, monkeypatch) -> None:
+    module, entry_points = to_qir_module(
+        get_circuit(), cache=TranslationCache(directory=str(tmp_path))
+    )
+    cache = TranslationCache(directory=str(tmp_path))
+    monkeypatch.setattr(BasicQisVisitor, "visit_qiskit_module", fail_visit)
+    cached_module, cached_entry_points = to_qir_module(get_circuit(), cache=cache)
+    assert cache.disk_hits == 1
+    assert cached_entry_points == entry_points
+    assert cached_module.bitcode == module.bitcode
+    _ = to_qir_module(get_circuit(), cache=cache)
+    assert cache.memory_hits == 1
+
+
+def test_disk_cache_is_bounded(tmp_path) -> None:
+    cache = TranslationCache(directory=str(tmp_path))
+    _ = to_qir_module(get_circuit(), cache=cache)
+    entry_size = sum(f.stat().st_size for f in tmp_path.iterdir())
+
+    cache = TranslationCache(directory=str(tmp_path), max_disk_bytes=2 * entry_size)
+    for angle in [0.1, 0.2, 0.3]:
+        _ = to_qir_module(get_circuit(angle), cache=cache)
+    assert len(os.listdir(tmp_path)) == 2
+    assert cache.disk_evictions == 2
+
+
+def test_corrupt_disk_entries_are_misses(tmp_path) -> None:
+    cache = TranslationCache(directory=str(tmp_path))
+    _ = to_qir_module(get_circuit(), cache=cache)
+    for path in tmp_path.iterdir():
+        path.write_bytes(b"\x00")
+    cache = TranslationCache(directory=str(tmp_path))
+    _ = to_qir_module(get_circuit(), cache=cache)
+    assert (cache.hits, cache.misses) == (0, 1)
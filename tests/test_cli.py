@@ -0,0 +1,130 @@
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+import json
+import os
+
+from qiskit import qpy
+from qiskit_qir.cli import MANIFEST_NAME, main
+from qiskit_qir.translate import to_qir_module
+from pyqir import Context, Module, is_entry_point
+import pytest
+
+from test_utils import get_circuits
+
+
+def write_qpy(path, circuits) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as file:
+        qpy.dump(circuits, file)
+
+
+def read_manifest(directory):
+    with open(directory / MANIFEST_NAME) as file:
+        return json.load(file)["outputs"]
+
+
+def test_translates_files_and_directories(tmp_path, capsys) -> None:
+    write_qpy(tmp_path / "in" / "a.qpy", get_circuits(2, "a"))
+    write_qpy(tmp_path / "in" / "nested" / "b.qpy", get_circuits(3, "b"))
+    write_qpy(tmp_path / "c.qpy", get_circuits(1, "c"))
+    out = tmp_path / "out"
+    assert main([str(tmp_path / "in"), str(tmp_path / "c.qpy"), "-o", str(out)]) == 0
+
+    module = Module.from_bitcode(Context(), (out / "nested" / "b.bc").read_bytes())
+    assert module.verify() is None
+    names = [f.name for f in filter(is_entry_point, module.functions)]
+    assert names == ["b_0", "b_1", "b_2"]
+    manifest = read_manifest(out)
+    assert sorted(manifest) == ["a.bc", "c.bc", os.path.join("nested", "b.bc")]
+    assert manifest["a.bc"]["entry_points"] == ["a_0", "a_1"]
+    assert "Translated 3 files (6 circuits" in capsys.readouterr().out
+
+
+def test_writes_ir_with_options(tmp_path) -> None:
+    circuits = get_circuits(2, "a")
+    write_qpy(tmp_path / "a.qpy", circuits)
+    args = [str(tmp_path / "a.qpy"), "-o", str(tmp_path), "--emit", "ir", "-j", "1"]
+    assert main(args + ["--no-record-output", "-q"]) == 0
+    expected, _ = to_qir_module(circuits, record_output=False)
+    assert (tmp_path / "a.ll").read_text() == str(expected)
+
+
+def test_skips_up_to_date_outputs(tmp_path, capsys) -> None:
+    write_qpy(tmp_path / "a.qpy", get_circuits(1, "a"))
+    write_qpy(tmp_path / "b.qpy", get_circuits(1, "b"))
+    args = [str(tmp_path / "a.qpy"), str(tmp_path / "b.qpy"), "-o", str(tmp_path)]
+    assert main(args + ["-j", "1"]) == 0
+    capsys.readouterr()
+
+    assert main(args) == 0
+    assert "Translated 0 files" in capsys.readouterr().out
+
+    later = os.path.getmtime(tmp_path / "a.bc") + 10
+    os.utime(tmp_path / "b.qpy", (later, later))
+    assert main(args) == 0
+    assert "Translated 1 files" in capsys.readouterr().out
+
+    assert main(args + ["--emit-barrier-calls"]) == 0
+    assert "Translated 2 files" in capsys.readouterr().out
+    assert main(args + ["--emit-barrier-calls", "--force"]) == 0
+    assert "Translated 2 files" in capsys.readouterr().out
+
+
+def test_failures_are_reported(tmp_path, capsys) -> None:
+    write_qpy(tmp_path / "a.qpy", get_circuits(1, "a"))
+    (tmp_path / "bad.qpy").write_bytes(b"not qpy")
+    assert main([str(tmp_path), "-o", str(tmp_path / "out"), "-j", "1"]) == 1
+    captured = capsys.readouterr()
+    assert "bad.qpy" in captured.err
+    assert "1 failed" in captured.out
+    assert list(read_manifest(tmp_path / "out")) == ["a.bc"]
+
+
+def test_colliding_outputs_are_an_error(tmp_path, capsys) -> None:
+    write_qpy(tmp_path / "a" / "x.qpy", get_circuits(1, "a"))
+    write_qpy(tmp_path / "b" / "x.qpy", get_circuits(1, "b"))
+    args = [str(tmp_path / "a" / "x.qpy"), str(tmp_path / "b" / "x.qpy")]
+    assert main(args + ["-o", str(tmp_path / "out")]) == 2
+    assert "would both be written to" in capsys.readouterr().err
+    assert not (tmp_path / "out").exists()
+
+
+def test_repeated_input_is_translated_once(tmp_path, capsys) -> None:
+    write_qpy(tmp_path / "a.qpy", get_circuits(1, "a"))
+    args = [str(tmp_path / "a.qpy"), str(tmp_path), "-o", str(tmp_path / "out")]
+    assert main(args) == 0
+    assert "Translated 1 files" in capsys.readouterr().out
+
+
+def test_manifest_is_replaced_atomically(tmp_path, monkeypatch) -> None:
+    write_qpy(tmp_path / "a.qpy", get_circuits(1, "a"))
+    args = [str(tmp_path / "a.qpy"), "-o", str(tmp_path / "out"), "-j", "1"]
+    assert main(args) == 0
+    manifest = (tmp_path / "out" / MANIFEST_NAME).read_bytes()
+    replace = os.replace
+
+    def fail_on_manifest(source, destination):
+        if str(destination).endswith(MANIFEST_NAME):
+            raise OSError("disk full")
+        replace(source, destination)
+
+    monkeypatch.setattr(os, "replace", fail_on_manifest)
+    with pytest.raises(OSError):
+        main(args + ["--force"])
+    assert (tmp_path / "out" / MANIFEST_NAME).read_bytes() == manifest
+    assert sorted(path.name for path in (tmp_path / "out").iterdir()) == [
+        "a.bc",
+        MANIFEST_NAME,
+    ]
+
+
+def test_missing_input_is_an_error(tmp_path) -> None:
+    assert main([str(tmp_path / "missing.qpy"), "-o", str(tmp_path)]) == 2
+
+
+def test_version(capsys) -> None:
+    with pytest.raises(SystemExit):
+        main(["--version"])
+    assert capsys.readouterr().out.strip()
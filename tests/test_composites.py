@@ -0,0 +1,274 @@
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+from qiskit import QuantumCircuit
+from qiskit.circuit import Delay, Gate, Instruction, Parameter
+from qiskit.circuit.library import PauliEvolutionGate
+from qiskit.quantum_info import SparsePauliOp
+from qiskit_qir.composites import CompositeCache
+from qiskit_qir.pipeline import TranslationStats
+from qiskit_qir.translate import to_qir_module
+import pytest
+import gc
+import warnings
+import weakref
+
+from test_utils import get_entry_point_body
+
+
+class CountingGate(Gate):
+    """A library style gate counting how often its definition is built."""
+
+    definitions = 0
+
+    def __init__(self, theta):
+        super().__init__("counting", 2, [theta])
+
+    def _define(self):
+        CountingGate.definitions += 1
+        definition = QuantumCircuit(2)
+        definition.h(1)
+        definition.cx(1, 0)
+        definition.rz(self.params[0], 0)
+        self.definition = definition
+
+
+def get_body(circuit: QuantumCircuit) -> str:
+    module, _ = to_qir_module(circuit)
+    return "\n".join(get_entry_point_body(str(module).splitlines()))
+
+
+def test_definition_is_flattened_once_per_key() -> None:
+    cache = CompositeCache()
+    circuit = QuantumCircuit(3)
+    for _ in range(100):
+        circuit.append(CountingGate(0.5), [0, 1])
+        circuit.append(CountingGate(0.5), [2, 0])
+        circuit.append(CountingGate(0.25), [1, 2])
+    _ = to_qir_module(circuit, composite_cache=cache)
+    assert (cache.hits, cache.misses) == (298, 2)
+
+
+@pytest.mark.parametrize("options", [{}, {"verify": "per_entry_point"}])
+def test_stats_count_composite_lookups(options) -> None:
+    circuit = QuantumCircuit(3)
+    for _ in range(10):
+        circuit.append(CountingGate(0.5), [0, 1])
+        circuit.append(CountingGate(0.25), [1, 2])
+    stats = TranslationStats()
+    _ = to_qir_module([circuit, circuit], stats=stats, **options)
+    assert (stats.composite_hits, stats.composite_misses) == (38, 2)
+
+
+def test_stats_count_template_composite_lookups_once() -> None:
+    theta = Parameter("theta")
+    circuit = QuantumCircuit(2)
+    for _ in range(3):
+        circuit.append(CountingGate(0.5), [0, 1])
+    circuit.rx(theta, 0)
+    stats = TranslationStats()
+    _ = to_qir_module(circuit, parameter_binds=[[0.1], [0.2]], stats=stats)
+    assert stats.entry_points == 2
+    assert (stats.composite_hits, stats.composite_misses) == (2, 1)
+
+
+def test_same_name_and_params_different_definitions() -> None:
+    circuit = QuantumCircuit(2)
+    circuit.append(PauliEvolutionGate(SparsePauliOp("XX"), 0.5), [0, 1])
+    circuit.append(PauliEvolutionGate(SparsePauliOp("ZZ"), 0.5), [0, 1])
+    other = QuantumCircuit(2)
+    other.append(PauliEvolutionGate(SparsePauliOp("ZZ"), 0.5), [0, 1])
+    module, _ = to_qir_module([circuit, other], record_output=False)
+    first, second = str(module).split("define ")[1:3]
+    # Only the XX evolution changes basis with Hadamards.
+    assert first.count("call void @__quantum__qis__h__body") == 4
+    assert second.count("call void @__quantum__qis__h__body") == 0
+    assert second.count("call void @__quantum__qis__rz__body") == 1
+
+
+def test_expansion_matches_decomposition() -> None:
+    inner = QuantumCircuit(2, name="inner")
+    inner.h(0)
+    inner.cx(0, 1)
+    outer = QuantumCircuit(3, 1, name="outer")
+    outer.append(inner.to_gate(), [2, 0])
+    outer.t(1)
+    outer.append(inner.to_gate(), [1, 2])
+    outer.measure(1, 0)
+    circuit = QuantumCircuit(4, 2)
+    circuit.append(outer.to_instruction(), [0, 1, 2], [1])
+    circuit.append(outer.to_instruction(), [3, 2, 1], [0])
+    circuit.append(CountingGate(0.5), [3, 0])
+
+    expected = QuantumCircuit(4, 2)
+    for qubits, clbit in (([0, 1, 2], 1), ([3, 2, 1], 0)):
+        a, b, c = qubits
+        expected.h(c)
+        expected.cx(c, a)
+        expected.t(b)
+        expected.h(b)
+        expected.cx(b, c)
+        expected.measure(b, clbit)
+    expected.h(0)
+    expected.cx(0, 3)
+    expected.rz(0.5, 3)
+    assert get_body(circuit) == get_body(expected)
+
+
+def test_same_name_different_definitions() -> None:
+    first = QuantumCircuit(1, name="sub")
+    first.h(0)
+    second = QuantumCircuit(1, name="sub")
+    second.x(0)
+    circuit = QuantumCircuit(1)
+    circuit.append(first.to_gate(), [0])
+    circuit.append(second.to_gate(), [0])
+    assert get_body(circuit).splitlines()[1:3] == [
+        "call void @__quantum__qis__h__body(%Qubit* null)",
+        "call void @__quantum__qis__x__body(%Qubit* null)",
+    ]
+
+
+def test_cache_counts_and_keys() -> None:
+    cache = CompositeCache()
+    theta = Parameter("theta")
+    gate = CountingGate(theta)
+    key = cache.key(gate, 2, 0)
+    assert cache.get(key) is None
+    cache.store(key, [])
+    assert cache.get(cache.key(CountingGate(theta), 2, 0)) == []
+    assert cache.get(cache.key(gate, 3, 0)) is None
+    assert (cache.hits, cache.misses, len(cache)) == (1, 1, 1)
+
+
+def test_definitions_are_hashed_without_deprecation() -> None:
+    def conditioned(unit: str) -> Instruction:
+        definition = QuantumCircuit(1, 1)
+        definition.append(Delay(10, unit), [0])
+        definition.x(0).c_if(definition.clbits[0], 1)
+        instruction = Instruction("conditioned", 1, 1, [])
+        instruction.definition = definition
+        return instruction
+
+    cache = CompositeCache()
+    first, second, third = conditioned("ns"), conditioned("ns"), conditioned("us")
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", DeprecationWarning)
+        assert cache.key(first, 1, 1) == cache.key(second, 1, 1)
+        assert cache.key(first, 1, 1) != cache.key(third, 1, 1)
+
+
+def test_cache_keeps_the_most_recently_used_expansions() -> None:
+    cache = CompositeCache(max_entries=2)
+    keys = [cache.key(CountingGate(angle), 2, 0) for angle in (0.1, 0.2, 0.3)]
+    cache.store(keys[0], [])
+    cache.store(keys[1], [])
+    assert cache.get(keys[0]) == []
+    cache.store(keys[2], [])
+    assert len(cache) == 2
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == cache.get(keys[2]) == []
+
+
+def test_cache_does_not_keep_definitions_alive() -> None:
+    cache = CompositeCache()
+    definition = QuantumCircuit(1, name="sub")
+    definition.h(0)
+    gate = definition.to_gate()
+    reference = weakref.ref(gate.definition)
+    key = cache.key(gate, 1, 0)
+    assert cache.key(gate, 1, 0) == key
+    cache.store(key, [])
+    del definition, gate
+    gc.collect()
+    assert reference() is None
+    assert not cache._digests
+
+
+def test_wrong_arity_is_rejected_on_every_use() -> None:
+    gate = CountingGate(0.5)
+    gate.num_qubits = 3
+    circuit = QuantumCircuit(3)
+    circuit.append(gate, [0, 1, 2])
+    for _ in range(2):
+        with pytest.raises(ValueError, match="wrong number of qubits"):
+            _ = to_qir_module(circuit)
+
+
+def block_circuit() -> QuantumCircuit:
+    block = QuantumCircuit(2, 1, name="block")
+    block.h(0)
+    block.cx(0, 1)
+    block.measure(1, 0)
+    circuit = QuantumCircuit(3, 2, name="blocks")
+    gate = block.to_instruction()
+    circuit.append(gate, [0, 1], [0])
+    circuit.append(CountingGate(0.5), [1, 2])
+    circuit.append(gate, [2, 0], [1])
+    return circuit
+
+
+@pytest.mark.parametrize("options", [{}, {"verify": "per_entry_point"}, {"workers": 2}])
+def test_composite_functions(options) -> None:
+    circuit = block_circuit()
+    module, entry_points = to_qir_module(
+        [circuit, circuit], composite_functions=True, **options
+    )
+    ir = str(module)
+    assert entry_points == ["blocks", "blocks.1"]
+    assert ir.count("define internal void @__qiskit_qir__") == 2
+    assert (
+        "define internal void @__qiskit_qir__block_0(%Qubit* %0, %Qubit* %1, %Result* %2)"
+        in ir
+    )
+    assert "  call void @__quantum__qis__cnot__body(%Qubit* %0, %Qubit* %1)" in ir
+    assert get_entry_point_body(ir.splitlines())[1:4] == [
+        "call void @__qiskit_qir__block_0(%Qubit* null, %Qubit* inttoptr (i64 1 to %Qubit*), %Result* null)",
+        "call void @__qiskit_qir__counting_1(%Qubit* inttoptr (i64 1 to %Qubit*), %Qubit* inttoptr (i64 2 to %Qubit*))",
+        "call void @__qiskit_qir__block_0(%Qubit* inttoptr (i64 2 to %Qubit*), %Qubit* null, %Result* inttoptr (i64 1 to %Result*))",
+    ]
+    assert module.verify() is None
+
+
+def test_distinct_definitions_get_distinct_functions() -> None:
+    circuit = QuantumCircuit(2)
+    for _ in range(2):
+        circuit.append(PauliEvolutionGate(SparsePauliOp("XX"), 0.5), [0, 1])
+        circuit.append(PauliEvolutionGate(SparsePauliOp("ZZ"), 0.5), [0, 1])
+    module, _ = to_qir_module(circuit, composite_functions=True)
+    ir = str(module)
+    assert module.verify() is None
+    assert ir.count("define internal") == 2
+    calls = [
+        line.split("(")[0]
+        for line in get_entry_point_body(ir.splitlines())
+        if "__qiskit_qir__" in line
+    ]
+    assert (
+        calls
+        == [
+            "call void @__qiskit_qir__PauliEvolution_0",
+            "call void @__qiskit_qir__PauliEvolution_1",
+        ]
+        * 2
+    )
+
+
+def test_composite_functions_are_inlined_without_use_after_measurement() -> None:
+    circuit = QuantumCircuit(2)
+    circuit.append(CountingGate(0.5), [0, 1])
+    module, _ = to_qir_module(circuit, "BasicExecution", composite_functions=True)
+    assert "define internal" not in str(module)
+
+
+def test_conditioned_composites_are_inlined() -> None:
+    block = QuantumCircuit(1, 1, name="block")
+    block.x(0).c_if(block.clbits[0], 1)
+    circuit = QuantumCircuit(1, 1)
+    circuit.measure(0, 0)
+    circuit.append(block.to_instruction(), [0], [0])
+    circuit.append(block.to_instruction(), [0], [0])
+    module, _ = to_qir_module(circuit, composite_functions=True)
+    assert "define internal" not in str(module)
+    assert str(module).count("call void @__quantum__qis__x__body(") == 2
@@ -0,0 +1,46 @@
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+from qiskit_qir.constants import ConstantPool
+from qiskit_qir.pipeline import TranslationStats
+from qiskit_qir.translate import to_qir_module
+from pyqir import Context, qubit_id, result_id
+import pytest
+
+from test_utils import get_circuits
+
+
+def test_pool_builds_each_constant_once() -> None:
+    pool = ConstantPool(Context())
+    first = pool.qubit(3)
+    assert pool.qubit(3) is first
+    assert qubit_id(first) == 3
+    result = pool.result(3)
+    assert result is not first
+    assert result_id(result) == 3
+    assert pool.result(3) is result
+    assert (pool.hits, pool.misses) == (2, 2)
+
+
+def test_pool_is_shared_by_circuits_of_a_module() -> None:
+    circuits = get_circuits(4)
+    for circuit in circuits:
+        circuit.x(1).c_if(circuit.clbits[0], 1)
+    stats = TranslationStats()
+    _ = to_qir_module(circuits, stats=stats)
+    # Two qubits and two results are built once for the whole batch.
+    assert stats.constant_misses == 4
+    single = TranslationStats()
+    for circuit in circuits:
+        _ = to_qir_module(circuit, stats=single)
+    lookups = single.constant_hits + single.constant_misses
+    assert stats.constant_hits == lookups - 4
+
+
+@pytest.mark.parametrize("verify", ["per_entry_point", "sampled"])
+def test_isolated_translations_count_constants(verify: str) -> None:
+    stats = TranslationStats()
+    _ = to_qir_module(get_circuits(2), verify=verify, verify_sample_rate=1, stats=stats)
+    assert stats.constant_misses >= 4
+    assert stats.constant_hits > 0
@@ -0,0 +1,94 @@
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+from qiskit import QuantumCircuit
+from qiskit.circuit import Gate
+from qiskit_qir.declarations import DeclarationRegistry
+from qiskit_qir.translate import to_qir_module
+from qiskit_qir.visitor import BasicQisVisitor
+from pyqir import Context, FunctionType, IntType, Type, qir_module, result_type
+import pyqir.qis as qis
+import pytest
+
+from test_circuits.custom_mx import MeasureX
+from test_utils import get_circuits
+
+
+def add_declared_instructions(circuit: QuantumCircuit) -> None:
+    circuit.initialize("+", 0)
+    circuit.initialize("1", 1)
+    circuit.delay(0.5, 0, unit="us")
+    circuit.append(MeasureX(), [0], [0])
+    circuit.measure(1, 1)
+    circuit.x(0).c_if(circuit.clbits[1], 1)
+
+
+@pytest.mark.parametrize("verify", ["module", "per_entry_point", "off"])
+def test_functions_are_declared_once_per_module(verify: str) -> None:
+    circuits = get_circuits(3)
+    for circuit in circuits:
+        add_declared_instructions(circuit)
+    module, entry_points = to_qir_module(circuits, verify=verify)
+    ir = str(module)
+    for name in ("delay", "mx", "prepare_x", "prepare_z", "read_result"):
+        assert (
+            ir.count(f"declare void @__quantum__qis__{name}__body")
+            + ir.count(f"declare i1 @__quantum__qis__{name}__body")
+            == 1
+        ), name
+    assert "__body." not in ir
+    assert entry_points == ["circuit_0", "circuit_1", "circuit_2"]
+    assert module.verify() is None
+
+
+def test_registry_reuses_existing_declarations() -> None:
+    module = qir_module(Context(), "test")
+    registry = DeclarationRegistry(module)
+    function_type = FunctionType(
+        IntType(module.context, 1), [result_type(module.context)]
+    )
+    first = registry.declare("__quantum__qis__read_result__body", function_type)
+    assert registry.declare("__quantum__qis__read_result__body", function_type) is (
+        first
+    )
+    assert "__quantum__qis__read_result__body" in registry
+    assert len(registry) == 1
+    assert [function.name for function in module.functions] == [
+        "__quantum__qis__read_result__body"
+    ]
+
+    registry = DeclarationRegistry(module)
+    again = registry.declare("__quantum__qis__read_result__body", function_type)
+    assert again.name == "__quantum__qis__read_result__body"
+    assert len(module.functions) == 1
+
+
+class Heartbeat(Gate):
+    def __init__(self):
+        super().__init__("heartbeat", 1, [])
+
+
+def visit_heartbeat(visitor, instruction, qubits, results):
+    function_type = FunctionType(Type.void(visitor._context), [])
+    visitor._builder.call(
+        visitor.declare_function("__quantum__rt__heartbeat", function_type), []
+    )
+    qis.h(visitor._builder, *qubits)
+
+
+def test_handlers_share_declarations() -> None:
+    class HeartbeatVisitor(BasicQisVisitor):
+        pass
+
+    HeartbeatVisitor.register_instruction_handler("heartbeat", visit_heartbeat)
+    circuits = []
+    for index in range(3):
+        circuit = QuantumCircuit(1, name=f"circuit_{index}")
+        circuit.append(Heartbeat(), [0])
+        circuit.append(Heartbeat(), [0])
+        circuits.append(circuit)
+    module, _ = to_qir_module(circuits, visitor_class=HeartbeatVisitor)
+    ir = str(module)
+    assert ir.count("declare void @__quantum__rt__heartbeat()") == 1
+    assert ir.count("call void @__quantum__rt__heartbeat()") == 6
@@ -0,0 +1,132 @@
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+from qiskit import ClassicalRegister, QuantumCircuit, QuantumRegister
+from qiskit.circuit import Gate
+from qiskit_qir.analysis import analyze
+from qiskit_qir.capability import QubitUseAfterMeasurementError
+from qiskit_qir.translate import to_qir_module
+from qiskit_qir.visitor import BasicQisVisitor
+import pyqir.qis as qis
+import pytest
+
+from test_utils import get_entry_point_body
+
+
+class CustomGate(Gate):
+    def __init__(self):
+        super().__init__("custom", 1, [])
+
+
+def visit_custom(visitor, instruction, qubits, results):
+    qis.h(visitor._builder, *qubits)
+    qis.h(visitor._builder, *qubits)
+
+
+def get_body(circuit: QuantumCircuit, **kwargs) -> str:
+    module, _ = to_qir_module(circuit, **kwargs)
+    return "\n".join(get_entry_point_body(str(module).splitlines()))
+
+
+@pytest.fixture()
+def visitor_class():
+    class CustomVisitor(BasicQisVisitor):
+        pass
+
+    return CustomVisitor
+
+
+# Worker processes import the visitor class, so it is defined, and its
+# handler registered, at module level.
+class WorkerVisitor(BasicQisVisitor):
+    pass
+
+
+WorkerVisitor.register_instruction_handler("custom", visit_custom)
+
+
+def get_circuit() -> QuantumCircuit:
+    circuit = QuantumCircuit(1, 1)
+    circuit.append(CustomGate(), [0])
+    circuit.measure(0, 0)
+    return circuit
+
+
+def test_registered_handler_lowers_instruction(visitor_class) -> None:
+    visitor_class.register_instruction_handler("custom", visit_custom)
+    body = get_body(get_circuit(), visitor_class=visitor_class)
+    assert body.count("call void @__quantum__qis__h__body(%Qubit* null)") == 2
+
+
+def test_registration_does_not_leak_to_base_class(visitor_class) -> None:
+    visitor_class.register_instruction_handler("custom", visit_custom)
+    assert "custom" not in BasicQisVisitor._instruction_handlers
+    assert "custom" not in BasicQisVisitor._measurement_checked_instructions
+
+
+def test_unregistered_instruction_without_definition_is_rejected() -> None:
+    with pytest.raises(ValueError):
+        _ = to_qir_module(get_circuit())
+
+
+def test_registered_handler_replaces_builtin_lowering(visitor_class) -> None:
+    visitor_class.register_instruction_handler("x", visit_custom)
+    circuit = QuantumCircuit(1)
+    circuit.x(0)
+    body = get_body(circuit, visitor_class=visitor_class)
+    assert "__quantum__qis__x__body" not in body
+    assert "__quantum__qis__h__body" in body
+
+
+@pytest.mark.parametrize("check", [True, False])
+def test_registered_handler_measured_qubit_check(visitor_class, check) -> None:
+    visitor_class.register_instruction_handler(
+        "custom", visit_custom, check_measured_qubits=check
+    )
+    circuit = QuantumCircuit(1, 1)
+    circuit.measure(0, 0)
+    circuit.append(CustomGate(), [0])
+    if check:
+        with pytest.raises(QubitUseAfterMeasurementError):
+            _ = to_qir_module(circuit, "BasicExecution", visitor_class=visitor_class)
+    else:
+        _ = to_qir_module(circuit, "BasicExecution", visitor_class=visitor_class)
+
+
+def test_registered_handler_is_conditioned(visitor_class) -> None:
+    visitor_class.register_instruction_handler("custom", visit_custom)
+    qr = QuantumRegister(1)
+    cr = ClassicalRegister(1)
+    circuit = QuantumCircuit(qr, cr)
+    circuit.measure(0, 0)
+    circuit.append(CustomGate(), [0]).c_if(cr, 1)
+    body = get_body(circuit, visitor_class=visitor_class)
+    assert "br i1" in body
+    assert body.count("__quantum__qis__h__body") == 2
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {},
+        {"workers": 2},
+        {"verify": "per_entry_point"},
+        {"parameter_binds": [{}]},
+        {"composite_functions": True},
+    ],
+)
+def test_visitor_class_lowers_every_path(options) -> None:
+    circuit = get_circuit()
+    body = get_body(circuit, visitor_class=WorkerVisitor, **options)
+    assert body.count("call void @__quantum__qis__h__body(%Qubit* null)") == 2
+    with pytest.raises(ValueError):
+        _ = to_qir_module(circuit, **options)
+
+
+def test_visitor_class_is_used_by_analysis() -> None:
+    (analysis,) = analyze(get_circuit(), visitor_class=WorkerVisitor)
+    assert analysis.valid
+    assert analysis.gate_counts == {"custom": 1, "measure": 1}
+    (analysis,) = analyze(get_circuit())
+    assert analysis.unsupported == {"custom"}
@@ -0,0 +1,294 @@
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+from qiskit import QuantumCircuit
+from qiskit.circuit import Parameter
+from qiskit.circuit.library import PauliEvolutionGate
+from qiskit.quantum_info import SparsePauliOp
+from qiskit_qir.loops import LOOP_BEGIN, LOOP_END, lower_loops
+from qiskit_qir.passes import Repeat, find_repeats
+from qiskit_qir.pipeline import TranslationStats
+from qiskit_qir.translate import iter_qir_shards, to_qir_module
+import pytest
+
+from test_utils import get_entry_point_body
+
+
+def layered(layers: int) -> QuantumCircuit:
+    circuit = QuantumCircuit(3, 3, name="layered")
+    circuit.h(0)
+    for _ in range(layers):
+        circuit.rzz(0.1, 0, 1)
+        circuit.rzz(0.1, 1, 2)
+        circuit.rx(0.2, 0)
+        circuit.rx(0.2, 1)
+        circuit.rx(0.2, 2)
+    circuit.measure([0, 1, 2], [0, 1, 2])
+    return circuit
+
+
+def shape(items):
+    return [
+        (
+            (item.count, len(item.instructions))
+            if isinstance(item, Repeat)
+            else item[0].name
+        )
+        for item in items
+    ]
+
+
+def test_find_repeats() -> None:
+    assert shape(find_repeats(layered(4).data, 10)) == [
+        "h",
+        (4, 5),
+        "measure",
+        "measure",
+        "measure",
+    ]
+
+
+def test_find_repeats_threshold() -> None:
+    assert shape(find_repeats(layered(2).data, 11)) == shape(layered(2).data)
+
+
+def test_find_repeats_prefers_the_largest_saving() -> None:
+    circuit = QuantumCircuit(2)
+    for _ in range(3):
+        circuit.x(0)
+        circuit.x(0)
+        circuit.y(1)
+    assert shape(find_repeats(circuit.data, 2)) == [(3, 3)]
+
+
+def test_find_repeats_of_windows_repeating_an_instruction() -> None:
+    circuit = QuantumCircuit(1)
+    for _ in range(2):
+        for _ in range(70):
+            circuit.h(0)
+        circuit.x(0)
+    assert shape(find_repeats(circuit.data, 100)) == [(2, 71)]
+
+
+def test_operands_and_parameters_must_match() -> None:
+    circuit = QuantumCircuit(2)
+    for angle in (0.1, 0.1, 0.2, 0.2):
+        circuit.rx(angle, 0)
+    for qubit in (0, 1):
+        circuit.h(qubit)
+    assert shape(find_repeats(circuit.data, 2)) == [(2, 1), (2, 1), "h", "h"]
+
+
+def test_same_name_and_params_different_definitions() -> None:
+    circuit = QuantumCircuit(2)
+    for _ in range(4):
+        circuit.append(PauliEvolutionGate(SparsePauliOp("XX"), 0.5), [0, 1])
+        circuit.append(PauliEvolutionGate(SparsePauliOp("ZZ"), 0.5), [0, 1])
+    (repeat,) = find_repeats(circuit.data, 2)
+    assert repeat.count == 4
+    assert [
+        str(operation.operator.paulis[0]) for operation, _, _ in repeat.instructions
+    ] == ["XX", "ZZ"]
+
+
+def test_lower_nested_loops() -> None:
+    lines = [
+        "define void @main() #0 {",
+        "entry:",
+        f"  call void @{LOOP_BEGIN}(i64 0, i64 3)",
+        "  call void @a()",
+        f"  call void @{LOOP_BEGIN}(i64 1, i64 2)",
+        "  call void @b()",
+        f"  call void @{LOOP_END}(i64 1)",
+        f"  call void @{LOOP_END}(i64 0)",
+        "  ret void",
+        "}",
+    ]
+    assert lower_loops(lines) == [
+        "define void @main() #0 {",
+        "entry:",
+        "  br label %loop.0",
+        "",
+        "loop.0:",
+        "  %loop.0.i = phi i64 [ 0, %entry ], [ %loop.0.next, %loop.1.exit ]",
+        "  call void @a()",
+        "  br label %loop.1",
+        "",
+        "loop.1:",
+        "  %loop.1.i = phi i64 [ 0, %loop.0 ], [ %loop.1.next, %loop.1 ]",
+        "  call void @b()",
+        "  %loop.1.next = add i64 %loop.1.i, 1",
+        "  %loop.1.done = icmp eq i64 %loop.1.next, 2",
+        "  br i1 %loop.1.done, label %loop.1.exit, label %loop.1",
+        "",
+        "loop.1.exit:",
+        "  %loop.0.next = add i64 %loop.0.i, 1",
+        "  %loop.0.done = icmp eq i64 %loop.0.next, 3",
+        "  br i1 %loop.0.done, label %loop.0.exit, label %loop.0",
+        "",
+        "loop.0.exit:",
+        "  ret void",
+        "}",
+    ]
+
+
+@pytest.mark.parametrize(
+    "options", [{}, {"verify": "per_entry_point"}, {"max_bytes": 1 << 20}]
+)
+def test_repeats_become_loops(options) -> None:
+    circuit = layered(100)
+    stats = TranslationStats()
+    if "max_bytes" in options:
+        ((module, entry_points),) = iter_qir_shards(
+            [circuit, circuit],
+            "Adaptive_RI",
+            loop_threshold=16,
+            stats=stats,
+            **options,
+        )
+        entry_points = list(entry_points.values())
+    else:
+        module, entry_points = to_qir_module(
+            [circuit, circuit],
+            "Adaptive_RI",
+            loop_threshold=16,
+            stats=stats,
+            **options,
+        )
+    ir = str(module)
+    assert module.verify() is None
+    assert entry_points == ["layered", "layered.1"]
+    assert LOOP_BEGIN not in ir
+    assert ir.count("icmp eq i64 %loop.0.next, 100") == 2
+    assert ir.count("call void @__quantum__qis__rx__body(") == 6
+    assert stats.instructions == 2 * 504
+    assert stats.looped_instructions == 2 * 99 * 5
+    assert stats.compression_ratio == pytest.approx(504 / 9)
+
+
+def test_loops_are_unrolled_without_use_after_measurement() -> None:
+    stats = TranslationStats()
+    module, _ = to_qir_module(
+        layered(10), "BasicExecution", loop_threshold=16, stats=stats
+    )
+    assert "loop" not in str(module)
+    assert str(module).count("call void @__quantum__qis__rx__body(") == 30
+    assert stats.compression_ratio == 1.0
+
+
+def test_loops_are_unrolled_without_integer_computations() -> None:
+    circuit = layered(10)
+    with circuit.for_loop(range(4)) as parameter:
+        circuit.rx(parameter, 0)
+    stats = TranslationStats()
+    module, _ = to_qir_module(
+        circuit, "AdaptiveExecution", loop_threshold=16, stats=stats
+    )
+    ir = str(module)
+    assert module.verify() is None
+    assert "phi" not in ir
+    assert not any(op in ir for op in ("add i64", "icmp", "sitofp", "fmul"))
+    assert ir.count("call void @__quantum__qis__rx__body(") == 34
+    assert stats.loops == 0
+
+
+def test_results_are_read_again_in_each_iteration() -> None:
+    circuit = QuantumCircuit(1, 1)
+    circuit.measure(0, 0)
+    circuit.x(0).c_if(circuit.clbits[0], 1)
+    for _ in range(8):
+        circuit.h(0).c_if(circuit.clbits[0], 1)
+        circuit.measure(0, 0)
+    circuit.x(0).c_if(circuit.clbits[0], 1)
+    module, _ = to_qir_module(
+        circuit, "Adaptive_RI", loop_threshold=8, record_output=False
+    )
+    assert module.verify() is None
+    body = get_entry_point_body(str(module).splitlines())
+    reads = [line for line in body if "read_result" in line]
+    assert len(reads) == 3
+    assert "icmp eq i64 %loop.0.next, 8" in "\n".join(body)
+
+
+def for_loop_circuit(indexset, angle) -> QuantumCircuit:
+    circuit = QuantumCircuit(2, 1)
+    with circuit.for_loop(indexset) as parameter:
+        circuit.h(0)
+        circuit.rx(angle(parameter), 1)
+        circuit.cx(0, 1)
+    circuit.measure(0, 0)
+    return circuit
+
+
+def test_for_loop_is_lowered_to_a_loop() -> None:
+    stats = TranslationStats()
+    module, _ = to_qir_module(
+        for_loop_circuit(range(2, 100, 3), lambda i: 0.5 * i + 1),
+        "Adaptive_RI",
+        stats=stats,
+        record_output=False,
+    )
+    assert module.verify() is None
+    body = [line for line in get_entry_point_body(str(module).splitlines()) if line]
+    assert stats.loops == 1
+    assert body[1:12] == [
+        "br label %loop.0",
+        "loop.0:                                           ; preds = %loop.0, %entry",
+        "%loop.0.i = phi i64 [ 0, %entry ], [ %loop.0.next, %loop.0 ]",
+        "call void @__quantum__qis__h__body(%Qubit* null)",
+        "%loop.0.count.0 = sitofp i64 %loop.0.i to double",
+        "%loop.0.scaled.0 = fmul double %loop.0.count.0, 1.500000e+00",
+        "%0 = fadd double %loop.0.scaled.0, 2.000000e+00",
+        "call void @__quantum__qis__rx__body(double %0, %Qubit* inttoptr (i64 1 to %Qubit*))",
+        "call void @__quantum__qis__cnot__body(%Qubit* null, %Qubit* inttoptr (i64 1 to %Qubit*))",
+        "%loop.0.next = add i64 %loop.0.i, 1",
+        "%loop.0.done = icmp eq i64 %loop.0.next, 33",
+    ]
+
+
+def test_nested_for_loops() -> None:
+    circuit = QuantumCircuit(2)
+    with circuit.for_loop(range(4)) as i:
+        with circuit.for_loop(range(5)) as j:
+            circuit.rz(i, 0)
+            circuit.ry(j, 1)
+    module, _ = to_qir_module(circuit, "Adaptive_RI")
+    ir = str(module)
+    assert module.verify() is None
+    assert "%loop.0.count.0 = sitofp i64 %loop.0.i to double" in ir
+    assert "%loop.1.count.1 = sitofp i64 %loop.1.i to double" in ir
+    assert ir.count("call void @__quantum__qis__rz__body(") == 1
+
+
+@pytest.mark.parametrize(
+    "indexset, angle, profile",
+    [
+        (range(4), lambda i: i * i, "AdaptiveExecution"),
+        ((0, 1, 3), lambda i: i, "AdaptiveExecution"),
+        (range(4), lambda i: i, "BasicExecution"),
+    ],
+)
+def test_for_loops_are_unrolled(indexset, angle, profile) -> None:
+    module, _ = to_qir_module(
+        for_loop_circuit(indexset, angle), profile, record_output=False
+    )
+    body = get_entry_point_body(str(module).splitlines())
+    rotations = [line for line in body if "rx__body" in line]
+    assert "loop" not in str(module)
+    assert rotations == [
+        f"call void @__quantum__qis__rx__body(double {float(angle(i)):e}, %Qubit* inttoptr (i64 1 to %Qubit*))"
+        for i in indexset
+    ]
+
+
+def test_for_loop_with_parameter_binds() -> None:
+    theta = Parameter("theta")
+    circuit = for_loop_circuit(range(3), lambda i: i + 1)
+    circuit.rz(theta, 0)
+    module, entry_points = to_qir_module(
+        circuit, "Adaptive_RI", parameter_binds=[[0.1], [0.2]]
+    )
+    assert len(entry_points) == 2
+    assert module.verify() is None
+    assert str(module).count("phi i64") == 2
@@ -0,0 +1,70 @@
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+from concurrent.futures import ThreadPoolExecutor
+
+from qiskit import QuantumCircuit
+from qiskit_qir.capability import QubitUseAfterMeasurementError
+from qiskit_qir.translate import to_qir_module
+from pyqir import Context, Module, is_entry_point
+import pytest
+
+from test_utils import get_circuits, get_entry_point_bodies
+
+
+@pytest.mark.parametrize("chunksize", [1, 3, 10])
+def test_executor_matches_serial_entry_points(chunksize: int) -> None:
+    circuits = get_circuits(7, names=2)
+    serial_module, serial_entry_points = to_qir_module(circuits)
+    with ThreadPoolExecutor(2) as executor:
+        module, entry_points = to_qir_module(
+            circuits, executor=executor, chunksize=chunksize
+        )
+    assert module.verify() is None
+    assert entry_points == serial_entry_points
+    mod = Module.from_bitcode(Context(), module.bitcode)
+    assert entry_points == [x.name for x in filter(is_entry_point, mod.functions)]
+
+
+def test_executor_declares_external_functions_once() -> None:
+    circuits = get_circuits(4, names=2)
+    with ThreadPoolExecutor(2) as executor:
+        module, _ = to_qir_module(circuits, executor=executor, chunksize=1)
+    names = [function.name for function in module.functions]
+    assert names.count("__quantum__qis__delay__body") == 1
+    assert not any(name.startswith("__quantum__qis__delay__body.") for name in names)
+
+
+def test_workers_match_serial_module() -> None:
+    circuits = [c for c in get_circuits(6, names=2) if c.name == "circuit_1"]
+    serial_module, serial_entry_points = to_qir_module(circuits[::2])
+    module, entry_points = to_qir_module(circuits[::2], workers=2, chunksize=1)
+    assert entry_points == serial_entry_points
+    assert get_entry_point_bodies(module) == get_entry_point_bodies(serial_module)
+
+
+def test_workers_raise_capability_errors() -> None:
+    circuit = QuantumCircuit(1, 1)
+    circuit.measure(0, 0)
+    circuit.h(0)
+    with pytest.raises(QubitUseAfterMeasurementError):
+        _ = to_qir_module([circuit, circuit], "BasicExecution", workers=2)
+
+
+def test_executor_accepts_generator_of_circuits() -> None:
+    circuits = get_circuits(5, names=2)
+    _, serial_entry_points = to_qir_module(circuits)
+    with ThreadPoolExecutor(2) as executor:
+        module, entry_points = to_qir_module(
+            (circuit for circuit in circuits), executor=executor, chunksize=2
+        )
+    assert entry_points == serial_entry_points
+
+
+def test_executor_rejects_non_quantum_circuits() -> None:
+    with ThreadPoolExecutor(2) as executor:
+        with pytest.raises(ValueError):
+            _ = to_qir_module([QuantumCircuit(1), 2], executor=executor)
+        with pytest.raises(ValueError):
+            _ = to_qir_module([], executor=executor)
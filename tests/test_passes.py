@@ -0,0 +1,241 @@
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+from qiskit import QuantumCircuit
+from qiskit.circuit import Parameter
+from qiskit_qir.capability import QubitUseAfterMeasurementError
+from qiskit_qir.passes import find_repeats, fuse_measure_reset, peephole
+from qiskit_qir.pipeline import TranslationStats
+from qiskit_qir.translate import to_qir_module
+import pytest
+import warnings
+
+from test_utils import (
+    get_entry_point_body,
+    measure_call_string,
+    single_op_call_string,
+)
+
+
+def optimize(circuit: QuantumCircuit):
+    instructions, removed = peephole(circuit.data)
+    names = [operation.name for operation, _, _ in instructions]
+    return names, removed, instructions
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [("h", "h"), ("x", "x"), ("y", "y"), ("z", "z"), ("s", "sdg"), ("tdg", "t")],
+)
+def test_inverse_pairs_cancel(first: str, second: str) -> None:
+    circuit = QuantumCircuit(1)
+    getattr(circuit, first)(0)
+    getattr(circuit, second)(0)
+    assert optimize(circuit)[:2] == ([], 2)
+
+
+def test_cancellations_cascade() -> None:
+    circuit = QuantumCircuit(2)
+    circuit.h(0)
+    circuit.s(1)
+    circuit.x(0)
+    circuit.sdg(1)
+    circuit.x(0)
+    circuit.h(0)
+    circuit.t(0)
+    assert optimize(circuit)[:2] == (["t"], 6)
+
+
+def test_rotations_and_delays_merge() -> None:
+    circuit = QuantumCircuit(1)
+    circuit.rz(0.25, 0)
+    circuit.rz(0.5, 0)
+    circuit.delay(2, 0, unit="us")
+    circuit.delay(3, 0, unit="us")
+    circuit.delay(3, 0, unit="ns")
+    circuit.rx(0.5, 0)
+    circuit.rx(-0.5, 0)
+    names, removed, instructions = optimize(circuit)
+    assert names == ["rz", "delay", "delay"]
+    assert removed == 4
+    assert instructions[0][0].params == [0.75]
+    assert (instructions[1][0].duration, instructions[1][0].unit) == (5, "us")
+
+
+def test_identities_are_dropped() -> None:
+    circuit = QuantumCircuit(1)
+    circuit.id(0)
+    circuit.ry(0, 0)
+    circuit.rz(Parameter("theta"), 0)
+    circuit.rz(0.5, 0)
+    assert optimize(circuit)[:2] == (["rz", "rz"], 2)
+
+
+def test_fences_are_not_crossed() -> None:
+    circuit = QuantumCircuit(2, 1)
+    circuit.h(0)
+    circuit.measure(0, 0)
+    circuit.h(0)
+    circuit.barrier()
+    circuit.h(0)
+    circuit.x(0).c_if(circuit.clbits[0], 1)
+    circuit.x(0)
+    circuit.cx(0, 1)
+    circuit.x(0)
+    assert optimize(circuit)[:2] == (
+        ["h", "measure", "h", "barrier", "h", "x", "x", "cx", "x"],
+        0,
+    )
+
+
+def test_optimization_level_in_translation() -> None:
+    circuit = QuantumCircuit(2, 2)
+    circuit.h(0)
+    circuit.h(0)
+    circuit.id(1)
+    circuit.rz(0.5, 1)
+    circuit.rz(0.5, 1)
+    circuit.measure([0, 1], [0, 1])
+
+    stats = TranslationStats()
+    module, _ = to_qir_module([circuit, circuit], optimization_level=1, stats=stats)
+    body = get_entry_point_body(str(module).splitlines())
+    assert stats.removed_gates == 8
+    assert not any("__quantum__qis__h__body" in line for line in body)
+    assert [line for line in body if "rz" in line] == [
+        "call void @__quantum__qis__rz__body(double 1.000000e+00, %Qubit* inttoptr (i64 1 to %Qubit*))"
+    ]
+
+    stats = TranslationStats()
+    unoptimized, _ = to_qir_module(circuit, stats=stats)
+    assert stats.removed_gates == 0
+    assert str(unoptimized).count("call void @__quantum__qis__h__body(") == 2
+
+
+def test_optimization_level_with_parameter_binds() -> None:
+    theta = Parameter("theta")
+    circuit = QuantumCircuit(1, 1)
+    circuit.x(0)
+    circuit.x(0)
+    circuit.rx(theta, 0)
+    circuit.measure(0, 0)
+    stats = TranslationStats()
+    module, entry_points = to_qir_module(
+        circuit, parameter_binds=[[0.1], [0.2]], optimization_level=1, stats=stats
+    )
+    assert len(entry_points) == 2
+    assert stats.removed_gates == 4
+    assert "__quantum__qis__x__body(" not in str(module)
+
+
+def test_unknown_optimization_level() -> None:
+    with pytest.raises(ValueError, match="optimization level"):
+        _ = to_qir_module(QuantumCircuit(1), optimization_level=3)
+
+
+def test_virtual_swaps() -> None:
+    circuit = QuantumCircuit(2, 2)
+    circuit.x(0)
+    circuit.swap(0, 1)
+    circuit.h(0)
+    circuit.measure([0, 1], [0, 1])
+
+    stats = TranslationStats()
+    module, _ = to_qir_module(circuit, virtual_swaps=True, stats=stats)
+    body = get_entry_point_body(str(module).splitlines())
+    assert stats.removed_swaps == 1
+    assert not any("__quantum__qis__swap__body" in line for line in body)
+    assert single_op_call_string("h", 1) in body
+    # The qubits are measured into the same results, recorded in order.
+    assert measure_call_string("mz", 0, 1) in body
+    assert measure_call_string("mz", 1, 0) in body
+    reference, _ = to_qir_module(circuit)
+    records = [line for line in body if "record_output" in line]
+    assert records == [
+        line
+        for line in get_entry_point_body(str(reference).splitlines())
+        if "record_output" in line
+    ]
+
+
+def test_conditioned_swaps_are_emitted() -> None:
+    circuit = QuantumCircuit(2, 1)
+    circuit.measure(0, 0)
+    circuit.swap(0, 1).c_if(circuit.clbits[0], 1)
+    circuit.swap(0, 1)
+    circuit.h(0)
+
+    stats = TranslationStats()
+    module, _ = to_qir_module(circuit, virtual_swaps=True, stats=stats)
+    body = get_entry_point_body(str(module).splitlines())
+    assert stats.removed_swaps == 1
+    assert str(module).count("call void @__quantum__qis__swap__body(") == 1
+    assert single_op_call_string("h", 1) in body
+
+
+def test_measure_reset_pairs_fuse() -> None:
+    circuit = QuantumCircuit(2, 3)
+    circuit.measure(0, 0)
+    circuit.h(1)
+    circuit.reset(0)
+    circuit.measure(1, 1)
+    circuit.x(1)
+    circuit.reset(1)
+    circuit.measure(0, 2)
+    circuit.reset(0).c_if(circuit.clbits[2], 1)
+    instructions, fused = fuse_measure_reset(circuit.data)
+    assert fused == 1
+    assert [operation.name for operation, _, _ in instructions] == [
+        "mresetz",
+        "h",
+        "measure",
+        "x",
+        "reset",
+        "measure",
+        "reset",
+    ]
+    assert instructions[0][2] == [circuit.clbits[0]]
+
+
+def test_passes_read_circuit_instructions_without_deprecation() -> None:
+    circuit = QuantumCircuit(1, 1)
+    for _ in range(2):
+        circuit.h(0)
+        circuit.measure(0, 0)
+        circuit.reset(0)
+        circuit.x(0).c_if(circuit.clbits[0], 1)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", DeprecationWarning)
+        assert peephole(circuit.data)[1] == 0
+        assert fuse_measure_reset(circuit.data)[1] == 2
+        (repeat,) = find_repeats(circuit.data, 2)
+    assert repeat.count == 2
+    assert repeat.instructions[3][2] == []
+
+
+def test_fuse_measure_resets_in_translation() -> None:
+    circuit = QuantumCircuit(2, 2)
+    for _ in range(3):
+        circuit.h(0)
+        circuit.measure(0, 0)
+        circuit.reset(0)
+    circuit.measure(1, 1)
+
+    stats = TranslationStats()
+    module, _ = to_qir_module([circuit, circuit], fuse_measure_resets=True, stats=stats)
+    ir = str(module)
+    assert stats.fused_measure_resets == 6
+    assert ir.count("declare void @__quantum__qis__mresetz__body(") == 1
+    assert ir.count("call void @__quantum__qis__mresetz__body(") == 6
+    assert "__quantum__qis__reset__body" not in ir
+    body = get_entry_point_body(ir.splitlines())
+    assert measure_call_string("mz", 1, 1) in body
+
+
+def test_fused_reset_is_rejected_by_basic_execution() -> None:
+    circuit = QuantumCircuit(1, 1)
+    circuit.measure(0, 0)
+    circuit.reset(0)
+    with pytest.raises(QubitUseAfterMeasurementError):
+        _ = to_qir_module(circuit, "BasicExecution", fuse_measure_resets=True)
@@ -74,8 +74,25 @@ def test_noop_gates(circuit_name, request):
     assert generated_ir is not None
 
 
-@pytest.mark.xfail(Reason="OpenQASM 3.0-style control flow is not supported yet")
-@pytest.mark.parametrize("circuit_name", cf_fixtures)
+_UNSUPPORTED_CONTROL_FLOW = ["while_loop"]
+
+
+@pytest.mark.parametrize(
+    "circuit_name",
+    [
+        (
+            pytest.param(
+                name,
+                marks=pytest.mark.xfail(
+                    reason="OpenQASM 3.0-style control flow is not supported yet"
+                ),
+            )
+            if name in _UNSUPPORTED_CONTROL_FLOW
+            else name
+        )
+        for name in cf_fixtures
+    ],
+)
 def test_control_flow(circuit_name, request):
     circuit = request.getfixturevalue(circuit_name)
     generated_ir = str(to_qir_module(circuit)[0])
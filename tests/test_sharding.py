@@ -0,0 +1,119 @@
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+from qiskit_qir.pipeline import TranslationStats
+from qiskit_qir.translate import iter_qir_shards, to_qir_module, to_qir_shards
+from pyqir import Context, Module, is_entry_point
+import pytest
+
+from test_utils import get_circuits, get_entry_point_bodies
+
+
+def get_entry_points(module: Module):
+    mod = Module.from_bitcode(Context(), module.bitcode)
+    return {f.name: str(f) for f in filter(is_entry_point, mod.functions)}
+
+
+def check_shards(modules, locations, count: int) -> None:
+    assert sorted(locations) == list(range(count))
+    shards = [get_entry_points(module) for module in modules]
+    for module in modules:
+        assert module.verify() is None
+    assert sum(len(entry_points) for entry_points in shards) == count
+    for index, (shard, entry_point) in locations.items():
+        assert entry_point in shards[shard]
+    # Shards hold consecutive circuits.
+    assert [locations[index][0] for index in range(count)] == sorted(
+        locations[index][0] for index in range(count)
+    )
+
+
+def test_shards_by_entry_point_count() -> None:
+    modules, locations = to_qir_shards(get_circuits(7, names=2), max_entry_points=3)
+    assert len(modules) == 3
+    check_shards(modules, locations, 7)
+    assert [len(get_entry_points(module)) for module in modules] == [3, 3, 1]
+    assert locations[0] == (0, "circuit_0")
+    assert locations[2] == (0, "circuit_0.1")
+    assert locations[3] == (1, "circuit_1")
+
+
+def test_shards_match_unsharded_translation() -> None:
+    module, _ = to_qir_module(get_circuits(6, names=2))
+    modules, _ = to_qir_shards(get_circuits(6, names=2), max_entry_points=4)
+    assert [
+        body for m in modules for body in get_entry_point_bodies(m)
+    ] == get_entry_point_bodies(module)
+
+
+def test_shards_by_instruction_estimate() -> None:
+    # 6 operations and 2 classical bits, plus a delay in every third circuit.
+    modules, locations = to_qir_shards(
+        get_circuits(6, names=2, gates=2), max_instructions=17
+    )
+    check_shards(modules, locations, 6)
+    assert [len(get_entry_points(module)) for module in modules] == [2, 2, 2]
+
+
+def test_shards_by_byte_size() -> None:
+    module, _ = to_qir_module(get_circuits(1, names=2, gates=20))
+    limit = 3 * len(module.bitcode)
+    modules, locations = to_qir_shards(
+        get_circuits(12, names=2, gates=20), max_bytes=limit
+    )
+    assert len(modules) > 1
+    check_shards(modules, locations, 12)
+    for module in modules:
+        assert len(module.bitcode) <= limit
+
+
+def test_oversized_circuit_gets_its_own_shard() -> None:
+    modules, locations = to_qir_shards(get_circuits(3, names=2), max_instructions=1)
+    assert len(modules) == 3
+    check_shards(modules, locations, 3)
+
+
+def test_shards_are_yielded_as_completed() -> None:
+    consumed = 0
+
+    def generate():
+        nonlocal consumed
+        for circuit in get_circuits(6, names=2):
+            consumed += 1
+            yield circuit
+
+    shards = iter_qir_shards(generate(), max_entry_points=2)
+    module, entry_points = next(shards)
+    assert list(entry_points) == [0, 1]
+    assert consumed <= 3
+    assert [list(entry_points) for _, entry_points in shards] == [[2, 3], [4, 5]]
+
+
+@pytest.mark.parametrize("verify", ["module", "per_entry_point", "sampled", "off"])
+def test_verify_modes_apply_to_shards(verify: str) -> None:
+    stats = TranslationStats()
+    modules, locations = to_qir_shards(
+        get_circuits(5, names=2),
+        max_bytes=10**6,
+        max_entry_points=2,
+        verify=verify,
+        stats=stats,
+    )
+    check_shards(modules, locations, 5)
+    assert stats.entry_points == 5
+    assert stats.verify_mode == verify
+
+
+def test_sharding_requires_a_limit() -> None:
+    with pytest.raises(ValueError):
+        _ = to_qir_shards(get_circuits(2, names=2))
+    with pytest.raises(ValueError):
+        _ = to_qir_shards(get_circuits(2, names=2), max_entry_points=0)
+    with pytest.raises(ValueError):
+        _ = to_qir_shards(get_circuits(2, names=2), max_entry_points=1, workers=2)
+
+
+def test_sharding_empty_input_raises_value_error() -> None:
+    with pytest.raises(ValueError):
+        _ = to_qir_shards([], max_entry_points=1)
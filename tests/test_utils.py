@@ -3,8 +3,9 @@
 # Licensed under the MIT License.
 ##
 
-from typing import List
+from typing import List, Optional
 from pyqir import is_entry_point, Context, Module, Function
+from qiskit import QuantumCircuit
 
 
 def _qubit_string(qubit: int) -> str:
@@ -117,3 +118,34 @@ def check_attributes_on_entrypoint(
     assert (
         expected_results == actual_results
     ), f"Incorrect result count: {expected_results} expected, {actual_results} actual"
+
+
+# Returns `count` two-qubit circuits named `{name}_{index}`, the index taken
+# modulo `names` when given so that names repeat. Each circuit applies
+# `gates` Hadamards, a rotation by its index and a CNOT, delays every third
+# circuit, and measures both qubits.
+def get_circuits(
+    count: int, name: str = "circuit", names: Optional[int] = None, gates: int = 1
+) -> List[QuantumCircuit]:
+    circuits = []
+    for index in range(count):
+        circuit = QuantumCircuit(2, 2, name=f"{name}_{index % (names or count)}")
+        for _ in range(gates):
+            circuit.h(0)
+        circuit.rz(0.25 * index, 1)
+        circuit.cx(0, 1)
+        if index % 3 == 0:
+            circuit.delay(index + 1, 1, unit="dt")
+        circuit.measure([0, 1], [0, 1])
+        circuits.append(circuit)
+    return circuits
+
+
+# Returns the bodies of the entry points of the module read back from its
+# bitcode, without their signatures.
+def get_entry_point_bodies(module: Module) -> List[str]:
+    mod = Module.from_bitcode(Context(), module.bitcode)
+    return [
+        str(function).split("\n", 1)[1]
+        for function in filter(is_entry_point, mod.functions)
+    ]
@@ -0,0 +1,96 @@
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+from concurrent.futures import ThreadPoolExecutor
+
+from qiskit_qir.pipeline import TranslationStats, VerificationError
+from qiskit_qir.translate import to_qir_module
+from qiskit_qir.visitor import BasicQisVisitor
+from pyqir import Context, Module, is_entry_point
+import pytest
+
+from test_utils import get_circuits
+
+
+def break_circuit(monkeypatch, name: str) -> None:
+    finalize = BasicQisVisitor.finalize
+
+    def skip_return(self):
+        # Leaves the last block of the entry point without a terminator.
+        if self.entry_point != name:
+            finalize(self)
+
+    monkeypatch.setattr(BasicQisVisitor, "finalize", skip_return)
+
+
+@pytest.mark.parametrize(
+    "verify, sample_rate, verified",
+    [
+        ("module", 10, 5),
+        ("per_entry_point", 10, 5),
+        ("sampled", 2, 3),
+        ("sampled", 10, 1),
+        ("off", 10, 0),
+    ],
+)
+def test_verify_modes_report_verified_entry_points(
+    verify: str, sample_rate: int, verified: int
+) -> None:
+    circuits = get_circuits(5)
+    _, expected_entry_points = to_qir_module(circuits)
+    stats = TranslationStats()
+    module, entry_points = to_qir_module(
+        circuits, verify=verify, verify_sample_rate=sample_rate, stats=stats
+    )
+    assert module.verify() is None
+    assert entry_points == expected_entry_points
+    mod = Module.from_bitcode(Context(), module.bitcode)
+    assert entry_points == [x.name for x in filter(is_entry_point, mod.functions)]
+    assert stats.verify_mode == verify
+    assert stats.entry_points == 5
+    assert stats.verified_entry_points == verified
+    assert stats.verify_seconds >= 0.0
+
+
+def test_per_entry_point_verification_names_failing_circuit(monkeypatch) -> None:
+    break_circuit(monkeypatch, "circuit_2")
+    with pytest.raises(VerificationError) as error:
+        _ = to_qir_module(get_circuits(4), verify="per_entry_point")
+    assert error.value.index == 2
+    assert error.value.circuit_name == "circuit_2"
+    assert "circuit_2" in str(error.value)
+
+
+def test_per_entry_point_verification_names_failing_circuit_in_workers(
+    monkeypatch,
+) -> None:
+    break_circuit(monkeypatch, "circuit_3")
+    with ThreadPoolExecutor(2) as executor:
+        with pytest.raises(VerificationError) as error:
+            _ = to_qir_module(
+                get_circuits(4),
+                verify="per_entry_point",
+                executor=executor,
+                chunksize=2,
+            )
+    assert error.value.index == 3
+
+
+def test_sampled_verification_skips_unsampled_circuits(monkeypatch) -> None:
+    break_circuit(monkeypatch, "circuit_1")
+    _ = to_qir_module(get_circuits(4), verify="sampled", verify_sample_rate=2)
+    with pytest.raises(VerificationError):
+        _ = to_qir_module(get_circuits(4), verify="sampled", verify_sample_rate=1)
+
+
+def test_module_verification_fails_on_broken_circuit(monkeypatch) -> None:
+    break_circuit(monkeypatch, "circuit_1")
+    with pytest.raises(Exception):
+        _ = to_qir_module(get_circuits(2), verify="module")
+    _ = to_qir_module(get_circuits(2), verify="off")
+
+
+def test_unknown_verify_mode_raises_value_error() -> None:
+    with pytest.raises(ValueError):
+        _ = to_qir_module(get_circuits(1), verify="sometimes")